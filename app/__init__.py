@@ -36,6 +36,7 @@ def create_app(config_class=Config):
         from app.models.Prediction.model import Prediction
         from app.models.Segmentation.model import Segmentation
         from app.models.Cluster.model import Cluster
+        from app.models.OptimizationJob.model import OptimizationJob
 
         # Setup admin views
 
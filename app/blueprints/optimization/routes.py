@@ -1,14 +1,18 @@
 from flask import jsonify, render_template, session
-from flask_login import login_required
-import pandas as pd
+from flask_login import current_user, login_required
 from werkzeug.exceptions import RequestEntityTooLarge
 
 from app.forms.file_upload_form import FileUploadForm
 
 from app.services.datasetfile_services import DatasetFileService
+from app.services.upload_pipeline_services import UploadPipeline
+from app.services.artifact_store_services import ArtifactStoreService
 
 
 from app.blueprints.optimization import optimization_bp
+from app.services.optimization.optimization_job_services import (
+    OptimizationJobService,
+)
 from app.services.optimization.optimization_services import OptimizationService
 
 
@@ -43,22 +47,20 @@ def upload_prediction_dataset_file():
             # Retrieve the file
             file = form.file.data
 
-            is_valid_file, validation_message = DatasetFileService.validate_datasetfile(
-                file
-            )
+            # Parse the file once for all the upload steps
+            pipeline = UploadPipeline(file, "optimization")
+
+            is_valid_file, validation_message = pipeline.validate()
 
             # Validate and save the file
             if is_valid_file:
-                file_is_saved, dataset_file_id = DatasetFileService.save_datasetfile(
-                    file, "optimization"
-                )
+                file_is_saved, dataset_file_id = pipeline.save()
                 session["optimization_file_uploaded"] = file_is_saved
                 session["dataset_file_id"] = dataset_file_id
 
-                optimization_df_original = OptimizationService.get_original_dataset(
-                    file
+                session["optimization_df_original_id"] = (
+                    pipeline.save_original_dataset()
                 )
-                session["optimization_df_original"] = optimization_df_original
 
                 # print(f"File saved successfully, file id: {dataset_file_id}")
 
@@ -66,6 +68,7 @@ def upload_prediction_dataset_file():
                     {
                         "success": True,
                         "message": "Successfully uploaded optimization file.",
+                        "report": pipeline.get_report(),
                     }
                 )
 
@@ -75,6 +78,7 @@ def upload_prediction_dataset_file():
                     {
                         "success": False,
                         "message": validation_message,
+                        "report": pipeline.get_report(),
                     }
                 )
 
@@ -102,9 +106,15 @@ def upload_prediction_dataset_file():
 @login_required
 def predict_sales():
     try:
-        df_weekly = pd.DataFrame(session.get("prediction_df_weekly"))
-        df_monthly = pd.DataFrame(session.get("prediction_df_monthly"))
-        df_quarterly = pd.DataFrame(session.get("prediction_df_quarterly"))
+        df_weekly = ArtifactStoreService.load_dataframe(
+            session.get("prediction_df_weekly_id")
+        )
+        df_monthly = ArtifactStoreService.load_dataframe(
+            session.get("prediction_df_monthly_id")
+        )
+        df_quarterly = ArtifactStoreService.load_dataframe(
+            session.get("prediction_df_quarterly_id")
+        )
 
         prediction_weekly, prediction_monthly, prediction_quarterly = (
             OptimizationService.predict_sales(df_weekly, df_monthly, df_quarterly)
@@ -166,28 +176,19 @@ def get_predictions():
     )
 
 
-@optimization_bp.route("/optimize_prices", methods=["GET"])
+@optimization_bp.route("/optimize_prices", methods=["POST"])
 @login_required
 def optimize_prices():
+    """Starts the optimization of the uploaded datasets as a background job and
+    returns its id, without waiting for it."""
     try:
-        df_weekly = pd.DataFrame(session.get("prediction_df_weekly"))
-        df_monthly = pd.DataFrame(session.get("prediction_df_monthly"))
-        df_quarterly = pd.DataFrame(session.get("prediction_df_quarterly"))
-        df_original = pd.DataFrame(session.get("optimization_df_original"))
-
-        optimized_sales, price_list = OptimizationService.optimize_prices(
-            df_weekly, df_monthly, df_quarterly, df_original
-        )
-
-        session["optimized_sales"] = optimized_sales
-        session["price_list"] = price_list
+        artifact_ids = {
+            key: session.get(key) for key in OptimizationJobService.session_keys
+        }
 
         if not all(
-            k in session
-            for k in [
-                "optimized_sales",
-                "price_list",
-            ]
+            ArtifactStoreService.has_artifact(artifact_id)
+            for artifact_id in artifact_ids.values()
         ):
             print("Optimization data unavailable")
             return jsonify(
@@ -196,9 +197,23 @@ def optimize_prices():
                     "message": "Optimization data not available.",
                 }
             )
-        print(f"Succesfully completed optimization, optimized sales: {optimized_sales}")
+
+        job_id = OptimizationJobService.submit_job(
+            artifact_ids, current_user.id, session.get("dataset_file_id")
+        )
+
+        # The optimizations of an earlier job are replaced once this one is done
+        session["optimization_job_id"] = str(job_id)
+        session.pop("optimized_sales", None)
+        session.pop("price_list", None)
+
+        print(f"Started optimization job {job_id}")
         return jsonify(
-            {"success": True, "message": "Successfully completed optimization."}
+            {
+                "success": True,
+                "message": "Started optimization.",
+                "job_id": str(job_id),
+            }
         )
 
     except Exception as e:
@@ -208,11 +223,39 @@ def optimize_prices():
         )
 
 
+@optimization_bp.route("/jobs/<job_id>", methods=["GET"])
+@login_required
+def get_optimization_job(job_id):
+    """Returns the status of an optimization job and the progress of its stages."""
+    job = OptimizationJobService.get_job(job_id, current_user.id)
+
+    if job is None:
+        return (
+            jsonify({"success": False, "message": "Optimization job not found."}),
+            404,
+        )
+
+    return jsonify({"success": True, **OptimizationJobService.get_status(job)})
+
+
 @optimization_bp.route("/get_optimizations", methods=["GET"])
 @login_required
 def get_optimizations():
     optimized_sales = session.get("optimized_sales")
     price_list = session.get("price_list")
+
+    # Keep the result of a finished optimization job in the session
+    if optimized_sales is None or price_list is None:
+        result = OptimizationJobService.get_result(
+            OptimizationJobService.get_job(
+                session.get("optimization_job_id"), current_user.id
+            )
+        )
+        if result is not None:
+            optimized_sales, price_list = result
+            session["optimized_sales"] = optimized_sales
+            session["price_list"] = price_list
+
     print(f"Optimizations received from session, optimized sales: {optimized_sales}")
 
     if optimized_sales is None or price_list is None:
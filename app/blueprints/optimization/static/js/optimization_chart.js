@@ -157,15 +157,23 @@ async function fetchPredictions() {
     }
 }
 
+// Longest time to poll an optimization job for, past the server's job timeout
+const OPTIMIZATION_POLLING_TIMEOUT_MS = 65 * 60 * 1000;
+
 async function triggerOptimization() {
     try {
-        const response = await fetch("optimize_prices");
+        // Start the optimization job, which runs in the background
+        const response = await fetch("optimize_prices", { method: "POST" });
 
         const data = await response.json();
 
         if (data.success) {
-            console.log("Optimization process triggered successfully.");
-            pollingInterval = setInterval(fetchOptimizations, 3000);
+            console.log("Optimization job started:", data.job_id);
+            const pollingStart = Date.now();
+            pollingInterval = setInterval(
+                () => fetchOptimizationJob(data.job_id, pollingStart),
+                3000
+            );
         } else {
             console.error("Failed to trigger optimization", data.message);
         }
@@ -174,6 +182,56 @@ async function triggerOptimization() {
     }
 }
 
+// Function to fetch the status of the optimization job and show its progress
+async function fetchOptimizationJob(jobId, pollingStart) {
+    // Stop the polling for a job that never finishes and reset the polling interval ID
+    if (Date.now() - pollingStart > OPTIMIZATION_POLLING_TIMEOUT_MS) {
+        console.error("Optimization timed out", jobId);
+        loadingMessage.textContent = "Optimization timed out, please try again.";
+        clearInterval(pollingInterval);
+        pollingInterval = null;
+        return;
+    }
+
+    try {
+        const response = await fetch(`jobs/${jobId}`);
+        const data = await response.json();
+
+        if (!data.success || data.status === "failed") {
+            console.error("Optimization failed", data.error || data.message);
+            loadingMessage.textContent = "Optimization failed, please try again.";
+
+            // Stop the polling for the job and reset the polling interval ID
+            clearInterval(pollingInterval);
+            pollingInterval = null;
+            return;
+        }
+
+        if (data.status === "done") {
+            clearInterval(pollingInterval);
+            pollingInterval = null;
+
+            await fetchOptimizations();
+            return;
+        }
+
+        // Number of evaluations of the model of each running or finished stage
+        const stages = Object.entries(data.progress || {})
+            .filter(([, progress]) => progress.status !== "queued")
+            .map(([stage, progress]) =>
+                progress.status === "done"
+                    ? `${stage}: done`
+                    : `${stage}: ${progress.evaluations} evaluations`
+            );
+
+        loadingMessage.textContent =
+            "Optimizing prices, please wait..." +
+            (stages.length > 0 ? ` (${stages.join(", ")})` : "");
+    } catch (error) {
+        console.error("Error fetching optimization job:", error);
+    }
+}
+
 let reportTimestamp;
 let priceList;
 
@@ -220,10 +278,6 @@ async function fetchOptimizations() {
             salesChart.update();
             loadingMessage.style.display = "none";
             downloadButton.style.display = "block";
-
-            // Stop the polling for optimization data and reset the polling interval ID
-            clearInterval(pollingInterval);
-            pollingInterval = null;
         }
     } catch (error) {
         console.error("Error fetching optimizations:", error);
@@ -233,6 +287,7 @@ async function fetchOptimizations() {
 // Trigger the endpoint to start the prediction
 async function triggerPrediction() {
     downloadButton.style.display = "none";
+    loadingMessage.textContent = "Optimizing prices, please wait...";
     loadingMessage.style.display = "block";
     try {
         const response = await fetch("predict_sales");
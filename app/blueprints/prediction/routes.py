@@ -1,11 +1,11 @@
 from flask import jsonify, render_template, session
 from flask_login import login_required
-import pandas as pd
 from werkzeug.exceptions import RequestEntityTooLarge
 
 from app.forms.file_upload_form import FileUploadForm
 
-from app.services.datasetfile_services import DatasetFileService
+from app.services.upload_pipeline_services import UploadPipeline
+from app.services.artifact_store_services import ArtifactStoreService
 
 
 from app.blueprints.prediction import prediction_bp
@@ -43,15 +43,14 @@ def upload_prediction_dataset_file():
             # Retrieve the file
             file = form.file.data
 
-            is_valid_file, validation_message = DatasetFileService.validate_datasetfile(
-                file
-            )
+            # Parse the file once for all the upload steps
+            pipeline = UploadPipeline(file, "prediction")
+
+            is_valid_file, validation_message = pipeline.validate()
 
             # Validate and save the file
             if is_valid_file:
-                file_is_saved, dataset_file_id = DatasetFileService.save_datasetfile(
-                    file, "prediction"
-                )
+                file_is_saved, dataset_file_id = pipeline.save()
                 session["prediction_file_uploaded"] = file_is_saved
                 session["dataset_file_id"] = dataset_file_id
 
@@ -61,6 +60,7 @@ def upload_prediction_dataset_file():
                     {
                         "success": True,
                         "message": "Successfully uploaded prediction file.",
+                        "report": pipeline.get_report(),
                     }
                 )
 
@@ -70,6 +70,7 @@ def upload_prediction_dataset_file():
                     {
                         "success": False,
                         "message": validation_message,
+                        "report": pipeline.get_report(),
                     }
                 )
 
@@ -96,9 +97,15 @@ def upload_prediction_dataset_file():
 @login_required
 def predict_sales():
     try:
-        df_weekly = pd.DataFrame(session.get("prediction_df_weekly"))
-        df_monthly = pd.DataFrame(session.get("prediction_df_monthly"))
-        df_quarterly = pd.DataFrame(session.get("prediction_df_quarterly"))
+        df_weekly = ArtifactStoreService.load_dataframe(
+            session.get("prediction_df_weekly_id")
+        )
+        df_monthly = ArtifactStoreService.load_dataframe(
+            session.get("prediction_df_monthly_id")
+        )
+        df_quarterly = ArtifactStoreService.load_dataframe(
+            session.get("prediction_df_quarterly_id")
+        )
 
         prediction_weekly, prediction_monthly, prediction_quarterly = (
             PredictionService.predict_sales(df_weekly, df_monthly, df_quarterly)
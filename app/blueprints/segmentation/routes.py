@@ -1,10 +1,19 @@
-from flask import jsonify, redirect, render_template, request, url_for, flash, session
+from flask import (
+    current_app,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    url_for,
+    flash,
+    session,
+)
 from flask_login import login_required
 from werkzeug.exceptions import RequestEntityTooLarge
 
 from app.forms.file_upload_form import FileUploadForm
 
-from app.services.datasetfile_services import DatasetFileService
+from app.services.upload_pipeline_services import UploadPipeline
 from app.services.segmentation.segmentation_services import SegmentationService
 
 from app.blueprints.segmentation import segmentation_bp
@@ -50,18 +59,23 @@ def upload_segmentation_dataset_file():
             # Retrieve the file
             file = file_upload_form.file.data
 
-            is_valid_file, validation_message = DatasetFileService.validate_datasetfile(
-                file
-            )
+            # Parse the file once for all the upload steps
+            pipeline = UploadPipeline(file, "segmentation")
+
+            is_valid_file, validation_message = pipeline.validate()
 
             # Validate and save the file
             if is_valid_file:
-                file_is_saved, dataset_file_id = DatasetFileService.save_datasetfile(
-                    file, "segmentation"
-                )
+                file_is_saved, dataset_file_id = pipeline.save()
                 session["segmentation_file_uploaded"] = file_is_saved
                 session["dataset_file_id"] = dataset_file_id
 
+                # Cluster every metric in the background while the user picks one
+                if file_is_saved and current_app.config["SEGMENTATION_PRECOMPUTE"]:
+                    SegmentationService.precompute_dataset_file(
+                        session.get("dataset_file_path")
+                    )
+
             else:
                 flash(
                     validation_message,
@@ -111,19 +125,18 @@ def cluster_customers():
     if form.validate_on_submit():
         print("segm form passedd")
 
-        # Get the dataset inside the submitted file
-        df = DatasetFileService.get_session_dataframe()
-
         # Retrieve number of clusters and clustering metric from the form
         num_of_clusters = form.number_choice.data
         chosen_metric = form.metric.data
+
         session["chosen_metric"] = (
             chosen_metric  # Set the chosen metric into the session
         )
 
-        # Cluster the dataset and set cluster counts in the session
-        cluster_counts, metric_averages = SegmentationService.segment_customers(
-            df, num_of_clusters, chosen_metric
+        # Cluster the chosen metric of the submitted file, reusing earlier clusterings
+        # of the same file and metric, and set cluster counts in the session
+        cluster_counts, metric_averages = SegmentationService.segment_dataset_file(
+            session.get("dataset_file_path"), num_of_clusters, chosen_metric
         )
         if cluster_counts is None or metric_averages is None:
             return jsonify(
@@ -21,12 +21,55 @@ class Config:
     UPLOAD_FOLDER_PREDICTION = environ.get("UPLOAD_FOLDER_PREDICTION")
     UPLOAD_FOLDER_SEGMENTATION = environ.get("UPLOAD_FOLDER_SEGMENTATION")
     MAX_CONTENT_LENGTH = int(environ.get("MAX_CONTENT_LENGTH"))
+    DATASET_STORAGE_FORMAT = environ.get("DATASET_STORAGE_FORMAT", "columnar")
+
+    # Ingestion of CSV uploads: 'full' (parsed at once) or 'streaming' (in chunks)
+    DATASET_INGESTION_MODE = environ.get("DATASET_INGESTION_MODE", "full")
+    DATASET_CHUNK_SIZE = int(environ.get("DATASET_CHUNK_SIZE", 100_000))
+
+    # Artifact store config values
+    ARTIFACT_FOLDER = environ.get("ARTIFACT_FOLDER", "artifacts")
 
     # ML processing-related config values
     MODELS_FOLDER_PREDICTION = path.abspath(
         path.join(basedir, environ.get("MODELS_FOLDER_PREDICTION"))
     )
 
+    # Price search strategy of the optimizer: 'powell', 'separable', or 'grid'
+    OPTIMIZATION_STRATEGY = environ.get("OPTIMIZATION_STRATEGY", "powell")
+    OPTIMIZATION_GRID_SIZE = int(environ.get("OPTIMIZATION_GRID_SIZE", 50))
+
+    # Pool running the timeframes of an optimization: 'process', 'thread', or 'serial'
+    OPTIMIZATION_EXECUTOR = environ.get("OPTIMIZATION_EXECUTOR", "process")
+
+    # Number of optimization jobs run at once in the background, others are queued
+    OPTIMIZATION_JOB_WORKERS = int(environ.get("OPTIMIZATION_JOB_WORKERS", 1))
+
+    # Seconds after which a queued or running optimization job is failed
+    OPTIMIZATION_JOB_TIMEOUT = int(environ.get("OPTIMIZATION_JOB_TIMEOUT", 3600))
+
+    # Clustering engine of the segmentation: 'kmeans1d' (exact, 1-D) or 'sklearn'
+    SEGMENTATION_ENGINE = environ.get("SEGMENTATION_ENGINE", "kmeans1d")
+
+    # Silhouette scoring of the scikit-learn engine: 'exact', 'sampled', or 'simplified'
+    SILHOUETTE_MODE = environ.get("SILHOUETTE_MODE", "sampled")
+    SILHOUETTE_SAMPLE_SIZE = int(environ.get("SILHOUETTE_SAMPLE_SIZE", 5000))
+    SILHOUETTE_RANDOM_STATE = int(environ.get("SILHOUETTE_RANDOM_STATE", 42))
+
+    # Number of KMeans models of the automatic clustering fitted concurrently
+    SEGMENTATION_SWEEP_WORKERS = int(environ.get("SEGMENTATION_SWEEP_WORKERS", 4))
+
+    # Cluster every metric in the background after a segmentation upload
+    SEGMENTATION_PRECOMPUTE = environ.get("SEGMENTATION_PRECOMPUTE", "False") == "True"
+    SEGMENTATION_PRECOMPUTE_WORKERS = int(
+        environ.get("SEGMENTATION_PRECOMPUTE_WORKERS", 2)
+    )
+
+    # Size limit in bytes of the cached clusterings of each dataset file and metric
+    SEGMENTATION_CACHE_MAX_BYTES = int(
+        environ.get("SEGMENTATION_CACHE_MAX_BYTES", 256 * 1024**2)
+    )
+
     # Flask-session config values
     SESSION_TYPE = environ.get("SESSION_TYPE")
     SESSION_FILE_DIR = environ.get("SESSION_FILE_DIR")
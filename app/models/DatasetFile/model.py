@@ -16,8 +16,14 @@ class DatasetFile(db.Model):
         default=uuid.uuid4,
     )
 
-    # File path
-    file_path = db.Column(db.String(150), nullable=False, unique=True)
+    # File path, shared by the uploads of the same content
+    file_path = db.Column(db.String(150), nullable=False)
+
+    # Content hash of the uploaded file
+    content_hash = db.Column(db.String(64), nullable=True, index=True)
+
+    # ML process the file was uploaded for
+    ml_process = db.Column(db.String(20), nullable=True)
 
     # Upload datetime
     upload_datetime = db.Column(db.DateTime, nullable=False, default=datetime.now)
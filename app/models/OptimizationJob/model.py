@@ -0,0 +1,54 @@
+import uuid
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+
+from app import db
+
+
+class OptimizationJob(db.Model):
+    # Name of table in database
+    __tablename__ = "optimization_job"
+
+    # ID
+    id = db.Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+
+    # Status: 'queued', 'running', 'done', or 'failed'
+    status = db.Column(db.String(20), nullable=False, default="queued")
+
+    # Artifact ids of the timeframe datasets and the original dataset optimized
+    artifact_ids = db.Column(db.JSON, nullable=False)
+
+    # Final progress of each stage, once the job finished
+    progress = db.Column(db.JSON, nullable=True)
+
+    # Optimized sales of each timeframe
+    optimized_sales = db.Column(db.JSON, nullable=True)
+
+    # Artifact id of the current and optimized prices of each timeframe
+    price_list_id = db.Column(db.String(64), nullable=True)
+
+    # Error message of a failed job
+    error = db.Column(db.Text, nullable=True)
+
+    # Creation, start, and finish datetimes
+    created_datetime = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_datetime = db.Column(db.DateTime, nullable=True)
+    finished_datetime = db.Column(db.DateTime, nullable=True)
+
+    # Branch ID (Foreign key)
+    branch_id = db.Column(
+        UUID(as_uuid=True), db.ForeignKey("branch.id"), nullable=False
+    )
+
+    # Dataset file ID (Foreign key)
+    dataset_file_id = db.Column(
+        UUID(as_uuid=True), db.ForeignKey("dataset_file.id"), nullable=True
+    )
+
+    # (Optional) Relationships with Branch and DatasetFile
+    branch = db.relationship("Branch")
+    dataset_file = db.relationship("DatasetFile")
@@ -0,0 +1,105 @@
+import os
+import shutil
+import uuid
+
+from flask import current_app
+
+from app.services.columnar_storage_services import ColumnarStorageService
+
+
+class ArtifactStoreService:
+    """Content-addressed store of DataFrames on the local disk.
+    Each artifact is saved once in the columnar format under the hash of its content,
+    so only the short artifact id needs to be kept in the session."""
+
+    @staticmethod
+    def get_artifact_folder():
+        """Returns the folder of the artifact store, creating it if it doesn't exist."""
+        folder = current_app.config["ARTIFACT_FOLDER"]
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    @staticmethod
+    def get_artifact_path(artifact_id):
+        """Returns the directory of an artifact."""
+        return os.path.join(ArtifactStoreService.get_artifact_folder(), artifact_id)
+
+    @staticmethod
+    def save_dataframe(df):
+        """Saves the DataFrame into the store, if not already saved, and returns its artifact id."""
+        manifest, arrays = ColumnarStorageService.encode_dataframe(df)
+        artifact_id = ColumnarStorageService.hash_encoded(manifest, arrays)
+        artifact_path = ArtifactStoreService.get_artifact_path(artifact_id)
+
+        # Identical content is already stored
+        if ColumnarStorageService.is_columnar(artifact_path):
+            return artifact_id
+
+        # Write to a temporary directory first, so readers never see a partial artifact
+        temp_path = ArtifactStoreService.get_artifact_path(
+            f".tmp-{uuid.uuid4().hex}"
+        )
+        try:
+            ColumnarStorageService.write_encoded(manifest, arrays, temp_path)
+            os.rename(temp_path, artifact_path)
+        except OSError:
+            # Another request stored the same content in the meantime
+            if not ColumnarStorageService.is_columnar(artifact_path):
+                raise
+        finally:
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+        return artifact_id
+
+    @staticmethod
+    def load_dataframe(artifact_id, columns=None, mmap=True):
+        """Loads a DataFrame from the store, memory-mapping its columns instead of reading them.
+        Without mmap, the columns are read into memory. Returns None if there is no such
+        artifact."""
+        if not artifact_id:
+            return None
+
+        artifact_path = ArtifactStoreService.get_artifact_path(artifact_id)
+        if not ColumnarStorageService.is_columnar(artifact_path):
+            return None
+
+        return ColumnarStorageService.read_dataframe(
+            artifact_path, columns=columns, mmap=mmap
+        )
+
+    @staticmethod
+    def has_artifact(artifact_id):
+        """Checks if an artifact exists in the store."""
+        return bool(artifact_id) and ColumnarStorageService.is_columnar(
+            ArtifactStoreService.get_artifact_path(artifact_id)
+        )
+
+    @staticmethod
+    def get_alias_path(alias):
+        """Returns the file of an alias, creating the aliases folder if it doesn't
+        exist."""
+        folder = os.path.join(ArtifactStoreService.get_artifact_folder(), "aliases")
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, alias)
+
+    @staticmethod
+    def save_alias(alias, artifact_id):
+        """Points an alias, such as the hash of a source file, to an artifact."""
+        alias_path = ArtifactStoreService.get_alias_path(alias)
+        temp_path = f"{alias_path}.tmp-{uuid.uuid4().hex}"
+
+        with open(temp_path, "w") as f:
+            f.write(artifact_id)
+        os.replace(temp_path, alias_path)
+
+    @staticmethod
+    def load_alias(alias):
+        """Returns the id of the artifact an alias points to, or None if there is no
+        such alias or artifact."""
+        try:
+            with open(ArtifactStoreService.get_alias_path(alias)) as f:
+                artifact_id = f.read().strip()
+        except OSError:
+            return None
+
+        return artifact_id if ArtifactStoreService.has_artifact(artifact_id) else None
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class ColumnarStorageService:
+    """Stores DataFrames in a binary columnar format: a directory holding one .npy file
+    per column and a JSON manifest with the column names and types.
+    Columns are read back memory-mapped, so loading a frame does not parse or copy it."""
+
+    # Version of the on-disk layout, written to every manifest
+    format_version = 1
+
+    # Name of the manifest file inside a columnar directory
+    manifest_filename = "manifest.json"
+
+    @staticmethod
+    def encode_dataframe(df):
+        """Converts a DataFrame into its manifest and the arrays to be stored."""
+        columns = []
+        arrays = {}
+
+        for position, column in enumerate(df.columns):
+            column_manifest, column_arrays = ColumnarStorageService.encode_series(
+                df[column], f"col_{position}"
+            )
+            column_manifest["name"] = str(column)
+            columns.append(column_manifest)
+            arrays.update(column_arrays)
+
+        # Store the index only if it carries information
+        index_manifest = None
+        if not (
+            isinstance(df.index, pd.RangeIndex)
+            and df.index.start == 0
+            and df.index.step == 1
+        ):
+            index_manifest, index_arrays = ColumnarStorageService.encode_series(
+                df.index.to_series(index=pd.RangeIndex(len(df))), "index"
+            )
+            arrays.update(index_arrays)
+
+        manifest = {
+            "format_version": ColumnarStorageService.format_version,
+            "num_rows": len(df),
+            "columns": columns,
+            "index": index_manifest,
+        }
+
+        return manifest, arrays
+
+    @staticmethod
+    def encode_series(series, prefix):
+        """Converts a Series into its column manifest and the arrays to be stored."""
+        dtype = series.dtype
+
+        # Categorical: integer codes plus the encoded categories
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories_manifest, categories_arrays = (
+                ColumnarStorageService.encode_series(
+                    pd.Series(dtype.categories), f"{prefix}_categories"
+                )
+            )
+            arrays = {f"{prefix}.npy": np.asarray(series.cat.codes)}
+            arrays.update(categories_arrays)
+            return {
+                "kind": "category",
+                "file": f"{prefix}.npy",
+                "ordered": bool(dtype.ordered),
+                "categories": categories_manifest,
+            }, arrays
+
+        # Period: integer ordinals plus the dtype, e.g. 'period[Q-DEC]', whose period
+        # alias (unlike the offset's, e.g. 'QE-DEC') a PeriodDtype is created from
+        if isinstance(dtype, pd.PeriodDtype):
+            return {
+                "kind": "period",
+                "file": f"{prefix}.npy",
+                "dtype": str(dtype),
+            }, {f"{prefix}.npy": np.asarray(series.array.asi8)}
+
+        # Timezone-aware datetimes: UTC values plus the timezone
+        if isinstance(dtype, pd.DatetimeTZDtype):
+            values = series.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy()
+            return {
+                "kind": "datetime",
+                "file": f"{prefix}.npy",
+                "tz": str(dtype.tz),
+            }, {f"{prefix}.npy": values}
+
+        # Plain NumPy columns (numbers, booleans, naive datetimes and timedeltas)
+        if isinstance(dtype, np.dtype) and dtype.kind in "biufcmM":
+            return {
+                "kind": "numpy",
+                "file": f"{prefix}.npy",
+            }, {f"{prefix}.npy": series.to_numpy()}
+
+        # Nullable numeric extension columns are stored as floats with NaN for missing values
+        if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(
+            dtype
+        ):
+            return {
+                "kind": "numpy",
+                "file": f"{prefix}.npy",
+            }, {f"{prefix}.npy": series.to_numpy(dtype="float64", na_value=np.nan)}
+
+        # Everything else is stored as fixed-width unicode strings with a missing-value mask
+        is_missing = series.isna().to_numpy()
+        values = series.astype(str).to_numpy().astype(str)
+        column_manifest = {"kind": "string", "file": f"{prefix}.npy", "mask": None}
+        arrays = {f"{prefix}.npy": values}
+
+        if is_missing.any():
+            column_manifest["mask"] = f"{prefix}_mask.npy"
+            arrays[f"{prefix}_mask.npy"] = is_missing
+
+        return column_manifest, arrays
+
+    @staticmethod
+    def hash_encoded(manifest, arrays):
+        """Returns the content hash of an encoded DataFrame."""
+        hasher = hashlib.sha256()
+        hasher.update(json.dumps(manifest, sort_keys=True).encode("utf-8"))
+
+        for filename in sorted(arrays):
+            array = np.ascontiguousarray(arrays[filename])
+            hasher.update(filename.encode("utf-8"))
+            hasher.update(array.dtype.str.encode("utf-8"))
+            hasher.update(str(array.shape).encode("utf-8"))
+            hasher.update(array.view(np.uint8))
+
+        return hasher.hexdigest()
+
+    @staticmethod
+    def hash_dataframe(df):
+        """Returns the content hash of a DataFrame."""
+        return ColumnarStorageService.hash_encoded(
+            *ColumnarStorageService.encode_dataframe(df)
+        )
+
+    @staticmethod
+    def write_encoded(manifest, arrays, directory):
+        """Writes an encoded DataFrame into the given directory."""
+        os.makedirs(directory, exist_ok=True)
+
+        for filename, array in arrays.items():
+            np.save(os.path.join(directory, filename), array, allow_pickle=False)
+
+        # The manifest is written last, so a directory with a manifest is complete
+        with open(
+            os.path.join(directory, ColumnarStorageService.manifest_filename), "w"
+        ) as f:
+            json.dump(manifest, f)
+
+    @staticmethod
+    def write_dataframe(df, directory):
+        """Writes a DataFrame into the given directory in the columnar format."""
+        manifest, arrays = ColumnarStorageService.encode_dataframe(df)
+        ColumnarStorageService.write_encoded(manifest, arrays, directory)
+
+    @staticmethod
+    def is_columnar(path):
+        """Checks if the path is a directory written in the columnar format."""
+        return os.path.isfile(
+            os.path.join(path, ColumnarStorageService.manifest_filename)
+        )
+
+    @staticmethod
+    def read_dataframe(directory, columns=None, mmap=True):
+        """Reads a DataFrame from a columnar directory.
+        With mmap, the columns are copy-on-write memory maps of the stored files."""
+        with open(
+            os.path.join(directory, ColumnarStorageService.manifest_filename)
+        ) as f:
+            manifest = json.load(f)
+
+        mmap_mode = "c" if mmap else None
+
+        data = {}
+        for column_manifest in manifest["columns"]:
+            if columns is not None and column_manifest["name"] not in columns:
+                continue
+            data[column_manifest["name"]] = ColumnarStorageService.decode_series(
+                column_manifest, directory, mmap_mode
+            )
+
+        index = None
+        if manifest["index"] is not None:
+            index = pd.Index(
+                ColumnarStorageService.decode_series(
+                    manifest["index"], directory, mmap_mode
+                )
+            )
+
+        df = pd.DataFrame(data, index=index, copy=False)
+
+        # Keep the requested column order
+        if columns is not None:
+            df = df[[column for column in columns if column in df.columns]]
+
+        return df
+
+    @staticmethod
+    def decode_series(column_manifest, directory, mmap_mode):
+        """Reads the values of a single column from a columnar directory."""
+        values = np.load(
+            os.path.join(directory, column_manifest["file"]),
+            mmap_mode=mmap_mode,
+            allow_pickle=False,
+        )
+        kind = column_manifest["kind"]
+
+        if kind == "numpy":
+            return values
+
+        if kind == "category":
+            categories = ColumnarStorageService.decode_series(
+                column_manifest["categories"], directory, None
+            )
+            return pd.Categorical.from_codes(
+                values, categories, ordered=column_manifest["ordered"]
+            )
+
+        if kind == "period":
+            return pd.arrays.PeriodArray(
+                np.asarray(values), dtype=pd.PeriodDtype(column_manifest["dtype"])
+            )
+
+        if kind == "datetime":
+            return pd.DatetimeIndex(values).tz_localize("UTC").tz_convert(
+                column_manifest["tz"]
+            )
+
+        if kind == "string":
+            strings = values.astype(object)
+            if column_manifest["mask"] is not None:
+                is_missing = np.load(os.path.join(directory, column_manifest["mask"]))
+                strings[is_missing] = np.nan
+            return strings
+
+        raise ValueError(f"Unsupported column kind {kind}")
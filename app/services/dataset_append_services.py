@@ -0,0 +1,255 @@
+import hashlib
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from flask import session
+
+from app.services.artifact_store_services import ArtifactStoreService
+from app.services.columnar_storage_services import ColumnarStorageService
+from app.services.segmentation.customer_aggregation_services import (
+    CustomerAggregationService,
+)
+from app.services.streaming_ingestion_services import FingerprintSet, RunningAggregate
+from app.services.timeframe_feature_services import TimeframeFeatureService
+from app.services.timeframe_key_services import TimeframeKeyService
+
+# Aggregates a stored dataset can be appended to: the sums of each product and each
+# customer per order date, and the sorted fingerprints of its distinct cleaned rows
+DatasetBase = namedtuple("DatasetBase", ["products", "customers", "fingerprints"])
+
+
+class DatasetAppendService:
+    """Appends the rows of a delta file to a stored dataset without parsing or
+    cleaning the stored rows again. Each stored dataset keeps its aggregates next to
+    it; the new rows of the delta, told apart from the stored ones by their
+    fingerprints, are aggregated and merged into them. Features are engineered again
+    only for the products and customers in the delta, and the features of a product
+    only from the first period the delta falls in, as earlier periods are unchanged."""
+
+    # Suffix of the directory of the aggregates stored next to a preprocessed dataset
+    base_suffix = ".base"
+
+    # Key and value columns of the product and customer aggregates
+    product_keys = ["Product ID", "Order Date"]
+    product_cols = ["Price", "Quantity", "Sales", TimeframeFeatureService.count_col]
+    customer_keys = ["Customer ID", "Order Date"]
+    customer_cols = ["Quantity", "Sales"]
+
+    # Session key of the features of each timeframe
+    timeframe_session_keys = {
+        "weekly": "prediction_df_weekly_id",
+        "monthly": "prediction_df_monthly_id",
+        "quarterly": "prediction_df_quarterly_id",
+    }
+
+    @staticmethod
+    def aggregate(df, key_cols, value_cols):
+        """Returns the sums of the value columns per key, ordered by key, with IDs
+        as strings."""
+        running_aggregate = RunningAggregate(key_cols, value_cols)
+        running_aggregate.add(df)
+        df_aggregated = running_aggregate.get_result()
+
+        return df_aggregated.astype({key_cols[0]: str})
+
+    @staticmethod
+    def get_base(df_cleaned, fingerprints=None):
+        """Returns the aggregates of a cleaned dataset, fingerprinting its rows unless
+        their fingerprints are given."""
+        df = df_cleaned.assign(
+            **{TimeframeFeatureService.count_col: np.ones(len(df_cleaned), np.int64)}
+        )
+
+        if fingerprints is None:
+            fingerprints = FingerprintSet(
+                FingerprintSet.fingerprint_rows(df_cleaned)
+            ).to_array()
+
+        return DatasetBase(
+            DatasetAppendService.aggregate(
+                df, DatasetAppendService.product_keys, DatasetAppendService.product_cols
+            ),
+            DatasetAppendService.aggregate(
+                df,
+                DatasetAppendService.customer_keys,
+                DatasetAppendService.customer_cols,
+            ),
+            fingerprints,
+        )
+
+    @staticmethod
+    def get_streamed_base(streamed_dataset):
+        """Returns the aggregates of a streamed dataset, which are already kept."""
+        return DatasetBase(
+            streamed_dataset.products,
+            streamed_dataset.customers,
+            streamed_dataset.fingerprints,
+        )
+
+    @staticmethod
+    def get_base_path(file_path):
+        """Returns the directory of the aggregates of a preprocessed dataset."""
+        return f"{file_path}{DatasetAppendService.base_suffix}"
+
+    @staticmethod
+    def save_base(base, file_path):
+        """Saves the aggregates next to the preprocessed dataset."""
+        base_path = DatasetAppendService.get_base_path(file_path)
+
+        ColumnarStorageService.write_dataframe(
+            base.products, os.path.join(base_path, "products")
+        )
+        ColumnarStorageService.write_dataframe(
+            base.customers, os.path.join(base_path, "customers")
+        )
+        ColumnarStorageService.write_dataframe(
+            pd.DataFrame({"Fingerprint": base.fingerprints}),
+            os.path.join(base_path, "fingerprints"),
+        )
+
+    @staticmethod
+    def load_base(file_path):
+        """Returns the aggregates saved next to a preprocessed dataset, or None if
+        there are none."""
+        base_path = DatasetAppendService.get_base_path(file_path)
+        paths = [
+            os.path.join(base_path, name)
+            for name in ["products", "customers", "fingerprints"]
+        ]
+        if not all(ColumnarStorageService.is_columnar(path) for path in paths):
+            return None
+
+        products, customers, fingerprints = [
+            ColumnarStorageService.read_dataframe(path, mmap=False) for path in paths
+        ]
+
+        return DatasetBase(
+            products, customers, fingerprints["Fingerprint"].to_numpy(np.uint64)
+        )
+
+    @staticmethod
+    def get_appended_hash(content_hash, delta_hash):
+        """Returns the content hash of a dataset with a delta file appended."""
+        return hashlib.sha256(f"{content_hash}+{delta_hash}".encode()).hexdigest()
+
+    @staticmethod
+    def merge(base, df_delta):
+        """Merges the rows of a cleaned delta not already in the stored dataset into
+        its aggregates. Returns the merged aggregates and those of the new rows."""
+        fingerprints = FingerprintSet(base.fingerprints)
+        delta_fingerprints = FingerprintSet.fingerprint_rows(df_delta)
+        is_new = fingerprints.add_new(delta_fingerprints)
+
+        delta_base = DatasetAppendService.get_base(
+            df_delta[is_new], np.sort(delta_fingerprints[is_new])
+        )
+
+        merged = {}
+        for name, key_cols, value_cols in [
+            (
+                "products",
+                DatasetAppendService.product_keys,
+                DatasetAppendService.product_cols,
+            ),
+            (
+                "customers",
+                DatasetAppendService.customer_keys,
+                DatasetAppendService.customer_cols,
+            ),
+        ]:
+            running_aggregate = RunningAggregate(key_cols, value_cols)
+            running_aggregate.add(getattr(base, name))
+            running_aggregate.add(getattr(delta_base, name))
+            merged[name] = running_aggregate.get_result()
+
+        return (
+            DatasetBase(
+                merged["products"], merged["customers"], fingerprints.to_array()
+            ),
+            delta_base,
+        )
+
+    @staticmethod
+    def update_timeframe_features(df_features, products, delta_products, timeframe):
+        """Returns the features of a timeframe with those of the products in the delta
+        engineered again from the first period of the delta on."""
+        key_col = TimeframeKeyService.key_cols[timeframe]
+        feature_cols = [
+            col
+            for col in TimeframeFeatureService.get_feature_cols(timeframe)
+            if col in df_features.columns
+        ]
+
+        product_ids = pd.unique(delta_products["Product ID"])
+        first_key = TimeframeKeyService.get_codes(delta_products["Order Date"])[
+            key_col
+        ].min()
+
+        # Later periods of a product depend on its earlier ones, through the lag
+        # features and the periods dropped at its start, so its history is used
+        df_products = products[products["Product ID"].isin(product_ids)]
+        df_new = TimeframeFeatureService.engineer_features(
+            TimeframeKeyService.engineer_timeframe_keys(df_products),
+            timeframe,
+            feature_cols,
+        )
+
+        is_kept = ~df_features["Product ID"].isin(product_ids).to_numpy() | (
+            df_features[key_col].to_numpy() < first_key
+        )
+        df_updated = pd.concat(
+            [df_features[is_kept], df_new[df_new[key_col] >= first_key]],
+            ignore_index=True,
+        )
+
+        return df_updated.sort_values(
+            ["Product ID", key_col], kind="stable", ignore_index=True
+        )
+
+    @staticmethod
+    def update_customer_features(df_features, customers, delta_customers):
+        """Returns the segmentation features with those of the customers in the delta
+        engineered again."""
+        customer_ids = pd.unique(delta_customers["Customer ID"])
+
+        df_new = CustomerAggregationService.engineer_features(
+            customers[customers["Customer ID"].isin(customer_ids)]
+        )
+        df_updated = pd.concat(
+            [df_features[~df_features["Customer ID"].isin(customer_ids)], df_new],
+            ignore_index=True,
+        )
+
+        return df_updated.sort_values("Customer ID", kind="stable", ignore_index=True)
+
+    @staticmethod
+    def append_features(ml_process, df_stored, record, merged, delta_base):
+        """Returns the preprocessed dataset of the ML process with the delta appended:
+        the stored segmentation features, or the timeframe features of the recorded
+        upload, which are saved into the artifact store for the session."""
+        if ml_process == "segmentation":
+            return DatasetAppendService.update_customer_features(
+                df_stored, merged.customers, delta_base.customers
+            )
+
+        frames = []
+        session_keys = DatasetAppendService.timeframe_session_keys
+        for timeframe, session_key in session_keys.items():
+            df_features = DatasetAppendService.update_timeframe_features(
+                ArtifactStoreService.load_dataframe(record[session_key]),
+                merged.products,
+                delta_base.products,
+                timeframe,
+            )
+            session[session_key] = ArtifactStoreService.save_dataframe(df_features)
+            frames.append(df_features)
+
+        # Customer segments only need the sums of each customer per order date
+        if ml_process == "optimization":
+            session["optimization_df_original_id"] = (
+                ArtifactStoreService.save_dataframe(merged.customers)
+            )
+
+        return pd.concat(frames, axis=0, ignore_index=True)
@@ -0,0 +1,208 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.dtype_policy_services import DtypePolicyService
+
+# Problem found in a dataset, with the spreadsheet rows of its first occurrences
+Problem = namedtuple("Problem", ["description", "count", "rows"])
+
+
+class ValidationReport:
+    """Every problem found in a dataset by one validation scan. Missing columns,
+    non-numeric cells, and unparsable dates make the dataset invalid; rows with missing
+    values, duplicates, or non-positive values are dropped by cleaning. The cleaned
+    dataset is kept with the report, so a valid dataset is never scanned again."""
+
+    def __init__(self, num_rows):
+        self.num_rows = num_rows
+        self.missing_cols = []
+        self.errors = []
+        self.warnings = []
+        self.df_cleaned = None
+
+    @property
+    def is_valid(self):
+        return not self.missing_cols and not self.errors
+
+    @staticmethod
+    def format_problems(problems):
+        """Returns the problems as a comma-separated list with their sample rows."""
+        descriptions = []
+        for problem in problems:
+            rows = ", ".join(str(row) for row in problem.rows)
+            if problem.count > len(problem.rows):
+                rows += ", ..."
+            descriptions.append(f"{problem.count} {problem.description} (rows {rows})")
+
+        return ", ".join(descriptions)
+
+    def get_message(self):
+        """Returns the report as a message for the user."""
+        if self.missing_cols:
+            return f"Missing columns: {', '.join(self.missing_cols)}."
+
+        if self.errors:
+            message = (
+                f"Incorrect datatypes: {ValidationReport.format_problems(self.errors)}."
+            )
+        else:
+            message = "Valid dataset."
+
+        if self.warnings:
+            message += (
+                " Dropped when cleaning: "
+                f"{ValidationReport.format_problems(self.warnings)}."
+            )
+
+        return message
+
+    def to_dict(self):
+        """Returns the report as a JSON-serializable dictionary."""
+        return {
+            "is_valid": self.is_valid,
+            "num_rows": self.num_rows,
+            "missing_cols": self.missing_cols,
+            "errors": [problem._asdict() for problem in self.errors],
+            "warnings": [problem._asdict() for problem in self.warnings],
+        }
+
+
+class DatasetValidationService:
+    """Validates and cleans a dataset in one vectorized scan. Each check computes a
+    mask over the rows instead of stopping at the first failure, so every problem is
+    counted and reported at once, and the masks of the dropped rows are combined to
+    clean the dataset with a single selection."""
+
+    # Columns required in the dataset
+    required_cols = [
+        "Product ID",
+        "Customer ID",
+        "Order Date",
+        "Price",
+        "Quantity",
+        "Sales",
+    ]
+
+    # ID columns of the dataset
+    idcols = ["Product ID", "Customer ID"]
+
+    # Numerical columns of the dataset, which must be positive
+    numcols = ["Quantity", "Sales", "Price"]
+
+    # Date column of the dataset
+    datecol = "Order Date"
+
+    # Number of rows listed per problem
+    num_sample_rows = 5
+
+    @staticmethod
+    def get_problem(description, mask):
+        """Returns the problem of the rows of a mask, or None if there are none."""
+        positions = np.flatnonzero(mask)
+        if len(positions) == 0:
+            return None
+
+        # Rows as numbered in a spreadsheet, below the header row
+        sample_rows = positions[: DatasetValidationService.num_sample_rows] + 2
+        return Problem(description, len(positions), sample_rows.tolist())
+
+    @staticmethod
+    def get_non_numeric(series):
+        """Returns which cells of a column hold a value other than a number."""
+        dtype = series.dtype
+        if isinstance(dtype, np.dtype) and np.issubdtype(dtype, np.number):
+            return np.zeros(len(series), dtype=bool)
+
+        is_present = series.notna().to_numpy()
+        if dtype != object:
+            return is_present
+
+        # A column with any text is read as text, its other cells may still be numbers
+        is_number = pd.to_numeric(series, errors="coerce").notna().to_numpy()
+
+        return is_present & ~is_number
+
+    @staticmethod
+    def validate(df):
+        """Validates the dataset and, if valid, cleans it. Returns the report of every
+        problem found, holding the cleaned dataset if valid."""
+        report = ValidationReport(len(df))
+        report.missing_cols = [
+            col
+            for col in DatasetValidationService.required_cols
+            if col not in df.columns
+        ]
+        if report.missing_cols:
+            return report
+
+        memory_per_row = DtypePolicyService.get_memory_per_row(df)
+        df = df[DatasetValidationService.required_cols]
+        problems = []
+
+        # Cells of the wrong datatype
+        columns = {}
+        for col in DatasetValidationService.numcols:
+            is_non_numeric = DatasetValidationService.get_non_numeric(df[col])
+            problems.append(
+                DatasetValidationService.get_problem(
+                    f"non-numeric cells in {col}", is_non_numeric
+                )
+            )
+            columns[col] = df[col]
+            if is_non_numeric.any() or df[col].dtype == object:
+                columns[col] = pd.to_numeric(df[col], errors="coerce")
+
+        columns[DatasetValidationService.datecol] = DtypePolicyService.parse_dates(
+            df[DatasetValidationService.datecol], errors="coerce"
+        )
+        problems.append(
+            DatasetValidationService.get_problem(
+                f"unparsable dates in {DatasetValidationService.datecol}",
+                columns[DatasetValidationService.datecol].isna().to_numpy(),
+            )
+        )
+        report.errors = [problem for problem in problems if problem is not None]
+
+        # Rows dropped by cleaning: missing values, then duplicates of earlier rows,
+        # then impossible/nonsensical values among the rest
+        is_dropped = df.isna().any(axis=1).to_numpy()
+        df = df.assign(**columns)
+        problems = [
+            DatasetValidationService.get_problem("rows with missing values", is_dropped)
+        ]
+
+        is_duplicate = df.duplicated().to_numpy() & ~is_dropped
+        problems.append(
+            DatasetValidationService.get_problem("duplicate rows", is_duplicate)
+        )
+        is_dropped |= is_duplicate
+
+        is_non_positive = np.zeros(len(df), dtype=bool)
+        for col in ["Price", "Quantity", "Sales"]:
+            is_col_non_positive = (df[col] <= 0).to_numpy() & ~is_dropped
+            problems.append(
+                DatasetValidationService.get_problem(
+                    f"rows with non-positive {col}", is_col_non_positive
+                )
+            )
+            is_non_positive |= is_col_non_positive
+        is_dropped |= is_non_positive
+        report.warnings = [problem for problem in problems if problem is not None]
+
+        if report.is_valid:
+            report.df_cleaned = DtypePolicyService.apply(
+                df[~is_dropped],
+                DatasetValidationService.idcols,
+                DatasetValidationService.numcols,
+                DatasetValidationService.datecol,
+            )
+
+            print(
+                f"Memory per row: {memory_per_row:.1f} bytes before cleaning, "
+                f"{DtypePolicyService.get_memory_per_row(report.df_cleaned):.1f} "
+                "bytes after"
+            )
+
+        return report
@@ -1,6 +1,5 @@
 import os
 import uuid
-from io import BytesIO
 from datetime import datetime
 
 import pandas as pd
@@ -10,6 +9,12 @@ from flask import current_app, jsonify, session
 from flask_login import current_user
 from app import db
 from app.models.DatasetFile.model import DatasetFile
+from app.services.columnar_storage_services import ColumnarStorageService
+from app.services.dataset_append_services import DatasetAppendService
+from app.services.dataset_validation_services import DatasetValidationService
+from app.services.dtype_policy_services import DtypePolicyService
+from app.services.excel_ingestion_services import ExcelIngestionService
+from app.services.upload_record_services import UploadRecordService
 
 
 class DatasetFileService:
@@ -32,21 +37,52 @@ class DatasetFileService:
     # Date column of the dataset
     datecol = "Order Date"
 
+    # File extensions of the formats the preprocessed datasets can be stored in
+    storage_extensions = {
+        "columnar": ".columnar",
+        "csv": ".csv",
+    }
+
     @staticmethod
-    def save_datasetfile(file, ml_process):
-        """Saves the user-uploaded dataset file, as well as its metadata in the database."""
+    def save_datasetfile(
+        file,
+        ml_process,
+        df=None,
+        streamed_dataset=None,
+        df_cleaned=None,
+        content_hash=None,
+    ):
+        """Saves the user-uploaded dataset file, as well as its metadata in the database.
+        An already parsed DataFrame of the file can be passed to avoid parsing it again,
+        the dataset cleaned while being validated to avoid cleaning it again, or the
+        aggregates of a file ingested in chunks to avoid parsing it at all. The content
+        hash of the file, if given, lets later uploads of the same file reuse it."""
         try:
-            # Convert the file into a DataFrame
-            df = DatasetFileService.convert_to_df(file)
+            is_parsed = df_cleaned is not None or streamed_dataset is not None
 
-            if df is not None:
-                df = df[DatasetFileService.required_cols]
+            # Convert the file into a DataFrame, unless it was already parsed
+            if df is None and not is_parsed:
+                df = DatasetFileService.convert_to_df(file)
 
+            if df is not None or is_parsed:
                 # Set the correct folder
                 folder = DatasetFileService.set_correct_folder(ml_process)
 
-                # Preprocess the dataset
-                df_preprocessed = DatasetFileService.preprocess_dataset(df, ml_process)
+                # Preprocess the dataset, already cleaned and aggregated if streamed
+                if streamed_dataset is not None:
+                    df_preprocessed = DatasetFileService.engineer_streamed_features(
+                        streamed_dataset, ml_process
+                    )
+                    base = DatasetAppendService.get_streamed_base(streamed_dataset)
+                else:
+                    if df_cleaned is None:
+                        df_cleaned = DatasetFileService.clean_dataset(
+                            df[DatasetFileService.required_cols]
+                        )
+                    df_preprocessed = DatasetFileService.engineer_features(
+                        df_cleaned, ml_process
+                    )
+                    base = DatasetAppendService.get_base(df_cleaned)
 
                 # Generate a unique filename
                 unique_filename = DatasetFileService.generate_unique_filename(file)
@@ -57,18 +93,18 @@ class DatasetFileService:
                 # Set the file path into the session
                 session["dataset_file_path"] = file_path
 
-                # Convert the file into a CSV string
-                df_csv_string = DatasetFileService.convert_to_csv(df_preprocessed)
-
-                # Save the CSV content to the file
-                with open(file_path, "wb") as f:
-                    f.write(df_csv_string.getvalue())
+                # Save the preprocessed dataset to the file, with the aggregates
+                # later rows can be appended to
+                DatasetFileService.write_dataset(df_preprocessed, file_path)
+                DatasetAppendService.save_base(base, file_path)
 
                 # Save the metadata to the database
                 metadata = DatasetFile(
                     file_path=file_path,
                     upload_datetime=datetime.utcnow(),
                     branch_id=current_user.id,
+                    content_hash=content_hash,
+                    ml_process=ml_process,
                 )
 
                 # Add to the db and commit
@@ -87,14 +123,169 @@ class DatasetFileService:
         except Exception as e:
             print(f"Error while saving dataset file: {e}")
             db.session.rollback()  # In case of failure, rollback the session
-            return False  # Return False
+            return False, None  # Return False and no dataset file id
+
+    @staticmethod
+    def append_datasetfile(file, dataset_file_id):
+        """Appends the rows of a delta file to a dataset file of the branch, and saves
+        the result as a new dataset file. Only the delta is parsed and cleaned; its
+        new rows are merged into the aggregates stored with the dataset file, and only
+        the features they affect are engineered again.
+        Returns the success, a message, and the id of the new dataset file."""
+        try:
+            dataset_file = DatasetFile.query.get(dataset_file_id)
+            if dataset_file is None or dataset_file.branch_id != current_user.id:
+                return False, "Dataset file not found.", None
+
+            # Aggregates and results of the dataset file, kept since it was uploaded
+            ml_process = dataset_file.ml_process
+            base = DatasetAppendService.load_base(dataset_file.file_path)
+            record = None
+            if dataset_file.content_hash is not None:
+                record = UploadRecordService.get_complete_record(
+                    dataset_file.content_hash, ml_process
+                )
+            if base is None or record is None:
+                return (
+                    False,
+                    "Dataset file can't be appended to. Upload the whole file instead.",
+                    None,
+                )
+
+            # Validate and clean the delta in one scan
+            delta_hash = DatasetFileService.get_content_hash(file)
+            df_delta = DatasetFileService.convert_to_df(file)
+            if df_delta is None:
+                return False, "Invalid file format.", None
+
+            report = DatasetValidationService.validate(df_delta)
+            if not report.is_valid:
+                return False, report.get_message(), None
+
+            merged, delta_base = DatasetAppendService.merge(base, report.df_cleaned)
+            num_new_rows = len(delta_base.fingerprints)
+
+            # Nothing to append, the dataset file stays as it is
+            if num_new_rows == 0:
+                UploadRecordService.restore_record(record)
+                session["dataset_file_path"] = dataset_file.file_path
+                return True, "No new rows to append.", dataset_file.id
+
+            df_stored = None
+            if ml_process == "segmentation":
+                df_stored = DatasetFileService.read_dataset(dataset_file.file_path)
+            df_preprocessed = DatasetAppendService.append_features(
+                ml_process, df_stored, record, merged, delta_base
+            )
+
+            # Save the appended dataset and its aggregates under a new file path
+            folder = DatasetFileService.set_correct_folder(ml_process)
+            unique_filename = DatasetFileService.generate_unique_filename(file)
+            file_path = os.path.join(folder, os.path.basename(unique_filename))
+            session["dataset_file_path"] = file_path
+
+            DatasetFileService.write_dataset(df_preprocessed, file_path)
+            DatasetAppendService.save_base(merged, file_path)
+
+            # Save the metadata to the database, and record the results for later
+            # appends to the new dataset file
+            content_hash = DatasetAppendService.get_appended_hash(
+                dataset_file.content_hash, delta_hash
+            )
+            metadata = DatasetFile(
+                file_path=file_path,
+                upload_datetime=datetime.utcnow(),
+                branch_id=current_user.id,
+                content_hash=content_hash,
+                ml_process=ml_process,
+            )
+            db.session.add(metadata)
+            db.session.commit()
+            UploadRecordService.save_record(content_hash, ml_process)
+
+            return True, f"Appended {num_new_rows} new rows.", metadata.id
+
+        except Exception as e:
+            print(f"Error while appending dataset file: {e}")
+            db.session.rollback()  # In case of failure, rollback the session
+            return False, "Error while appending dataset file.", None
+
+    @staticmethod
+    def get_content_hash(file):
+        """Returns the content hash of the user-uploaded file, read in blocks before
+        it is parsed."""
+        return ExcelIngestionService.get_file_hash(file)
+
+    @staticmethod
+    def find_datasetfile(content_hash, ml_process, branch_id):
+        """Returns the latest dataset file of the branch with the same content and ML
+        process whose preprocessed dataset is still stored, or None."""
+        dataset_files = DatasetFile.query.filter_by(
+            content_hash=content_hash, ml_process=ml_process, branch_id=branch_id
+        ).order_by(DatasetFile.upload_datetime.desc())
+
+        for dataset_file in dataset_files:
+            if os.path.exists(dataset_file.file_path):
+                return dataset_file
+
+        return None
+
+    @staticmethod
+    def reuse_datasetfile(dataset_file):
+        """Saves the metadata of a new upload of the same file as an earlier dataset
+        file, pointing to its preprocessed dataset instead of preprocessing it again."""
+        try:
+            # Set the file path into the session
+            session["dataset_file_path"] = dataset_file.file_path
+
+            # Save the metadata to the database
+            metadata = DatasetFile(
+                file_path=dataset_file.file_path,
+                upload_datetime=datetime.utcnow(),
+                branch_id=current_user.id,
+                content_hash=dataset_file.content_hash,
+                ml_process=dataset_file.ml_process,
+            )
+
+            # Add to the db and commit
+            db.session.add(metadata)
+            db.session.commit()
+
+            return True, metadata.id
+
+        except Exception as e:
+            print(f"Error while reusing dataset file: {e}")
+            db.session.rollback()  # In case of failure, rollback the session
+            return False, None
 
     @staticmethod
-    def get_session_dataframe():
+    def get_session_dataframe(columns=None):
+        """Reads the dataset file of the session, optionally only the given columns."""
         file_path = session.get("dataset_file_path")
 
+        return DatasetFileService.read_dataset(file_path, columns=columns)
+
+    @staticmethod
+    def write_dataset(df, file_path):
+        """Writes the preprocessed dataset to the file path, in the format given by its extension."""
+        # CSV, streamed straight to the file
+        if file_path.endswith(".csv"):
+            df.to_csv(file_path, index=False)
+
+        # Binary columnar directory
+        else:
+            ColumnarStorageService.write_dataframe(df, file_path)
+
+    @staticmethod
+    def read_dataset(file_path, columns=None):
+        """Reads a stored dataset file, optionally only the given columns."""
+        # Binary columnar directory, memory-mapped instead of parsed
+        if ColumnarStorageService.is_columnar(file_path):
+            return ColumnarStorageService.read_dataframe(file_path, columns=columns)
+
+        # CSV
         with open(file_path, "rb") as file:
-            return pd.read_csv(file)
+            return pd.read_csv(file, usecols=columns)
 
     @staticmethod
     def preprocess_dataset(df, ml_process):
@@ -110,23 +301,14 @@ class DatasetFileService:
     def clean_dataset(df):
         """Cleans the dataset by dropping missing values and duplicates,
         dealing with impossible values, and
-        ensuring correct datatype of ID and date columns."""
-
-        # Drop missing values and duplicates
-        df.dropna(inplace=True)
-        df.drop_duplicates(inplace=True)
+        ensuring compact datatypes of ID, numerical, and date columns.
+        The dataset is validated in the same scan, and must be valid."""
+        report = DatasetValidationService.validate(df)
 
-        # Drop impossible/nonsensical values
-        df = df[(df["Price"] > 0) & (df["Quantity"] > 0) & (df["Sales"] > 0)]
+        if not report.is_valid:
+            raise ValueError(report.get_message())
 
-        #  Convert date column to datetime
-        df[DatasetFileService.datecol] = pd.to_datetime(df[DatasetFileService.datecol])
-
-        # Convert ID columns into string
-        for col in DatasetFileService.idcols:
-            df[col] = df[col].astype(str)
-
-        return df
+        return report.df_cleaned
 
     @staticmethod
     def engineer_features(df, ml_process):
@@ -158,6 +340,20 @@ class DatasetFileService:
         else:
             raise ValueError(f"Unsupported ML process {ml_process}")
 
+    @staticmethod
+    def engineer_streamed_features(streamed_dataset, ml_process):
+        """Engineers features according to the ML process from the aggregates of a
+        streamed dataset: those of the customers for segmentation, and those of the
+        products for prediction and optimization."""
+        if ml_process == "segmentation":
+            return DatasetFileService.engineer_features(
+                streamed_dataset.customers, ml_process
+            )
+
+        return DatasetFileService.engineer_features(
+            streamed_dataset.products, ml_process
+        )
+
     @staticmethod
     def set_correct_folder(ml_process):
         """Returns the correct folder based on the ML process."""
@@ -181,27 +377,26 @@ class DatasetFileService:
         # Generate a UUID
         unique_id = str(uuid.uuid4())[:8]  # Shorten UUID to 8 chars
 
+        # Extension of the configured storage format
+        storage_format = current_app.config["DATASET_STORAGE_FORMAT"]
+        if storage_format not in DatasetFileService.storage_extensions:
+            raise ValueError(f"Invalid dataset storage format, {storage_format}")
+        extension = DatasetFileService.storage_extensions[storage_format]
+
         # Combine the UUID and the file extension
-        unique_filename = f"{unique_id}_{file.filename}.csv"
+        unique_filename = f"{unique_id}_{file.filename}{extension}"
         return unique_filename
 
-    @staticmethod
-    def convert_to_csv(df_engineered):
-        """Converts the feature-engineered dataset into a csv string."""
-
-        # Save the converted dataframe into a BytesIO object
-        output = BytesIO()
-        df_engineered.to_csv(output, index=False)  # Saving CSV to BytesIO buffer
-        output.seek(0)  # Rewind to the start of the file
-
-        return output  # Return the in-memory CSV file
-
     @staticmethod
     def convert_to_df(file):
         """Converts files into a Pandas Dataframe."""
         file.seek(0)
-        # Excel
-        if file.filename.endswith((".xls", ".xlsx")):
+        # Excel workbook, streamed and converted once
+        if file.filename.endswith(".xlsx"):
+            df = ExcelIngestionService.read_excel(file)
+
+        # Legacy Excel
+        elif file.filename.endswith(".xls"):
             df = pd.read_excel(file)
 
         # CSV
@@ -219,20 +414,19 @@ class DatasetFileService:
         """Validates the user-uploaded dataset."""
         df = DatasetFileService.convert_to_df(file)
 
+        return DatasetFileService.validate_dataframe(df)
+
+    @staticmethod
+    def validate_dataframe(df):
+        """Validates an already parsed dataset, reporting every problem found."""
         # Check if it is a valid file format
         if df is None:
             return False, "Invalid file format."
 
-        else:
-            # Check first for missing columns
-            if DatasetFileService.has_missing_cols(df):
-                return False, "Missing columns."
-
-            # Check if all columns have correct datatype
-            if not DatasetFileService.has_correct_dtypes(df):
-                return False, "Incorrect datatypes."
+        # Check every column and row in one scan
+        report = DatasetValidationService.validate(df)
 
-        return True, "Valid dataset."
+        return report.is_valid, report.get_message()
 
     @staticmethod
     def has_missing_cols(df):
@@ -269,7 +463,7 @@ class DatasetFileService:
     def validate_datecol(df):
         """Validates the datatype of date column in the dataset."""
         # Convert the date column to datetime datatype, convert to NaN if not possible
-        df[DatasetFileService.datecol] = pd.to_datetime(
+        df[DatasetFileService.datecol] = DtypePolicyService.parse_dates(
             df[DatasetFileService.datecol], errors="coerce"
         )
 
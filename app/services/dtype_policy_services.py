@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+
+class DtypePolicyService:
+    """Stores the columns of a cleaned dataset in compact dtypes. IDs become
+    categoricals of their string values, holding one small integer code per row
+    instead of a Python string; numbers are downcast to 32 bits only where every value
+    is kept exactly; and dates are parsed with one format inferred from the first
+    date, instead of guessing per call."""
+
+    @staticmethod
+    def apply(df, id_cols, num_cols, date_col):
+        """Returns the dataset with its ID, numerical, and date columns in compact
+        dtypes."""
+        columns = {col: DtypePolicyService.compact_ids(df[col]) for col in id_cols}
+        columns.update(
+            {col: DtypePolicyService.downcast_numbers(df[col]) for col in num_cols}
+        )
+        columns[date_col] = DtypePolicyService.parse_dates(df[date_col])
+
+        return df.assign(**columns)
+
+    @staticmethod
+    def compact_ids(series):
+        """Returns the IDs as a categorical of their string values, with categories in
+        string order. Only the distinct IDs are converted to strings, so IDs read as
+        numbers map to the same strings as with astype(str)."""
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+
+        # Distinct IDs with the same string, like 1 and '1', share a category
+        string_codes, categories = pd.factorize(
+            np.asarray(uniques).astype(str), sort=True
+        )
+
+        return pd.Series(
+            pd.Categorical.from_codes(
+                string_codes[codes], categories=pd.Index(categories, dtype=object)
+            ),
+            index=series.index,
+            name=series.name,
+        )
+
+    @staticmethod
+    def downcast_numbers(series):
+        """Returns the numbers as int32 or float32 if each value is kept exactly,
+        otherwise unchanged."""
+        dtype = series.dtype
+        if not isinstance(dtype, np.dtype) or dtype.itemsize <= 4:
+            return series
+
+        values = series.to_numpy()
+
+        if dtype.kind in "iu":
+            info = np.iinfo(np.int32)
+            if len(values) == 0 or (
+                values.min() >= info.min and values.max() <= info.max
+            ):
+                return series.astype(np.int32)
+
+        # Prices with cents rarely survive float32, but whole or halved ones do
+        elif dtype.kind == "f":
+            if np.array_equal(
+                values.astype(np.float32).astype(dtype), values, equal_nan=True
+            ):
+                return series.astype(np.float32)
+
+        return series
+
+    @staticmethod
+    def get_date_format(series):
+        """Returns the format of the first date written as a string, or None if it
+        can't be inferred."""
+        for value in series:
+            if isinstance(value, str):
+                return guess_datetime_format(value)
+            if not pd.isna(value):
+                return None
+
+        return None
+
+    @staticmethod
+    def parse_dates(series, errors="raise"):
+        """Returns the dates as datetime64, parsed with the format of the first date
+        when it can be inferred. Dates not in that format raise, or are NaT if
+        errors is 'coerce', as they would by default."""
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            return series
+
+        date_format = DtypePolicyService.get_date_format(series)
+
+        return pd.to_datetime(series, format=date_format, errors=errors)
+
+    @staticmethod
+    def get_memory_per_row(df):
+        """Returns the bytes held per row by the dataset, object values included."""
+        if len(df) == 0:
+            return 0.0
+
+        return df.memory_usage(index=False, deep=True).sum() / len(df)
@@ -0,0 +1,100 @@
+import hashlib
+
+from openpyxl import load_workbook
+import pandas as pd
+
+from app.services.artifact_store_services import ArtifactStoreService
+
+
+class ExcelIngestionService:
+    """Reads .xlsx uploads without building a DataFrame of every cell.
+    The first worksheet is streamed row by row in read-only mode and only the required
+    columns are kept. The result is stored in the artifact store under the hash of the
+    workbook, so later reads of the same workbook load the columnar copy instead."""
+
+    # Columns read from the workbook
+    required_cols = [
+        "Product ID",
+        "Customer ID",
+        "Order Date",
+        "Price",
+        "Quantity",
+        "Sales",
+    ]
+
+    # Number of bytes of the workbook hashed at a time
+    hash_block_size = 1024**2
+
+    @staticmethod
+    def get_file_hash(file):
+        """Returns the content hash of an uploaded file."""
+        hasher = hashlib.sha256()
+
+        file.seek(0)
+        for block in iter(
+            lambda: file.read(ExcelIngestionService.hash_block_size), b""
+        ):
+            hasher.update(block)
+        file.seek(0)
+
+        return hasher.hexdigest()
+
+    @staticmethod
+    def read_excel(file):
+        """Returns the required columns of the first worksheet of an .xlsx file,
+        converting the workbook only if it has not been converted before."""
+        alias = f"xlsx-{ExcelIngestionService.get_file_hash(file)}"
+
+        artifact_id = ArtifactStoreService.load_alias(alias)
+        if artifact_id is not None:
+            print(f"Reusing converted workbook, {artifact_id}")
+
+            # Read into memory, as a parsed workbook is, not memory-mapped
+            return ArtifactStoreService.load_dataframe(artifact_id, mmap=False)
+
+        df = ExcelIngestionService.parse_workbook(file)
+        ArtifactStoreService.save_alias(alias, ArtifactStoreService.save_dataframe(df))
+
+        return df
+
+    @staticmethod
+    def parse_workbook(file):
+        """Streams the rows of the first worksheet and returns its required columns,
+        with their types inferred as pandas infers the cells of a worksheet."""
+        workbook = load_workbook(file, read_only=True, data_only=True)
+
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, ())
+
+            # Position of each required column present in the header
+            positions = {}
+            for position, name in enumerate(header):
+                name = str(name) if name is not None else None
+                is_required = name in ExcelIngestionService.required_cols
+                if is_required and name not in positions:
+                    positions[name] = position
+
+            columns = {name: [] for name in positions}
+            num_rows = 0
+            num_filled_rows = 0
+
+            for row in rows:
+                num_rows += 1
+                for name, position in positions.items():
+                    value = row[position] if position < len(row) else None
+                    columns[name].append(value)
+
+                if any(value is not None for value in row):
+                    num_filled_rows = num_rows
+        finally:
+            workbook.close()
+
+        # Trailing empty rows, left behind by formatting, are not part of the data
+        return pd.DataFrame(
+            {
+                name: pd.Series(values[:num_filled_rows])
+                for name, values in columns.items()
+            },
+            columns=list(positions),
+        )
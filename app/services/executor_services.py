@@ -0,0 +1,47 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class ExecutorService:
+    """Process-wide worker pools, created on first use and shared between requests."""
+
+    # Kinds of worker pools
+    executor_kinds = ("process", "thread")
+
+    # Created pools by name
+    _executors = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_executor(name, kind="thread", max_workers=None):
+        """Returns the pool with the given name, creating it if it doesn't exist."""
+        with ExecutorService._lock:
+            executor = ExecutorService._executors.get(name)
+
+            if executor is None:
+                if kind == "process":
+                    # Spawned workers do not inherit the OpenMP state of the server process
+                    executor = ProcessPoolExecutor(
+                        max_workers=max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                elif kind == "thread":
+                    executor = ThreadPoolExecutor(
+                        max_workers=max_workers, thread_name_prefix=name
+                    )
+                else:
+                    raise ValueError(f"Invalid executor kind, {kind}")
+
+                ExecutorService._executors[name] = executor
+
+            return executor
+
+    @staticmethod
+    def discard_executor(name):
+        """Shuts down and forgets the pool with the given name, e.g. after a worker crashed."""
+        with ExecutorService._lock:
+            executor = ExecutorService._executors.pop(name, None)
+
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,105 @@
+import json
+import os
+import uuid
+
+from app.services.artifact_store_services import ArtifactStoreService
+from app.services.columnar_storage_services import ColumnarStorageService
+from app.services.timeframe_feature_services import TimeframeFeatureService
+from app.services.timeframe_key_services import TimeframeKeyService
+
+
+class FeatureCacheService:
+    """Caches the weekly, monthly, and quarterly features engineered from a cleaned
+    dataset, so prediction and optimization uploads of the same file engineer them
+    once. Entries are keyed by the content hash of the dataset and the version of the
+    feature pipeline, and point to the engineered frames in the artifact store."""
+
+    # Version of the feature pipeline, to be raised whenever the engineered features
+    # change so that features cached by an earlier version are not reused
+    pipeline_version = 1
+
+    # Folder of the cache entries, inside the artifact store
+    folder_name = "feature-cache"
+
+    @staticmethod
+    def get_cache_key(df_original):
+        """Returns the cache key of a cleaned dataset."""
+        content_hash = ColumnarStorageService.hash_dataframe(df_original)
+        return f"{content_hash}-v{FeatureCacheService.pipeline_version}"
+
+    @staticmethod
+    def get_entry_path(cache_key):
+        """Returns the file of a cache entry, creating the folder if it doesn't
+        exist."""
+        folder = os.path.join(
+            ArtifactStoreService.get_artifact_folder(), FeatureCacheService.folder_name
+        )
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, f"{cache_key}.json")
+
+    @staticmethod
+    def load_entry(cache_key):
+        """Returns the artifact id and features of each cached timeframe of a key."""
+        try:
+            with open(FeatureCacheService.get_entry_path(cache_key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def save_entry(cache_key, entry):
+        """Saves a cache entry, replacing the previous one at once."""
+        entry_path = FeatureCacheService.get_entry_path(cache_key)
+        temp_path = f"{entry_path}.tmp-{uuid.uuid4().hex}"
+
+        with open(temp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(temp_path, entry_path)
+
+    @staticmethod
+    def get_timeframe_features(df_original, feature_cols_by_timeframe):
+        """Returns the artifact id and the frame of the features of each timeframe.
+        Cached frames holding every requested feature are reused; otherwise the frame
+        is engineered with the requested and the cached features, so it serves both."""
+        cache_key = FeatureCacheService.get_cache_key(df_original)
+        entry = FeatureCacheService.load_entry(cache_key)
+        df_timeframes = None
+        is_updated = False
+        features = {}
+
+        for timeframe, feature_cols in feature_cols_by_timeframe.items():
+            cached = entry.get(timeframe)
+
+            if cached and set(feature_cols) <= set(cached["feature_cols"]):
+                df_features = ArtifactStoreService.load_dataframe(cached["artifact_id"])
+
+                if df_features is not None:
+                    print(f"Reusing cached {timeframe} features, {cache_key}")
+                    features[timeframe] = (cached["artifact_id"], df_features)
+                    continue
+
+            # Engineer the union of the requested and the cached features
+            cached_cols = cached["feature_cols"] if cached else []
+            feature_cols = list(cached_cols) + [
+                col for col in feature_cols if col not in cached_cols
+            ]
+
+            if df_timeframes is None:
+                df_timeframes = TimeframeKeyService.engineer_timeframe_keys(df_original)
+
+            df_features = TimeframeFeatureService.engineer_features(
+                df_timeframes, timeframe, feature_cols
+            )
+            artifact_id = ArtifactStoreService.save_dataframe(df_features)
+
+            entry[timeframe] = {
+                "artifact_id": artifact_id,
+                "feature_cols": feature_cols,
+            }
+            features[timeframe] = (artifact_id, df_features)
+            is_updated = True
+
+        if is_updated:
+            FeatureCacheService.save_entry(cache_key, entry)
+
+        return features
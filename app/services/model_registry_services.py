@@ -0,0 +1,69 @@
+import os
+import threading
+
+from flask import current_app, has_app_context
+from joblib import load
+
+
+class ModelRegistry:
+    """Process-wide cache of the sales prediction models, shared by the prediction and
+    optimization services. Each timeframe model is loaded from disk once and reloaded
+    only when its file is replaced (its modification time or size changes)."""
+
+    # Filenames of the prediction model of each timeframe
+    model_filenames = {
+        "weekly": "xgboost_weekly.joblib",
+        "monthly": "xgboost_monthly.joblib",
+        "quarterly": "xgboost_quarterly.joblib",
+    }
+
+    # Models folder used outside of an app context, e.g. in optimization worker processes
+    models_folder = None
+
+    # Loaded models by timeframe, as (file signature, model) pairs
+    _models = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_model_path(timeframe):
+        """Returns the path of the model file of the timeframe."""
+        if timeframe not in ModelRegistry.model_filenames:
+            raise ValueError(f"Invalid timeframe, {timeframe}")
+
+        if has_app_context():
+            model_dir = current_app.config["MODELS_FOLDER_PREDICTION"]
+        elif ModelRegistry.models_folder is not None:
+            model_dir = ModelRegistry.models_folder
+        else:
+            raise RuntimeError("The models folder is unknown outside of an app context")
+
+        return os.path.join(model_dir, ModelRegistry.model_filenames[timeframe])
+
+    @staticmethod
+    def get_model(timeframe):
+        """Returns the prediction model of the timeframe, loading it only if not yet cached
+        or if its file has changed since it was loaded."""
+        model_path = ModelRegistry.get_model_path(timeframe)
+        model_stat = os.stat(model_path)
+        signature = (model_path, model_stat.st_mtime_ns, model_stat.st_size)
+
+        cached = ModelRegistry._models.get(timeframe)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        with ModelRegistry._lock:
+            # Another thread may have loaded the model while waiting for the lock
+            cached = ModelRegistry._models.get(timeframe)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+
+            model = load(model_path)
+            ModelRegistry._models[timeframe] = (signature, model)
+
+            return model
+
+    @staticmethod
+    def clear():
+        """Removes every cached model."""
+        with ModelRegistry._lock:
+            ModelRegistry._models.clear()
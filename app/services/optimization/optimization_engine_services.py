@@ -0,0 +1,245 @@
+import numpy as np
+from scipy.optimize import minimize
+
+
+class OptimizationEngine:
+    """Evaluates the total sales predicted for a timeframe under candidate prices.
+    The feature matrix and the latest row of each product are prepared once, so an
+    evaluation only updates the price columns of a preallocated array and calls the model."""
+
+    # Strategies for searching the optimal prices
+    strategies = ("powell", "separable", "grid")
+
+    # Golden ratio conjugate, the fraction kept of the interval in a golden-section search
+    golden_ratio = (np.sqrt(5) - 1) / 2
+
+    def __init__(
+        self, df, model, X_cols, price_col, last_price_col, period_col, progress=None
+    ):
+        self.model = model
+
+        # Positions of the latest row of each product, the only rows summed up
+        self.latest_rows = OptimizationEngine.get_latest_rows(df, period_col)
+
+        # Fixed features of the latest rows, in the column order the model expects
+        self.X = df[X_cols].to_numpy(dtype=np.float32)[self.latest_rows]
+
+        # Columns updated on every evaluation
+        self.price_col_idx = X_cols.index(price_col)
+        self.price_change_col_idx = X_cols.index("Price Change (%)")
+        self.last_prices = df[last_price_col].to_numpy(dtype=np.float64)[
+            self.latest_rows
+        ]
+
+        # Number of times the model has been evaluated
+        self.num_evaluations = 0
+
+        # Called with the number of evaluations after each model call, if given
+        self.progress = progress
+
+    @staticmethod
+    def get_latest_rows(df, period_col):
+        """Returns the positions of the latest row of each product, ordered by Product ID."""
+        df_positions = df[["Product ID", period_col]].copy()
+        df_positions["Position"] = np.arange(len(df))
+
+        # Sort by Product ID (ascending) and period (descending), then keep the first row
+        df_positions = df_positions.sort_values(
+            by=["Product ID", period_col], ascending=[True, False], kind="stable"
+        )
+        df_latest = df_positions.drop_duplicates(subset="Product ID", keep="first")
+
+        return df_latest["Position"].to_numpy()
+
+    def count_evaluations(self, num_evaluations):
+        """Counts evaluations of the model and reports their number."""
+        self.num_evaluations += num_evaluations
+
+        if self.progress is not None:
+            self.progress(self.num_evaluations)
+
+    def predict_latest_sales(self, latest_prices):
+        """Returns the sales predicted for each product from the prices of its latest row."""
+        latest_prices = np.asarray(latest_prices, dtype=np.float64)
+
+        # Update the price and the price change (%) from the price of the last period
+        self.X[:, self.price_col_idx] = latest_prices
+        self.X[:, self.price_change_col_idx] = (
+            latest_prices - self.last_prices
+        ) / self.last_prices
+
+        self.count_evaluations(1)
+
+        return self.model.predict(self.X)
+
+    def predict_candidate_sales(self, candidate_prices):
+        """Returns the sales predicted for each product (rows) under each of its candidate
+        prices (columns), stacking every candidate into a single model call."""
+        candidate_prices = np.asarray(candidate_prices, dtype=np.float64)
+        num_products, num_candidates = candidate_prices.shape
+
+        # One copy of the fixed features of each product per candidate price
+        X_candidates = np.repeat(self.X, num_candidates, axis=0)
+        prices = candidate_prices.reshape(-1)
+        last_prices = np.repeat(self.last_prices, num_candidates)
+
+        X_candidates[:, self.price_col_idx] = prices
+        X_candidates[:, self.price_change_col_idx] = (
+            prices - last_prices
+        ) / last_prices
+
+        self.count_evaluations(num_candidates)
+
+        return np.asarray(self.model.predict(X_candidates)).reshape(
+            num_products, num_candidates
+        )
+
+    def predict_total_sales(self, prices):
+        """Returns the total predicted sales for the prices of every row of the dataset."""
+        latest_prices = np.asarray(prices, dtype=np.float64)[self.latest_rows]
+
+        return float(self.predict_latest_sales(latest_prices).sum(dtype=np.float64))
+
+    def maximize(
+        self, initial_prices, lower_bound, upper_bound, strategy="powell", grid_size=50
+    ):
+        """Returns the prices of every row that maximize the total predicted sales."""
+        if strategy == "powell":
+            return self.maximize_powell(initial_prices, lower_bound, upper_bound)
+
+        if strategy == "separable":
+            return self.maximize_separable(initial_prices, lower_bound, upper_bound)
+
+        if strategy == "grid":
+            return self.maximize_grid(
+                initial_prices, lower_bound, upper_bound, grid_size=grid_size
+            )
+
+        raise ValueError(f"Invalid optimization strategy, {strategy}")
+
+    def maximize_powell(self, initial_prices, lower_bound, upper_bound):
+        """Searches the prices of every row at once with Powell's method."""
+
+        # Define the objective function
+        def objective(prices):
+            return -self.predict_total_sales(prices)
+
+        bounds = [(lower_bound, upper_bound) for _ in range(len(initial_prices))]
+
+        result = minimize(objective, initial_prices, method="Powell", bounds=bounds)
+
+        return result.x
+
+    def maximize_separable(
+        self,
+        initial_prices,
+        lower_bound,
+        upper_bound,
+        num_scan_points=8,
+        xtol=1e-4,
+        max_iterations=50,
+    ):
+        """Searches the price of each product independently, since the sales predicted for a
+        product only depend on its own row. A coarse scan of the bounds is refined by a
+        golden-section search, run for every product at once with one model call per step.
+        A product's price only changes if it improves the product's predicted sales."""
+        initial_prices = np.asarray(initial_prices, dtype=np.float64)
+
+        # Start from the current prices of the latest rows
+        best_prices = initial_prices[self.latest_rows].copy()
+        best_sales = np.asarray(
+            self.predict_latest_sales(best_prices), dtype=np.float64
+        ).copy()
+
+        def keep_best(prices):
+            """Predicts the sales for the prices and keeps those that improve them."""
+            sales = np.asarray(self.predict_latest_sales(prices), dtype=np.float64)
+            is_better = sales > best_sales
+            best_prices[is_better] = prices[is_better]
+            best_sales[is_better] = sales[is_better]
+            return sales
+
+        # Coarse scan of the bounds in one model call, so flat regions of the model do not
+        # trap the search
+        scan_points = np.tile(
+            np.linspace(lower_bound, upper_bound, num_scan_points),
+            (len(best_prices), 1),
+        )
+        scan_sales = self.predict_candidate_sales(scan_points)
+        best_scan = np.argmax(scan_sales, axis=1)
+        best_scan_sales = scan_sales[np.arange(len(best_prices)), best_scan]
+        is_better = best_scan_sales > best_sales
+        best_prices[is_better] = scan_points[is_better, best_scan[is_better]]
+        best_sales[is_better] = best_scan_sales[is_better]
+
+        # Bracket each product's best price with the neighbouring scan points
+        scan_step = (upper_bound - lower_bound) / max(num_scan_points - 1, 1)
+        a = np.clip(best_prices - scan_step, lower_bound, upper_bound)
+        b = np.clip(best_prices + scan_step, lower_bound, upper_bound)
+
+        # Golden-section search within each bracket
+        c = b - OptimizationEngine.golden_ratio * (b - a)
+        d = a + OptimizationEngine.golden_ratio * (b - a)
+        sales_c = keep_best(c)
+        sales_d = keep_best(d)
+
+        tolerance = xtol * max(upper_bound - lower_bound, 1e-12)
+        for _ in range(max_iterations):
+            if np.max(b - a) < tolerance:
+                break
+
+            # Keep the part of the bracket on the side of the higher sales
+            keep_left = sales_c >= sales_d
+            b = np.where(keep_left, d, b)
+            a = np.where(keep_left, a, c)
+
+            # The surviving inner point is reused, only one new point is evaluated
+            new_point = np.where(
+                keep_left,
+                b - OptimizationEngine.golden_ratio * (b - a),
+                a + OptimizationEngine.golden_ratio * (b - a),
+            )
+            sales_new = keep_best(new_point)
+
+            c, d, sales_c, sales_d = (
+                np.where(keep_left, new_point, d),
+                np.where(keep_left, c, new_point),
+                np.where(keep_left, sales_new, sales_d),
+                np.where(keep_left, sales_c, sales_new),
+            )
+
+        # Only the latest rows affect the predicted sales, older rows keep their prices
+        optimized_prices = initial_prices.copy()
+        optimized_prices[self.latest_rows] = best_prices
+
+        return optimized_prices
+
+    def maximize_grid(self, initial_prices, lower_bound, upper_bound, grid_size=50):
+        """Scores every product under grid_size evenly spaced candidate prices within the
+        bounds, plus its current price, in a single model call and keeps the best price of
+        each product. The run time only depends on the number of products and candidates."""
+        initial_prices = np.asarray(initial_prices, dtype=np.float64)
+        current_prices = initial_prices[self.latest_rows]
+
+        # Candidate prices of each product, starting with its current price
+        candidate_prices = np.column_stack(
+            [
+                current_prices,
+                np.tile(
+                    np.linspace(lower_bound, upper_bound, grid_size),
+                    (len(current_prices), 1),
+                ),
+            ]
+        )
+
+        candidate_sales = self.predict_candidate_sales(candidate_prices)
+
+        # On ties the current price is kept, as it comes first
+        best_candidates = np.argmax(candidate_sales, axis=1)
+        best_prices = candidate_prices[np.arange(len(current_prices)), best_candidates]
+
+        # Only the latest rows affect the predicted sales, older rows keep their prices
+        optimized_prices = initial_prices.copy()
+        optimized_prices[self.latest_rows] = best_prices
+
+        return optimized_prices
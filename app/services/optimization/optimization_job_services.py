@@ -0,0 +1,284 @@
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime, timedelta
+from functools import partial
+
+import pandas as pd
+from flask import current_app
+
+from app import db
+from app.models.OptimizationJob.model import OptimizationJob
+from app.services.artifact_store_services import ArtifactStoreService
+from app.services.executor_services import ExecutorService
+from app.services.optimization.optimization_progress_services import (
+    OptimizationProgress,
+)
+from app.services.optimization.optimization_services import OptimizationService
+from app.services.upload_record_services import UploadRecordService
+
+
+class OptimizationJobService:
+    """Runs price optimizations as background jobs on a thread pool of the server
+    process, so the request starting one returns its id at once instead of waiting
+    for the optimization. Jobs are kept in the optimization_job table, the progress
+    of their stages is read from the files the pool workers report it to, and the
+    price list of a finished job is saved into the artifact store."""
+
+    # Name of the pool running the jobs
+    executor_name = "optimization-jobs"
+
+    # Folder of the progress of the running jobs, inside the artifact store
+    folder_name = "jobs"
+
+    # Session keys of the artifact ids of the datasets optimized
+    session_keys = UploadRecordService.session_keys["optimization"]
+
+    # Statuses of a job that is no longer running
+    finished_statuses = ("done", "failed")
+
+    # Futures of the jobs submitted by this process and not finished yet, by job id
+    _futures = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_progress_folder(job_id):
+        """Returns the absolute folder of the progress of a job, as pool processes may
+        not share the working directory of the server."""
+        return os.path.abspath(
+            os.path.join(
+                ArtifactStoreService.get_artifact_folder(),
+                OptimizationJobService.folder_name,
+                str(job_id),
+            )
+        )
+
+    @staticmethod
+    def get_timeout():
+        """Returns the time after which a queued or running job is failed."""
+        return timedelta(seconds=current_app.config["OPTIMIZATION_JOB_TIMEOUT"])
+
+    @staticmethod
+    def submit_job(artifact_ids, branch_id, dataset_file_id=None):
+        """Saves a queued job optimizing the datasets with the given artifact ids, by
+        session key, and submits it to the pool. Returns the id of the job."""
+        job = OptimizationJob(
+            artifact_ids=artifact_ids,
+            branch_id=branch_id,
+            dataset_file_id=dataset_file_id,
+        )
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+
+        app = current_app._get_current_object()
+        executor = ExecutorService.get_executor(
+            OptimizationJobService.executor_name,
+            kind="thread",
+            max_workers=app.config["OPTIMIZATION_JOB_WORKERS"],
+        )
+
+        with OptimizationJobService._lock:
+            try:
+                future = executor.submit(OptimizationJobService.run_job, app, job_id)
+            except RuntimeError as e:
+                # The pool is shut down, the job would stay queued
+                OptimizationJobService.fail_job(job, f"Job not started: {str(e)}")
+                return job_id
+
+            OptimizationJobService._futures[job_id] = future
+
+        future.add_done_callback(partial(OptimizationJobService.forget_job, job_id))
+
+        return job_id
+
+    @staticmethod
+    def get_future(job_id):
+        """Returns the future of a job submitted by this process, or None if it is
+        finished or was submitted by another process."""
+        with OptimizationJobService._lock:
+            return OptimizationJobService._futures.get(job_id)
+
+    @staticmethod
+    def forget_job(job_id, future):
+        """Removes a finished job, logging errors its thread could not save."""
+        with OptimizationJobService._lock:
+            OptimizationJobService._futures.pop(job_id, None)
+
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Error during optimization job {job_id}: {future.exception()}")
+
+    @staticmethod
+    def fail_job(job, error):
+        """Saves a job as failed with the error."""
+        job.status = "failed"
+        job.error = error
+        job.finished_datetime = datetime.utcnow()
+        db.session.commit()
+
+    @staticmethod
+    def run_job(app, job_id):
+        """Runs a job in a pool thread, saving its result or its error."""
+        with app.app_context():
+            progress_folder = OptimizationJobService.get_progress_folder(job_id)
+
+            try:
+                job = db.session.get(OptimizationJob, job_id)
+
+                # Expired while queued
+                if job.status in OptimizationJobService.finished_statuses:
+                    return
+
+                job.status = "running"
+                job.started_datetime = datetime.utcnow()
+                db.session.commit()
+
+                dfs = [
+                    ArtifactStoreService.load_dataframe(job.artifact_ids.get(key))
+                    for key in OptimizationJobService.session_keys
+                ]
+                if any(df is None for df in dfs):
+                    raise ValueError("The datasets to optimize are no longer stored.")
+
+                optimized_sales, price_list = OptimizationService.optimize_prices(
+                    *dfs, progress_folder=progress_folder
+                )
+
+                result = {
+                    "status": "done",
+                    "optimized_sales": optimized_sales,
+                    "price_list_id": ArtifactStoreService.save_dataframe(
+                        OptimizationJobService.price_list_to_dataframe(price_list)
+                    ),
+                }
+
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error during optimization job {job_id}: {str(e)}")
+                result = {"status": "failed", "error": str(e)}
+
+            # A job expired meanwhile, e.g. by another server process, keeps the
+            # status already shown for it
+            job = db.session.get(OptimizationJob, job_id, populate_existing=True)
+            if job is not None and (
+                job.status not in OptimizationJobService.finished_statuses
+            ):
+                for key, value in result.items():
+                    setattr(job, key, value)
+
+                # Keep the final progress with the job, the reported one is not needed
+                job.progress = OptimizationProgress.load_progress(
+                    progress_folder, OptimizationService.stages
+                )
+                job.finished_datetime = datetime.utcnow()
+                db.session.commit()
+
+            shutil.rmtree(progress_folder, ignore_errors=True)
+
+    @staticmethod
+    def get_job(job_id, branch_id):
+        """Returns a job of the branch, or None if there is no such job."""
+        try:
+            job = db.session.get(OptimizationJob, uuid.UUID(str(job_id)))
+        except ValueError:
+            return None
+
+        if job is None or job.branch_id != branch_id:
+            return None
+
+        OptimizationJobService.expire_job(job)
+
+        return job
+
+    @staticmethod
+    def expire_job(job):
+        """Fails a job queued or running for longer than the timeout, e.g. one whose
+        server was restarted or whose worker crashed, as it would never finish. Jobs
+        submitted by this process and not finished yet are left to finish."""
+        if job.status in OptimizationJobService.finished_statuses:
+            return
+
+        # A job still running in this process will finish
+        if OptimizationJobService.get_future(job.id) is not None:
+            return
+
+        since = job.started_datetime or job.created_datetime
+        if datetime.utcnow() - since > OptimizationJobService.get_timeout():
+            OptimizationJobService.fail_job(
+                job, "The optimization job was interrupted or timed out."
+            )
+
+    @staticmethod
+    def get_status(job):
+        """Returns the status of a job with the progress of each stage, that is, its
+        status and number of evaluations of the model."""
+        if job.status in OptimizationJobService.finished_statuses:
+            progress = job.progress
+        else:
+            progress = OptimizationProgress.load_progress(
+                OptimizationJobService.get_progress_folder(job.id),
+                OptimizationService.stages,
+            )
+
+        return {
+            "job_id": str(job.id),
+            "status": job.status,
+            "progress": progress,
+            "error": job.error,
+        }
+
+    @staticmethod
+    def get_result(job):
+        """Returns the optimized sales and the price list of a finished job, or None if
+        the job is not done or its price list is no longer stored."""
+        if job is None or job.status != "done":
+            return None
+
+        df_price_list = ArtifactStoreService.load_dataframe(job.price_list_id)
+        if df_price_list is None:
+            return None
+
+        return (
+            job.optimized_sales,
+            OptimizationJobService.dataframe_to_price_list(df_price_list),
+        )
+
+    @staticmethod
+    def price_list_to_dataframe(price_list):
+        """Returns the current and optimized prices of each timeframe as a DataFrame."""
+        return pd.DataFrame(
+            [
+                {
+                    "Timeframe": timeframe,
+                    "Product ID": str(product["product_id"]),
+                    "Current Price": product["current_price"],
+                    "Optimized Price": product["optimized_price"],
+                }
+                for timeframe, products in price_list.items()
+                for product in products
+            ],
+            columns=["Timeframe", "Product ID", "Current Price", "Optimized Price"],
+        )
+
+    @staticmethod
+    def dataframe_to_price_list(df_price_list):
+        """Returns the current and optimized prices of each timeframe, by timeframe."""
+        price_list = {}
+
+        for timeframe in OptimizationService.timeframe_optimizers:
+            df_timeframe = df_price_list[df_price_list["Timeframe"] == timeframe]
+            price_list[timeframe] = [
+                {
+                    "product_id": str(product_id),
+                    "current_price": float(current_price),
+                    "optimized_price": float(optimized_price),
+                }
+                for product_id, current_price, optimized_price in zip(
+                    df_timeframe["Product ID"],
+                    df_timeframe["Current Price"],
+                    df_timeframe["Optimized Price"],
+                )
+            ]
+
+        return price_list
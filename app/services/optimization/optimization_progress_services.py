@@ -0,0 +1,68 @@
+import json
+import os
+import time
+import uuid
+
+
+class OptimizationProgress:
+    """Reports the progress of a stage of an optimization job, such as the optimization
+    of a timeframe, to a small JSON file in the folder of the job. Each stage writes its
+    own file from whichever pool worker runs it, thread or process, so the status of a
+    job can be read without a broker or memory shared between processes."""
+
+    # Minimum number of seconds between two reports of a running stage
+    min_interval = 0.5
+
+    def __init__(self, folder, stage):
+        self.path = OptimizationProgress.get_progress_path(folder, stage)
+
+        # Number of evaluations of the model so far
+        self.num_evaluations = 0
+        self.last_report = 0.0
+
+    @staticmethod
+    def get_progress_path(folder, stage):
+        """Returns the file of the progress of a stage."""
+        return os.path.join(folder, f"{stage}.json")
+
+    def __call__(self, num_evaluations):
+        """Counts the evaluations of the model, reporting them at most every
+        min_interval seconds."""
+        self.num_evaluations = num_evaluations
+
+        if time.monotonic() - self.last_report >= OptimizationProgress.min_interval:
+            self.report("running")
+
+    def start(self):
+        """Reports that the stage started."""
+        self.report("running")
+
+    def finish(self):
+        """Reports that the stage finished, with its final number of evaluations."""
+        self.report("done")
+
+    def report(self, status):
+        """Writes the status and the number of evaluations of the stage."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.tmp-{uuid.uuid4().hex}"
+
+        with open(temp_path, "w") as f:
+            json.dump({"status": status, "evaluations": self.num_evaluations}, f)
+        os.replace(temp_path, self.path)
+
+        self.last_report = time.monotonic()
+
+    @staticmethod
+    def load_progress(folder, stages):
+        """Returns the reported progress of each stage, by stage. Stages that did not
+        start yet are queued."""
+        progress = {}
+
+        for stage in stages:
+            try:
+                with open(OptimizationProgress.get_progress_path(folder, stage)) as f:
+                    progress[stage] = json.load(f)
+            except (OSError, ValueError):
+                progress[stage] = {"status": "queued", "evaluations": 0}
+
+        return progress
@@ -1,4 +1,6 @@
-from flask import session
+from concurrent.futures import BrokenExecutor
+
+from flask import current_app, session
 import numpy as np
 
 import pandas as pd
@@ -9,6 +11,16 @@ from app.models.Optimization.model import Optimization
 from app.models.OptimizedPrices.model import OptimizedPrices
 from app.models.OptimizedSales.model import OptimizedSales
 from app.models.Prediction.model import Prediction
+from app.services.datasetfile_services import DatasetFileService
+from app.services.executor_services import ExecutorService
+from app.services.feature_cache_services import FeatureCacheService
+from app.services.model_registry_services import ModelRegistry
+from app.services.optimization.optimization_progress_services import (
+    OptimizationProgress,
+)
+from app.services.optimization.segmentation_specific_services.optimization_segmentation_services import (
+    OptimizationSegmentationService,
+)
 from app.services.optimization.timeframe_specific_services.optimization_services_monthly import (
     OptimizationServiceMonthly,
 )
@@ -18,23 +30,60 @@ from app.services.optimization.timeframe_specific_services.optimization_services
 from app.services.optimization.timeframe_specific_services.optimization_services_weekly import (
     OptimizationServiceWeekly,
 )
+from app.services.timeframe_feature_services import TimeframeFeatureService
+from app.services.timeframe_key_services import TimeframeKeyService
 
 
 class OptimizationService:
+    # Optimizer of each timeframe
+    timeframe_optimizers = {
+        "weekly": OptimizationServiceWeekly.maximize_weekly_sales,
+        "monthly": OptimizationServiceMonthly.maximize_monthly_sales,
+        "quarterly": OptimizationServiceQuarterly.maximize_quarterly_sales,
+    }
+
+    # Stages of an optimization whose progress is reported
+    stages = ["segmentation", *timeframe_optimizers]
 
     @staticmethod
-    def optimize_prices(df_weekly, df_monthly, df_quarterly, df_original):
-        """"""
-        optimized_sales_weekly, optimized_prices_weekly, prices_this_week = (
-            OptimizationServiceWeekly.maximize_weekly_sales(df_weekly, df_original)
-        )
-        optimized_sales_monthly, optimized_prices_monthly, prices_this_month = (
-            OptimizationServiceMonthly.maximize_monthly_sales(df_monthly, df_original)
+    def optimize_prices(
+        df_weekly,
+        df_monthly,
+        df_quarterly,
+        df_original,
+        strategy=None,
+        grid_size=None,
+        executor=None,
+        progress_folder=None,
+    ):
+        """Optimizes the prices of each timeframe with the given (or configured) strategy
+        and returns the optimized sales and the list of current and optimized prices.
+        The timeframes run concurrently on a process or thread pool, unless executor is 'serial'.
+        The progress of each stage is reported to the progress folder, if given."""
+        if strategy is None:
+            strategy = current_app.config["OPTIMIZATION_STRATEGY"]
+        if grid_size is None:
+            grid_size = current_app.config["OPTIMIZATION_GRID_SIZE"]
+        if executor is None:
+            executor = current_app.config["OPTIMIZATION_EXECUTOR"]
+
+        results = OptimizationService.run_timeframe_optimizations(
+            {"weekly": df_weekly, "monthly": df_monthly, "quarterly": df_quarterly},
+            df_original,
+            strategy,
+            grid_size,
+            executor,
+            progress_folder,
         )
+
+        optimized_sales_weekly, optimized_prices_weekly, prices_this_week = results[
+            "weekly"
+        ]
+        optimized_sales_monthly, optimized_prices_monthly, prices_this_month = results[
+            "monthly"
+        ]
         optimized_sales_quarterly, optimized_prices_quarterly, prices_this_quarter = (
-            OptimizationServiceQuarterly.maximize_quarterly_sales(
-                df_quarterly, df_original
-            )
+            results["quarterly"]
         )
 
         optimized_sales = [
@@ -87,16 +136,119 @@ class OptimizationService:
         )
 
     @staticmethod
-    def get_original_dataset(file):
+    def run_timeframe_optimizations(
+        timeframe_dfs,
+        df_original,
+        strategy,
+        grid_size,
+        executor_kind,
+        progress_folder=None,
+    ):
+        """Runs the optimization of each timeframe and returns the results by timeframe.
+        The timeframes share no state, so they run in parallel unless executor_kind is 'serial'."""
+        models_folder = current_app.config["MODELS_FOLDER_PREDICTION"]
+
+        # Reporters of the progress of each stage, if it is reported
+        progress = dict.fromkeys(OptimizationService.stages)
+        if progress_folder is not None:
+            progress = {
+                stage: OptimizationProgress(progress_folder, stage)
+                for stage in OptimizationService.stages
+            }
+
+        # Segment the customers once for every timeframe, reusing earlier segmentations
+        if progress["segmentation"] is not None:
+            progress["segmentation"].start()
+        cluster_profiles = OptimizationSegmentationService.get_auto_cluster_profiles(
+            df_original
+        )
+        if progress["segmentation"] is not None:
+            progress["segmentation"].finish()
+
+        # Workers only need the cluster profiles of the original dataset, so it is not
+        # sent to them
+        timeframe_args = {
+            timeframe: (
+                timeframe,
+                df_timeframe,
+                strategy,
+                grid_size,
+                models_folder,
+                cluster_profiles,
+                progress[timeframe],
+            )
+            for timeframe, df_timeframe in timeframe_dfs.items()
+        }
+
+        # One timeframe after the other, in the request's thread
+        if executor_kind == "serial":
+            return {
+                timeframe: OptimizationService.maximize_timeframe_sales(*args)
+                for timeframe, args in timeframe_args.items()
+            }
+
+        executor_name = f"optimization-{executor_kind}"
+        executor = ExecutorService.get_executor(
+            executor_name, kind=executor_kind, max_workers=len(timeframe_args)
+        )
+
         try:
-            file.seek(0)
-            # Excel
-            if file.filename.endswith((".xls", ".xlsx")):
-                df = pd.read_excel(file)
+            futures = {
+                timeframe: executor.submit(
+                    OptimizationService.maximize_timeframe_sales, *args
+                )
+                for timeframe, args in timeframe_args.items()
+            }
+
+            # Wall time is bounded by the slowest timeframe
+            return {timeframe: future.result() for timeframe, future in futures.items()}
+
+        except BrokenExecutor:
+            # A crashed worker breaks the pool, so a new one is created next time
+            ExecutorService.discard_executor(executor_name)
+            raise
+
+    @staticmethod
+    def maximize_timeframe_sales(
+        timeframe,
+        df_timeframe,
+        strategy,
+        grid_size,
+        models_folder,
+        cluster_profiles,
+        progress=None,
+    ):
+        """Optimizes the prices of a single timeframe, reporting its progress if given.
+        Also runs in pool workers, which have no app context to find the models in and
+        get the cluster profiles bounding the prices instead of the original dataset."""
+        ModelRegistry.models_folder = models_folder
+
+        maximize_sales = OptimizationService.timeframe_optimizers[timeframe]
+
+        if progress is not None:
+            progress.start()
+
+        result = maximize_sales(
+            df_timeframe,
+            None,
+            strategy=strategy,
+            grid_size=grid_size,
+            cluster_profiles=cluster_profiles,
+            progress=progress,
+        )
 
-            # CSV
-            elif file.filename.endswith(".csv"):
-                df = pd.read_csv(file, encoding="utf-8")
+        if progress is not None:
+            progress.finish()
+
+        return result
+
+    @staticmethod
+    def get_original_dataset(file, df=None):
+        """Returns the uncleaned dataset with parsed dates, used for segmenting customers.
+        An already parsed DataFrame of the file can be passed to avoid parsing it again."""
+        try:
+            if df is None:
+                df = DatasetFileService.convert_to_df(file)
 
             df_original = df.copy()
             df_original["Order Date"] = pd.to_datetime(
@@ -179,27 +331,32 @@ class OptimizationService:
     def engineer_features(df):
         """Engineers weekly, monthly, and quarterly features  for prediction and combines them into a single dataset."""
 
-        df_original = df[["Product ID", "Order Date", "Price", "Quantity", "Sales"]]
+        df_original = TimeframeFeatureService.select_source_cols(df)
         # print(f"df_original: {df_original.head()}")
 
-        # Engineer Year-Week, Year-Month, Year-Quarter columns
-        df_timeframes = OptimizationService.engineer_timeframes(df_original)
-        # print(f"df_timeframes: {df_timeframes.head()}")
-
-        # Engineer weekly, monthly, quarterly features
-        df_weekly = OptimizationServiceWeekly.engineer_features(df_timeframes)
-        df_monthly = OptimizationServiceMonthly.engineer_features(df_timeframes)
-        df_quarterly = OptimizationServiceQuarterly.engineer_features(df_timeframes)
+        # Engineer weekly, monthly, quarterly features, unless already engineered from
+        # the same dataset by a prediction or optimization upload
+        features = FeatureCacheService.get_timeframe_features(
+            df_original,
+            {
+                "weekly": OptimizationServiceWeekly.weekly_feature_cols,
+                "monthly": OptimizationServiceMonthly.monthly_feature_cols,
+                "quarterly": OptimizationServiceQuarterly.quarterly_feature_cols,
+            },
+        )
+        df_weekly_id, df_weekly = features["weekly"]
+        df_monthly_id, df_monthly = features["monthly"]
+        df_quarterly_id, df_quarterly = features["quarterly"]
 
         # # Drop Product ID
         # df_weekly = df_weekly.drop(columns=["Product ID"])
         # df_monthly = df_monthly.drop(columns=["Product ID"])
         # df_quarterly = df_quarterly.drop(columns=["Product ID"])
 
-        # Save the dataframes to the session
-        session["prediction_df_weekly"] = df_weekly.copy().to_dict()
-        session["prediction_df_monthly"] = df_monthly.copy().to_dict()
-        session["prediction_df_quarterly"] = df_quarterly.copy().to_dict()
+        # The dataframes are in the artifact store, only their ids go to the session
+        session["prediction_df_weekly_id"] = df_weekly_id
+        session["prediction_df_monthly_id"] = df_monthly_id
+        session["prediction_df_quarterly_id"] = df_quarterly_id
 
         # Vertically concatenate the datasets
         df_combined = pd.concat(
@@ -210,16 +367,13 @@ class OptimizationService:
 
     @staticmethod
     def engineer_timeframes(df_original):
-        """Engineers Year-Week, Year-Month, and Year-Quarter features."""
-        df_timeframes = df_original.copy()
+        """Engineers Year-Week, Year-Month, and Year-Quarter labels for display, from
+        the integer keys used for grouping."""
+        df_timeframes = TimeframeKeyService.engineer_timeframe_keys(df_original)
 
-        # Year-Week
-        df_timeframes["Year-Week"] = df_timeframes["Order Date"].dt.strftime("%Y-%U")
-
-        # Year-Month
-        df_timeframes["Year-Month"] = df_timeframes["Order Date"].dt.strftime("%Y-%m")
-
-        # Year-Quarter
-        df_timeframes["Year-Quarter"] = df_timeframes["Order Date"].dt.to_period("Q")
+        for key_col in TimeframeKeyService.key_cols.values():
+            df_timeframes[key_col] = TimeframeKeyService.get_labels(
+                df_timeframes[key_col], key_col
+            )
 
         return df_timeframes
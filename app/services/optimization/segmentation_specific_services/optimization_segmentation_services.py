@@ -1,14 +1,98 @@
+import threading
+from collections import OrderedDict
+
 import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.metrics import silhouette_score
 from sklearn.preprocessing import MinMaxScaler
 
+from app.services.columnar_storage_services import ColumnarStorageService
+from app.services.segmentation.customer_aggregation_services import (
+    CustomerAggregationService,
+)
+from app.services.segmentation.segmentation_services import SegmentationService
+
 
 class OptimizationSegmentationService:
+    # Columns of the original dataset the segmentation features are engineered from
+    feature_source_cols = ["Customer ID", "Order Date", "Quantity", "Sales"]
+
+    # Metrics whose automatic clustering bounds the prices of each timeframe
+    auto_cluster_metrics = [
+        "Average Weekly Sales",
+        "Average Weekly Quantity",
+        "Average Monthly Sales",
+        "Average Monthly Quantity",
+        "Average Quarterly Sales",
+        "Average Quarterly Quantity",
+    ]
+
+    # Number of datasets whose features and cluster profiles are kept in memory
+    cache_size = 8
+
+    # Features and cluster profiles by dataset content hash, least recently used first
+    _cache = OrderedDict()
+    _lock = threading.Lock()
 
     @staticmethod
-    def segment_customers(df, num_of_clusters, chosen_metric):
+    def get_auto_cluster_profiles(df_original, chosen_metrics=None):
+        """Returns the cluster profiles (cluster counts and metric averages) of the automatic
+        clustering of each chosen metric, by metric. The segmentation features and each
+        metric's clustering are computed once per dataset content and then reused."""
+        if chosen_metrics is None:
+            chosen_metrics = OptimizationSegmentationService.auto_cluster_metrics
+
+        dataset_hash = ColumnarStorageService.hash_dataframe(
+            df_original[OptimizationSegmentationService.feature_source_cols]
+        )
+
+        # The class-wide lock only guards the cache, each dataset is computed under its
+        # own lock, so only callers waiting for the same dataset block one another
+        with OptimizationSegmentationService._lock:
+            entry = OptimizationSegmentationService._cache.get(dataset_hash)
+
+            if entry is None:
+                entry = {"lock": threading.Lock(), "features": None, "profiles": {}}
+                OptimizationSegmentationService._cache[dataset_hash] = entry
+
+                # Evict the least recently used dataset
+                if (
+                    len(OptimizationSegmentationService._cache)
+                    > OptimizationSegmentationService.cache_size
+                ):
+                    OptimizationSegmentationService._cache.popitem(last=False)
+            else:
+                OptimizationSegmentationService._cache.move_to_end(dataset_hash)
+
+        with entry["lock"]:
+            if entry["features"] is None:
+                entry["features"] = OptimizationSegmentationService.engineer_features(
+                    df_original
+                )
+
+            # Cluster only the metrics not clustered yet
+            for chosen_metric in chosen_metrics:
+                if chosen_metric not in entry["profiles"]:
+                    entry["profiles"][chosen_metric] = (
+                        OptimizationSegmentationService.segment_customers(
+                            entry["features"], "auto", chosen_metric
+                        )
+                    )
+
+            return {
+                chosen_metric: entry["profiles"][chosen_metric]
+                for chosen_metric in chosen_metrics
+            }
+
+    @staticmethod
+    def clear_cache():
+        """Removes every cached dataset."""
+        with OptimizationSegmentationService._lock:
+            OptimizationSegmentationService._cache.clear()
+
+    @staticmethod
+    def segment_customers(df, num_of_clusters, chosen_metric, engine=None):
         """Performs KMeans Clustering and returns cluster profiles (cluster counts and metric averages)."""
+        if engine is None:
+            engine = SegmentationService.get_segmentation_engine()
 
         # Set a copy of the original dataset with the chosen metric
         df_original = df[[chosen_metric]].copy()
@@ -17,21 +101,22 @@ class OptimizationSegmentationService:
         df_clustering = df[[chosen_metric]].copy()
         df_clustering = OptimizationSegmentationService.scale_dataset(df_clustering)
 
-        # Number of clusters
-        n_clusters = (
-            OptimizationSegmentationService.get_optimal_num_of_clusters(df_clustering)
-            if num_of_clusters == "auto"
-            else int(num_of_clusters)
-        )
+        if engine == "kmeans1d":
+            labels = SegmentationService.cluster_1d(
+                df_clustering[chosen_metric], num_of_clusters
+            )
+        elif engine == "sklearn":
+            labels = OptimizationSegmentationService.cluster_sklearn(
+                df_clustering, num_of_clusters
+            )
+        else:
+            raise ValueError(f"Invalid segmentation engine, {engine}")
 
-        if n_clusters is None or n_clusters < 2:
+        if labels is None:
             return None, None
 
-        # Initialize KMeans model
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-
         # Cluster the data and return labels
-        df_original["Cluster"] = kmeans.fit_predict(df_clustering)
+        df_original["Cluster"] = labels
 
         # Calculate the cluster counts and the metric averages
         cluster_counts, metric_averages = (
@@ -43,30 +128,16 @@ class OptimizationSegmentationService:
         # Return the cluster counts and metric averages dicts
         return cluster_counts, metric_averages
 
+    @staticmethod
+    def cluster_sklearn(df_clustering, num_of_clusters):
+        """Clusters the scaled dataset with scikit-learn's KMeans and returns the
+        labels, or None if fewer than two clusters are requested."""
+        return SegmentationService.cluster_sklearn(df_clustering, num_of_clusters)
+
     @staticmethod
     def get_optimal_num_of_clusters(df_clustering):
         """Returns the number of clusters with the highest silhouette score."""
-        try:
-            cluster_range = range(2, 11)
-            silhouette_scores = []
-
-            for k in cluster_range:
-                kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-                labels = kmeans.fit_predict(df_clustering)
-
-                # Check if less than 2 clusters were found
-                if len(set(labels)) < 2:
-                    print(f"Only {len(set(labels))} distinct clusters found.")
-                    continue
-                    # return None
-
-                silhouette_avg = silhouette_score(df_clustering, labels)
-                silhouette_scores.append(silhouette_avg)
-
-            return cluster_range[np.argmax(silhouette_scores)]
-        except Exception as e:
-            print(f"Error: {str(e)}")
-            return None
+        return SegmentationService.get_optimal_num_of_clusters(df_clustering)
 
     @staticmethod
     def scale_dataset(df):
@@ -89,182 +160,4 @@ class OptimizationSegmentationService:
     @staticmethod
     def engineer_features(df):
         """Engineers totals and averages for segmentation."""
-        df_original = df[["Customer ID", "Order Date", "Quantity", "Sales"]]
-
-        # Engineering totals for Quantity, Sales, and Visits
-        df_totals = OptimizationSegmentationService.engineer_totals(df_original)
-
-        # Engineering Year-Week, Year-Month, Year-Quarter columns
-        df_timeframes = OptimizationSegmentationService.engineer_timeframes(df_original)
-
-        # Engineering weekly averages for Quantity, Sales, and Visits
-        df_weekly = OptimizationSegmentationService.engineer_weekly_avgs(df_timeframes)
-
-        # Engineering monthly averages for Quantity, Sales, and Visits
-        df_monthly = OptimizationSegmentationService.engineer_monthly_avgs(
-            df_timeframes
-        )
-
-        # Engineering quarterly averages for Quantity, Sales, and Visits
-        df_quarterly = OptimizationSegmentationService.engineer_quarterly_avgs(
-            df_timeframes
-        )
-
-        # Merging all features into a single dataframe
-        df_final = OptimizationSegmentationService.merge_all_features(
-            df_totals, df_weekly, df_monthly, df_quarterly
-        )
-
-        return df_final
-
-    @staticmethod
-    def engineer_totals(df_original):
-        """Engineers total sales, quantity, and visits from the dataset"""
-        # Creating the total sales, quantity, and visits
-        df_totals = (
-            df_original.groupby("Customer ID")
-            .agg(
-                {
-                    "Order Date": "nunique",
-                    "Sales": "sum",
-                    "Quantity": "sum",
-                }
-            )
-            .reset_index()
-        )
-
-        # Renaming columns appropriately
-        df_totals.rename(
-            columns={
-                "Order Date": "Total Visits",
-                "Sales": "Total Sales",
-                "Quantity": "Total Quantity",
-            },
-            inplace=True,
-        )
-
-        return df_totals
-
-    @staticmethod
-    def engineer_timeframes(df_original):
-        """Engineers Year-Week, Year-Month, and Year-Quarter features."""
-        df_timeframes = df_original.copy()
-
-        # Year-Week
-        df_timeframes["Year-Week"] = df_timeframes["Order Date"].dt.strftime("%Y-%U")
-
-        # Year-Month
-        df_timeframes["Year-Month"] = df_timeframes["Order Date"].dt.strftime("%Y-%m")
-
-        # Year-Quarter
-        df_timeframes["Year-Quarter"] = df_timeframes["Order Date"].dt.to_period("Q")
-
-        return df_timeframes
-
-    @staticmethod
-    def engineer_weekly_avgs(df_timeframes):
-        """Engineers weekly averages of sales, quantity, and visits from the dataset."""
-        # Calculating total per week for each customer
-        df_weekly = (
-            df_timeframes.groupby(["Customer ID", "Year-Week"])
-            .agg(
-                **{
-                    "Weekly Visits": ("Order Date", "nunique"),
-                    "Weekly Sales": ("Sales", "sum"),
-                    "Weekly Quantity": ("Quantity", "sum"),
-                }
-            )
-            .reset_index()
-        )
-
-        # Calculating the weekly averages
-        df_weekly = (
-            df_weekly.groupby("Customer ID")
-            .agg(
-                **{
-                    "Average Weekly Visits": ("Weekly Visits", "mean"),
-                    "Average Weekly Sales": ("Weekly Sales", "mean"),
-                    "Average Weekly Quantity": ("Weekly Quantity", "mean"),
-                }
-            )
-            .reset_index()
-        )
-
-        return df_weekly
-
-    @staticmethod
-    def engineer_monthly_avgs(df_timeframes):
-        """Engineers monthly averages of sales, quantity, and visits from the dataset."""
-        # Calculating total per month for each customer
-        df_monthly = (
-            df_timeframes.groupby(["Customer ID", "Year-Month"])
-            .agg(
-                **{
-                    "Monthly Visits": ("Order Date", "nunique"),
-                    "Monthly Sales": ("Sales", "sum"),
-                    "Monthly Quantity": ("Quantity", "sum"),
-                }
-            )
-            .reset_index()
-        )
-
-        # Calculating the monthly averages
-        df_monthly = (
-            df_monthly.groupby("Customer ID")
-            .agg(
-                **{
-                    "Average Monthly Visits": ("Monthly Visits", "mean"),
-                    "Average Monthly Sales": ("Monthly Sales", "mean"),
-                    "Average Monthly Quantity": ("Monthly Quantity", "mean"),
-                }
-            )
-            .reset_index()
-        )
-
-        return df_monthly
-
-    @staticmethod
-    def engineer_quarterly_avgs(df_timeframes):
-        """Engineers quarterly averages of sales, quantity, and visits from the dataset."""
-        # Calculating total per quarter for each customer
-        df_quarterly = (
-            df_timeframes.groupby(["Customer ID", "Year-Quarter"])
-            .agg(
-                **{
-                    "Quarterly Visits": ("Order Date", "nunique"),
-                    "Quarterly Sales": ("Sales", "sum"),
-                    "Quarterly Quantity": ("Quantity", "sum"),
-                }
-            )
-            .reset_index()
-        )
-
-        # Calculating the quarterly averages
-        df_quarterly = (
-            df_quarterly.groupby("Customer ID")
-            .agg(
-                **{
-                    "Average Quarterly Visits": ("Quarterly Visits", "mean"),
-                    "Average Quarterly Sales": ("Quarterly Sales", "mean"),
-                    "Average Quarterly Quantity": ("Quarterly Quantity", "mean"),
-                }
-            )
-            .reset_index()
-        )
-
-        return df_quarterly
-
-    @staticmethod
-    def merge_all_features(*dfs):
-        """Horizontally merges multiple dataframes by Customer ID into a single dataset."""
-
-        df_overall = dfs[0]
-
-        # Adding each set of averages one by one to the set of totals
-        for df in dfs[1:]:
-            df_overall = df_overall.merge(df, on="Customer ID", how="left")
-
-        # Replacing any NaN values that may form due to left join
-        df_overall.fillna(0, inplace=True)
-
-        return df_overall
+        return CustomerAggregationService.engineer_features(df)
@@ -1,20 +1,18 @@
-import os
-from flask import current_app
-from joblib import load
-from scipy.optimize import minimize
-
+from app.services.model_registry_services import ModelRegistry
+from app.services.optimization.optimization_engine_services import (
+    OptimizationEngine,
+)
 from app.services.optimization.segmentation_specific_services.optimization_segmentation_services import (
     OptimizationSegmentationService,
 )
+from app.services.timeframe_feature_services import TimeframeFeatureService
 
 
 class OptimizationServiceQuarterly:
 
     @classmethod
     def load_model(cls):
-        model_dir = current_app.config["MODELS_FOLDER_PREDICTION"]
-        quarterly_pred_model = load(os.path.join(model_dir, "xgboost_quarterly.joblib"))
-        return quarterly_pred_model
+        return ModelRegistry.get_model("quarterly")
 
     quarterly_X_cols = [
         "Price This Quarter",
@@ -31,26 +29,40 @@ class OptimizationServiceQuarterly:
         # "Price-to-Sales Ratio",
     ]
 
-    @staticmethod
-    def maximize_quarterly_sales(df_quarterly, df_original):
-        """"""
-        df = df_quarterly.copy()
-        price_this_quarter = df["Price This Quarter"]
+    # Metrics whose customer segments bound the prices
+    segmentation_metrics = ["Average Quarterly Sales", "Average Quarterly Quantity"]
 
-        # Define the objective function
-        def objective(price_this_quarter_tweaked, df):
-            # Update the price this quarter
-            df["Price This Quarter"] = price_this_quarter_tweaked
+    # Features engineered for the model and the optimization engine
+    quarterly_feature_cols = quarterly_X_cols + ["Price Last Quarter"]
 
-            # Calculate Price Change %
-            df = OptimizationServiceQuarterly.engineer_price_change_percent(df)
+    @staticmethod
+    def create_engine(df_quarterly, progress=None):
+        """Returns an engine that evaluates the total quarterly sales for candidate
+        prices, reporting its number of evaluations to progress, if given."""
+        return OptimizationEngine(
+            df_quarterly,
+            OptimizationServiceQuarterly.load_model(),
+            OptimizationServiceQuarterly.quarterly_X_cols,
+            price_col="Price This Quarter",
+            last_price_col="Price Last Quarter",
+            period_col="Year-Quarter",
+            progress=progress,
+        )
 
-            # Make predictions using the model
-            total_quarterly_sales = (
-                OptimizationServiceQuarterly.predict_quarterly_sales(df)
-            )
+    @staticmethod
+    def maximize_quarterly_sales(
+        df_quarterly,
+        df_original,
+        strategy="powell",
+        grid_size=50,
+        cluster_profiles=None,
+        progress=None,
+    ):
+        """"""
+        price_this_quarter = df_quarterly["Price This Quarter"]
 
-            return -total_quarterly_sales
+        # Prepare the feature matrix once for every evaluation of the objective
+        engine = OptimizationServiceQuarterly.create_engine(df_quarterly, progress)
 
         # Initial guess: use current values of Price This Quarter for optimization
         initial_guess = price_this_quarter.values
@@ -58,7 +70,7 @@ class OptimizationServiceQuarterly:
 
         avg_price_spent_per_product = (
             OptimizationServiceQuarterly.get_avg_price_spent_per_product(
-                df_original, df_quarterly
+                df_original, df_quarterly, cluster_profiles=cluster_profiles
             )
         )
 
@@ -69,51 +81,44 @@ class OptimizationServiceQuarterly:
         # Set the lower bound (minimum acceptable price of any product)
         lower_bound = min(initial_guess) * 0.8
 
-        bounds = [(lower_bound, upper_bound) for _ in range(len(initial_guess))]
-
-        # Perform optimization
-        result = minimize(
-            objective, initial_guess, args=(df,), method="Powell", bounds=bounds
+        # Perform optimization with the chosen strategy
+        optimized_prices = engine.maximize(
+            initial_guess,
+            lower_bound,
+            upper_bound,
+            strategy=strategy,
+            grid_size=grid_size,
         )
 
-        # print(f"result: {result}")
-
-        # Extract the optimized prices
-        optimized_prices = result.x
-
-        # Apply optimized prices to the dataset
-        df["Price This Quarter"] = optimized_prices
-        df = OptimizationServiceQuarterly.engineer_price_change_percent(df)
-
         # Get the final optimized sales predictions
-        optimized_sales = OptimizationServiceQuarterly.predict_quarterly_sales(df)
-        # print(f"optimized weekly sales: {optimized_sales}")
+        optimized_sales = engine.predict_total_sales(optimized_prices)
+        # print(f"optimized quarterly sales: {optimized_sales}")
         return (
             optimized_sales,
-            dict(zip(df["Product ID"], optimized_prices)),
-            dict(zip(df["Product ID"], price_this_quarter)),
+            dict(zip(df_quarterly["Product ID"], optimized_prices)),
+            dict(zip(df_quarterly["Product ID"], price_this_quarter)),
         )
 
     @staticmethod
-    def get_avg_price_spent_per_product(df_original, df_quarterly):
+    def get_avg_price_spent_per_product(
+        df_original, df_quarterly, cluster_profiles=None
+    ):
         """"""
-        # Segment customers for upper and lower bounds
-        segmentation_metrics_df = OptimizationSegmentationService.engineer_features(
-            df_original
-        )
-
-        # Get the averages per cluster of the chosen metrics
-        cluster_counts_avg_sales, metric_averages_avg_sales = (
-            OptimizationSegmentationService.segment_customers(
-                segmentation_metrics_df, "auto", "Average Quarterly Sales"
+        # Segment customers for upper and lower bounds, unless already segmented
+        if cluster_profiles is None:
+            cluster_profiles = (
+                OptimizationSegmentationService.get_auto_cluster_profiles(
+                    df_original, OptimizationServiceQuarterly.segmentation_metrics
+                )
             )
-        )
 
-        cluster_counts_avg_quantity, metric_averages_avg_quantity = (
-            OptimizationSegmentationService.segment_customers(
-                segmentation_metrics_df, "auto", "Average Quarterly Quantity"
-            )
-        )
+        # Get the averages per cluster of the chosen metrics
+        cluster_counts_avg_sales, metric_averages_avg_sales = cluster_profiles[
+            "Average Quarterly Sales"
+        ]
+        cluster_counts_avg_quantity, metric_averages_avg_quantity = cluster_profiles[
+            "Average Quarterly Quantity"
+        ]
 
         if (
             not cluster_counts_avg_sales
@@ -170,178 +175,57 @@ class OptimizationServiceQuarterly:
         return total_quarterly_prediction
 
     @staticmethod
-    def engineer_features(df_timeframes):
-        df_quarterly = df_timeframes.copy().drop(columns=["Year-Month", "Year-Week"])
-
-        # Aggregate data by Product ID and Year-Quarter
-        df_quarterly = (
-            df_quarterly.groupby(["Product ID", "Year-Quarter"])
-            .agg({"Price": "mean", "Quantity": "sum", "Sales": "sum"})
-            .reset_index()
-        )
-
-        # Sort data by Product ID and Year-Week for proper time sequence
-        df_quarterly = df_quarterly.sort_values(by=["Product ID", "Year-Quarter"])
-
-        # Rename Price, Sales, and Quantity columns to reflect that they are of the current week
-        df_quarterly = OptimizationServiceQuarterly.rename_columns(df_quarterly)
-
-        # Engineer lag features
-        df_quarterly = OptimizationServiceQuarterly.engineer_lag_features(df_quarterly)
-
-        # Calculate Price Change (%) (Change from Price Last Week to This Week)
-        df_quarterly = OptimizationServiceQuarterly.engineer_price_change_percent(
-            df_quarterly
-        )
-
-        # Calculate Sales Growth Rate (Growth from Sales Last Week to This Week)
-        df_quarterly = OptimizationServiceQuarterly.engineer_sales_growth_rate(
-            df_quarterly
-        )
-
-        # Calculate Stock to Sales Ratio (Quantity This Week / Sales This Week)
-        df_quarterly = OptimizationServiceQuarterly.engineer_stock_sales_ratio(
-            df_quarterly
-        )
-
-        # Calculate Momentum (Sales This Week - Sales Last Week)
-        df_quarterly = OptimizationServiceQuarterly.engineer_momentum(df_quarterly)
-
-        # Calculate Rolling Average Sales (Mean of Sales This Week and Last Week)
-        df_quarterly = OptimizationServiceQuarterly.engineer_rolling_average_sales(
-            df_quarterly
-        )
+    def engineer_features(df_timeframes, feature_cols=None):
+        """Engineers the quarterly features of each product, only those the model uses
+        unless others are given."""
+        if feature_cols is None:
+            feature_cols = OptimizationServiceQuarterly.quarterly_feature_cols
 
-        # Calculate Price-to-Sales Ratio (Price This Week / Sales This Week)
-        df_quarterly = OptimizationServiceQuarterly.engineer_price_sales_ratio(
-            df_quarterly
+        return TimeframeFeatureService.engineer_features(
+            df_timeframes, "quarterly", feature_cols
         )
 
-        df_quarterly["Timeframe"] = "Quarterly"
-
-        return df_quarterly
-
     @staticmethod
     def rename_columns(df_quarterly):
-        df_renamed_cols = df_quarterly.copy()
-
-        df_renamed_cols.rename(
-            columns={
-                "Price": "Price This Quarter",
-                "Sales": "Sales This Quarter",
-                "Quantity": "Quantity This Quarter",
-            },
-            inplace=True,
-        )
-
-        return df_renamed_cols
+        return TimeframeFeatureService.rename_columns(df_quarterly, "quarterly")
 
     @staticmethod
     def engineer_lag_features(df_quarterly):
         """Engineers lag features of quantity, sales, and price from the quarterly dataset."""
-        df_lag_features = df_quarterly.copy()
-
-        # Calculate quantity last quarter
-        df_lag_features["Quantity Last Quarter"] = df_lag_features.groupby(
-            "Product ID"
-        )["Quantity This Quarter"].shift(1)
-        df_lag_features = df_lag_features.dropna(subset=["Quantity Last Quarter"])
-
-        # Calculate sales last quarter
-        df_lag_features["Sales Last Quarter"] = df_lag_features.groupby("Product ID")[
-            "Sales This Quarter"
-        ].shift(1)
-        df_lag_features = df_lag_features.dropna(subset=["Sales Last Quarter"])
-
-        # Calculate price last quarter
-        df_lag_features["Price Last Quarter"] = df_lag_features.groupby("Product ID")[
-            "Price This Quarter"
-        ].shift(1)
-        df_lag_features = df_lag_features.dropna(subset=["Price Last Quarter"])
-
-        return df_lag_features
+        return TimeframeFeatureService.engineer_lag_features(df_quarterly, "quarterly")
 
     @staticmethod
     def engineer_price_change_percent(df_quarterly):
-        df_price_change_percent = df_quarterly.copy()
-
-        df_price_change_percent["Price Change (%)"] = (
-            df_price_change_percent["Price This Quarter"]
-            - df_price_change_percent["Price Last Quarter"]
-        ) / df_price_change_percent["Price Last Quarter"]
-        df_price_change_percent = df_price_change_percent.dropna(
-            subset=["Price Change (%)"]
+        return TimeframeFeatureService.engineer_feature(
+            df_quarterly, "quarterly", "Price Change (%)"
         )
 
-        return df_price_change_percent
-
     @staticmethod
     def engineer_sales_growth_rate(df_quarterly):
-        df_sales_growth_rate = df_quarterly.copy()
-
-        df_sales_growth_rate["Sales Growth Rate"] = (
-            df_sales_growth_rate["Sales This Quarter"]
-            - df_sales_growth_rate["Sales Last Quarter"]
-        ) / df_sales_growth_rate["Sales Last Quarter"]
-
-        df_sales_growth_rate = df_sales_growth_rate.dropna(subset=["Sales Growth Rate"])
-
-        return df_sales_growth_rate
+        return TimeframeFeatureService.engineer_feature(
+            df_quarterly, "quarterly", "Sales Growth Rate"
+        )
 
     @staticmethod
     def engineer_stock_sales_ratio(df_quarterly):
-        df_stock_sales_ratio = df_quarterly.copy()
-
-        df_stock_sales_ratio["Stock to Sales Ratio"] = df_stock_sales_ratio[
-            "Quantity This Quarter"
-        ] / (df_stock_sales_ratio["Sales This Quarter"] + 1)
-
-        df_stock_sales_ratio = df_stock_sales_ratio.dropna(
-            subset=["Stock to Sales Ratio"]
+        return TimeframeFeatureService.engineer_feature(
+            df_quarterly, "quarterly", "Stock to Sales Ratio"
         )
 
-        return df_stock_sales_ratio
-
     @staticmethod
     def engineer_momentum(df_quarterly):
-        df_quarterly_momentum = df_quarterly.copy()
-
-        df_quarterly_momentum["Momentum"] = (
-            df_quarterly_momentum["Sales This Quarter"]
-            - df_quarterly_momentum["Sales Last Quarter"]
+        return TimeframeFeatureService.engineer_feature(
+            df_quarterly, "quarterly", "Momentum"
         )
 
-        df_quarterly_momentum = df_quarterly_momentum.dropna(subset=["Momentum"])
-
-        return df_quarterly_momentum
-
     @staticmethod
     def engineer_rolling_average_sales(df_quarterly):
-        df_quarterly_rolling_average_sales = df_quarterly.copy()
-
-        df_quarterly_rolling_average_sales["Rolling Average Sales"] = (
-            df_quarterly_rolling_average_sales[
-                ["Sales Last Quarter", "Sales This Quarter"]
-            ].mean(axis=1)
+        return TimeframeFeatureService.engineer_feature(
+            df_quarterly, "quarterly", "Rolling Average Sales"
         )
 
-        df_quarterly_rolling_average_sales = df_quarterly_rolling_average_sales.dropna(
-            subset=["Rolling Average Sales"]
-        )
-
-        return df_quarterly_rolling_average_sales
-
     @staticmethod
     def engineer_price_sales_ratio(df_quarterly):
-        df_quarterly_price_sales_ratio = df_quarterly.copy()
-
-        df_quarterly_price_sales_ratio["Price-to-Sales Ratio"] = (
-            df_quarterly_price_sales_ratio["Price This Quarter"]
-            / (df_quarterly_price_sales_ratio["Sales This Quarter"] + 1)
+        return TimeframeFeatureService.engineer_feature(
+            df_quarterly, "quarterly", "Price-to-Sales Ratio"
         )
-
-        df_quarterly_price_sales_ratio = df_quarterly_price_sales_ratio.dropna(
-            subset=["Price-to-Sales Ratio"]
-        )
-
-        return df_quarterly_price_sales_ratio
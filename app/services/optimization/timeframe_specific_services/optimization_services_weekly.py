@@ -1,20 +1,18 @@
-import os
-from flask import current_app
-from joblib import load
-from scipy.optimize import minimize
-
+from app.services.model_registry_services import ModelRegistry
+from app.services.optimization.optimization_engine_services import (
+    OptimizationEngine,
+)
 from app.services.optimization.segmentation_specific_services.optimization_segmentation_services import (
     OptimizationSegmentationService,
 )
+from app.services.timeframe_feature_services import TimeframeFeatureService
 
 
 class OptimizationServiceWeekly:
 
     @classmethod
     def load_model(cls):
-        model_dir = current_app.config["MODELS_FOLDER_PREDICTION"]
-        weekly_pred_model = load(os.path.join(model_dir, "xgboost_weekly.joblib"))
-        return weekly_pred_model
+        return ModelRegistry.get_model("weekly")
 
     weekly_X_cols = [
         "Price This Week",
@@ -31,24 +29,40 @@ class OptimizationServiceWeekly:
         # "Price-to-Sales Ratio",
     ]
 
-    @staticmethod
-    def maximize_weekly_sales(df_weekly, df_original):
-        """"""
-        df = df_weekly.copy()
-        price_this_week = df["Price This Week"]
+    # Metrics whose customer segments bound the prices
+    segmentation_metrics = ["Average Weekly Sales", "Average Weekly Quantity"]
 
-        # Define the objective function
-        def objective(price_this_week_tweaked, df):
-            # Update the price this week
-            df["Price This Week"] = price_this_week_tweaked
+    # Features engineered for the model and the optimization engine
+    weekly_feature_cols = weekly_X_cols + ["Price Last Week"]
 
-            # Calculate Price Change %
-            df = OptimizationServiceWeekly.engineer_price_change_percent(df)
+    @staticmethod
+    def create_engine(df_weekly, progress=None):
+        """Returns an engine that evaluates the total weekly sales for candidate
+        prices, reporting its number of evaluations to progress, if given."""
+        return OptimizationEngine(
+            df_weekly,
+            OptimizationServiceWeekly.load_model(),
+            OptimizationServiceWeekly.weekly_X_cols,
+            price_col="Price This Week",
+            last_price_col="Price Last Week",
+            period_col="Year-Week",
+            progress=progress,
+        )
 
-            # Make predictions using the model
-            total_weekly_sales = OptimizationServiceWeekly.predict_weekly_sales(df)
+    @staticmethod
+    def maximize_weekly_sales(
+        df_weekly,
+        df_original,
+        strategy="powell",
+        grid_size=50,
+        cluster_profiles=None,
+        progress=None,
+    ):
+        """"""
+        price_this_week = df_weekly["Price This Week"]
 
-            return -total_weekly_sales
+        # Prepare the feature matrix once for every evaluation of the objective
+        engine = OptimizationServiceWeekly.create_engine(df_weekly, progress)
 
         # Initial guess: use current values of Price This Week for optimization
         initial_guess = price_this_week.values
@@ -56,7 +70,7 @@ class OptimizationServiceWeekly:
 
         avg_price_spent_per_product = (
             OptimizationServiceWeekly.get_avg_price_spent_per_product(
-                df_original, df_weekly
+                df_original, df_weekly, cluster_profiles=cluster_profiles
             )
         )
 
@@ -67,51 +81,44 @@ class OptimizationServiceWeekly:
         # Set the lower bound (minimum acceptable price of any product)
         lower_bound = min(initial_guess) * 0.8
 
-        bounds = [(lower_bound, upper_bound) for _ in range(len(initial_guess))]
-
-        # Perform optimization
-        result = minimize(
-            objective, initial_guess, args=(df,), method="Powell", bounds=bounds
+        # Perform optimization with the chosen strategy
+        optimized_prices = engine.maximize(
+            initial_guess,
+            lower_bound,
+            upper_bound,
+            strategy=strategy,
+            grid_size=grid_size,
         )
 
-        # print(f"result: {result}")
-
-        # Extract the optimized prices
-        optimized_prices = result.x
-
-        # Apply optimized prices to the dataset
-        df["Price This Week"] = optimized_prices
-        df = OptimizationServiceWeekly.engineer_price_change_percent(df)
-
         # Get the final optimized sales predictions
-        optimized_sales = OptimizationServiceWeekly.predict_weekly_sales(df)
+        optimized_sales = engine.predict_total_sales(optimized_prices)
         # print(f"optimized weekly sales: {optimized_sales}")
         return (
             optimized_sales,
-            dict(zip(df["Product ID"], optimized_prices)),
-            dict(zip(df["Product ID"], price_this_week)),
+            dict(zip(df_weekly["Product ID"], optimized_prices)),
+            dict(zip(df_weekly["Product ID"], price_this_week)),
         )
 
     @staticmethod
-    def get_avg_price_spent_per_product(df_original, df_weekly):
+    def get_avg_price_spent_per_product(
+        df_original, df_weekly, cluster_profiles=None
+    ):
         """"""
-        # Segment customers for upper and lower bounds
-        segmentation_metrics_df = OptimizationSegmentationService.engineer_features(
-            df_original
-        )
-
-        # Get the averages per cluster of the chosen metrics
-        cluster_counts_avg_sales, metric_averages_avg_sales = (
-            OptimizationSegmentationService.segment_customers(
-                segmentation_metrics_df, "auto", "Average Weekly Sales"
+        # Segment customers for upper and lower bounds, unless already segmented
+        if cluster_profiles is None:
+            cluster_profiles = (
+                OptimizationSegmentationService.get_auto_cluster_profiles(
+                    df_original, OptimizationServiceWeekly.segmentation_metrics
+                )
             )
-        )
 
-        cluster_counts_avg_quantity, metric_averages_avg_quantity = (
-            OptimizationSegmentationService.segment_customers(
-                segmentation_metrics_df, "auto", "Average Weekly Quantity"
-            )
-        )
+        # Get the averages per cluster of the chosen metrics
+        cluster_counts_avg_sales, metric_averages_avg_sales = cluster_profiles[
+            "Average Weekly Sales"
+        ]
+        cluster_counts_avg_quantity, metric_averages_avg_quantity = cluster_profiles[
+            "Average Weekly Quantity"
+        ]
 
         if (
             not cluster_counts_avg_sales
@@ -168,168 +175,55 @@ class OptimizationServiceWeekly:
             print(f"Error in wkly pred: {str(e)}")
 
     @staticmethod
-    def engineer_features(df_timeframes):
-        df_weekly = df_timeframes.copy().drop(columns=["Year-Month", "Year-Quarter"])
-
-        # Aggregate data by Product ID and Year-Week
-        df_weekly = (
-            df_weekly.groupby(["Product ID", "Year-Week"])
-            .agg({"Price": "mean", "Quantity": "sum", "Sales": "sum"})
-            .reset_index()
-        )
-
-        # Sort data by Product ID and Year-Week for proper time sequence
-        df_weekly = df_weekly.sort_values(by=["Product ID", "Year-Week"])
-
-        # Rename Price, Sales, and Quantity columns to reflect that they are of the current week
-        df_weekly = OptimizationServiceWeekly.rename_columns(df_weekly)
-
-        # Engineer lag features
-        df_weekly = OptimizationServiceWeekly.engineer_lag_features(df_weekly)
-
-        # Calculate Price Change (%) (Change from Price Last Week to This Week)
-        df_weekly = OptimizationServiceWeekly.engineer_price_change_percent(df_weekly)
-
-        # Calculate Sales Growth Rate (Growth from Sales Last Week to This Week)
-        df_weekly = OptimizationServiceWeekly.engineer_sales_growth_rate(df_weekly)
-
-        # Calculate Stock to Sales Ratio (Quantity This Week / Sales This Week)
-        df_weekly = OptimizationServiceWeekly.engineer_stock_sales_ratio(df_weekly)
-
-        # Calculate Momentum (Sales This Week - Sales Last Week)
-        df_weekly = OptimizationServiceWeekly.engineer_momentum(df_weekly)
-
-        # Calculate Rolling Average Sales (Mean of Sales This Week and Last Week)
-        df_weekly = OptimizationServiceWeekly.engineer_rolling_average_sales(df_weekly)
+    def engineer_features(df_timeframes, feature_cols=None):
+        """Engineers the weekly features of each product, only those the model uses
+        unless others are given."""
+        if feature_cols is None:
+            feature_cols = OptimizationServiceWeekly.weekly_feature_cols
 
-        # Calculate Price-to-Sales Ratio (Price This Week / Sales This Week)
-        df_weekly = OptimizationServiceWeekly.engineer_price_sales_ratio(df_weekly)
-
-        df_weekly["Timeframe"] = "Weekly"
-
-        return df_weekly
+        return TimeframeFeatureService.engineer_features(
+            df_timeframes, "weekly", feature_cols
+        )
 
     @staticmethod
     def rename_columns(df_weekly):
-        df_renamed_cols = df_weekly.copy()
-
-        df_renamed_cols.rename(
-            columns={
-                "Price": "Price This Week",
-                "Sales": "Sales This Week",
-                "Quantity": "Quantity This Week",
-            },
-            inplace=True,
-        )
-
-        return df_renamed_cols
+        return TimeframeFeatureService.rename_columns(df_weekly, "weekly")
 
     @staticmethod
     def engineer_lag_features(df_weekly):
         """Engineers lag features of quantity, sales, and price from the weekly dataset."""
-        df_lag_features = df_weekly.copy()
-
-        # Calculate quantity last week
-        df_lag_features["Quantity Last Week"] = df_lag_features.groupby("Product ID")[
-            "Quantity This Week"
-        ].shift(1)
-        df_lag_features = df_lag_features.dropna(subset=["Quantity Last Week"])
-
-        # Calculate sales last week
-        df_lag_features["Sales Last Week"] = df_lag_features.groupby("Product ID")[
-            "Sales This Week"
-        ].shift(1)
-        df_lag_features = df_lag_features.dropna(subset=["Sales Last Week"])
-
-        # Calculate price last week
-        df_lag_features["Price Last Week"] = df_lag_features.groupby("Product ID")[
-            "Price This Week"
-        ].shift(1)
-        df_lag_features = df_lag_features.dropna(subset=["Price Last Week"])
-
-        return df_lag_features
+        return TimeframeFeatureService.engineer_lag_features(df_weekly, "weekly")
 
     @staticmethod
     def engineer_price_change_percent(df_weekly):
-        df_price_change_percent = df_weekly.copy()
-
-        df_price_change_percent["Price Change (%)"] = (
-            df_price_change_percent["Price This Week"]
-            - df_price_change_percent["Price Last Week"]
-        ) / df_price_change_percent["Price Last Week"]
-        df_price_change_percent = df_price_change_percent.dropna(
-            subset=["Price Change (%)"]
+        return TimeframeFeatureService.engineer_feature(
+            df_weekly, "weekly", "Price Change (%)"
         )
 
-        return df_price_change_percent
-
     @staticmethod
     def engineer_sales_growth_rate(df_weekly):
-        df_sales_growth_rate = df_weekly.copy()
-
-        df_sales_growth_rate["Sales Growth Rate"] = (
-            df_sales_growth_rate["Sales This Week"]
-            - df_sales_growth_rate["Sales Last Week"]
-        ) / df_sales_growth_rate["Sales Last Week"]
-
-        df_sales_growth_rate = df_sales_growth_rate.dropna(subset=["Sales Growth Rate"])
-
-        return df_sales_growth_rate
+        return TimeframeFeatureService.engineer_feature(
+            df_weekly, "weekly", "Sales Growth Rate"
+        )
 
     @staticmethod
     def engineer_stock_sales_ratio(df_weekly):
-        df_stock_sales_ratio = df_weekly.copy()
-
-        df_stock_sales_ratio["Stock to Sales Ratio"] = df_stock_sales_ratio[
-            "Quantity This Week"
-        ] / (df_stock_sales_ratio["Sales This Week"] + 1)
-
-        df_stock_sales_ratio = df_stock_sales_ratio.dropna(
-            subset=["Stock to Sales Ratio"]
+        return TimeframeFeatureService.engineer_feature(
+            df_weekly, "weekly", "Stock to Sales Ratio"
         )
 
-        return df_stock_sales_ratio
-
     @staticmethod
     def engineer_momentum(df_weekly):
-        df_weekly_momentum = df_weekly.copy()
-
-        df_weekly_momentum["Momentum"] = (
-            df_weekly_momentum["Sales This Week"]
-            - df_weekly_momentum["Sales Last Week"]
-        )
-
-        df_weekly_momentum = df_weekly_momentum.dropna(subset=["Momentum"])
-
-        return df_weekly_momentum
+        return TimeframeFeatureService.engineer_feature(df_weekly, "weekly", "Momentum")
 
     @staticmethod
     def engineer_rolling_average_sales(df_weekly):
-        df_weekly_rolling_average_sales = df_weekly.copy()
-
-        df_weekly_rolling_average_sales["Rolling Average Sales"] = (
-            df_weekly_rolling_average_sales[
-                ["Sales Last Week", "Sales This Week"]
-            ].mean(axis=1)
+        return TimeframeFeatureService.engineer_feature(
+            df_weekly, "weekly", "Rolling Average Sales"
         )
 
-        df_weekly_rolling_average_sales = df_weekly_rolling_average_sales.dropna(
-            subset=["Rolling Average Sales"]
-        )
-
-        return df_weekly_rolling_average_sales
-
     @staticmethod
     def engineer_price_sales_ratio(df_weekly):
-        df_weekly_price_sales_ratio = df_weekly.copy()
-
-        df_weekly_price_sales_ratio["Price-to-Sales Ratio"] = (
-            df_weekly_price_sales_ratio["Price This Week"]
-            / (df_weekly_price_sales_ratio["Sales This Week"] + 1)
+        return TimeframeFeatureService.engineer_feature(
+            df_weekly, "weekly", "Price-to-Sales Ratio"
         )
-
-        df_weekly_price_sales_ratio = df_weekly_price_sales_ratio.dropna(
-            subset=["Price-to-Sales Ratio"]
-        )
-
-        return df_weekly_price_sales_ratio
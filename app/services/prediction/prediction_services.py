@@ -6,6 +6,7 @@ from sklearn.preprocessing import MinMaxScaler
 
 from app import db
 from app.models.Prediction.model import Prediction
+from app.services.feature_cache_services import FeatureCacheService
 from app.services.prediction.timeframe_specific_services.prediction_services_monthly import (
     PredictionServiceMonthly,
 )
@@ -15,6 +16,8 @@ from app.services.prediction.timeframe_specific_services.prediction_services_qua
 from app.services.prediction.timeframe_specific_services.prediction_services_weekly import (
     PredictionServiceWeekly,
 )
+from app.services.timeframe_feature_services import TimeframeFeatureService
+from app.services.timeframe_key_services import TimeframeKeyService
 
 
 class PredictionService:
@@ -65,27 +68,32 @@ class PredictionService:
     def engineer_features(df):
         """Engineers weekly, monthly, and quarterly features  for prediction and combines them into a single dataset."""
 
-        df_original = df[["Product ID", "Order Date", "Price", "Quantity", "Sales"]]
+        df_original = TimeframeFeatureService.select_source_cols(df)
         # print(f"df_original: {df_original.head()}")
 
-        # Engineer Year-Week, Year-Month, Year-Quarter columns
-        df_timeframes = PredictionService.engineer_timeframes(df_original)
-        # print(f"df_timeframes: {df_timeframes.head()}")
-
-        # Engineer weekly, monthly, quarterly features
-        df_weekly = PredictionServiceWeekly.engineer_features(df_timeframes)
-        df_monthly = PredictionServiceMonthly.engineer_features(df_timeframes)
-        df_quarterly = PredictionServiceQuarterly.engineer_features(df_timeframes)
+        # Engineer weekly, monthly, quarterly features, unless already engineered from
+        # the same dataset by a prediction or optimization upload
+        features = FeatureCacheService.get_timeframe_features(
+            df_original,
+            {
+                "weekly": PredictionServiceWeekly.weekly_X_cols,
+                "monthly": PredictionServiceMonthly.monthly_X_cols,
+                "quarterly": PredictionServiceQuarterly.quarterly_X_cols,
+            },
+        )
+        df_weekly_id, df_weekly = features["weekly"]
+        df_monthly_id, df_monthly = features["monthly"]
+        df_quarterly_id, df_quarterly = features["quarterly"]
 
         # # Drop Product ID
         # df_weekly = df_weekly.drop(columns=["Product ID"])
         # df_monthly = df_monthly.drop(columns=["Product ID"])
         # df_quarterly = df_quarterly.drop(columns=["Product ID"])
 
-        # Save the dataframes to the session
-        session["prediction_df_weekly"] = df_weekly.copy().to_dict()
-        session["prediction_df_monthly"] = df_monthly.copy().to_dict()
-        session["prediction_df_quarterly"] = df_quarterly.copy().to_dict()
+        # The dataframes are in the artifact store, only their ids go to the session
+        session["prediction_df_weekly_id"] = df_weekly_id
+        session["prediction_df_monthly_id"] = df_monthly_id
+        session["prediction_df_quarterly_id"] = df_quarterly_id
 
         # Vertically concatenate the datasets
         df_combined = pd.concat(
@@ -96,16 +104,13 @@ class PredictionService:
 
     @staticmethod
     def engineer_timeframes(df_original):
-        """Engineers Year-Week, Year-Month, and Year-Quarter features."""
-        df_timeframes = df_original.copy()
-
-        # Year-Week
-        df_timeframes["Year-Week"] = df_timeframes["Order Date"].dt.strftime("%Y-%U")
+        """Engineers Year-Week, Year-Month, and Year-Quarter labels for display, from
+        the integer keys used for grouping."""
+        df_timeframes = TimeframeKeyService.engineer_timeframe_keys(df_original)
 
-        # Year-Month
-        df_timeframes["Year-Month"] = df_timeframes["Order Date"].dt.strftime("%Y-%m")
-
-        # Year-Quarter
-        df_timeframes["Year-Quarter"] = df_timeframes["Order Date"].dt.to_period("Q")
+        for key_col in TimeframeKeyService.key_cols.values():
+            df_timeframes[key_col] = TimeframeKeyService.get_labels(
+                df_timeframes[key_col], key_col
+            )
 
         return df_timeframes
@@ -0,0 +1,130 @@
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+
+from flask import current_app, has_app_context
+import numpy as np
+
+# Clustering of a metric into one number of clusters, with the silhouette estimate of
+# the number of clusters chosen automatically
+ClusteringResult = namedtuple(
+    "ClusteringResult",
+    ["labels", "centroids", "cluster_counts", "metric_averages", "silhouette"],
+    defaults=[None],
+)
+
+
+class ClusteringCache:
+    """Process-wide cache of the clusterings of each dataset file and metric.
+    Every number of clusters computed for a file and metric is kept, along with the one
+    chosen by the automatic clustering, so switching the number of clusters is a lookup.
+    The least recently used files and metrics are evicted once the results held exceed
+    the configured number of bytes."""
+
+    # Results by (dataset file path, metric, engine), least recently used first
+    _entries = OrderedDict()
+    _num_bytes = 0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_max_bytes():
+        """Returns the configured size limit of the cache, or the default outside of an
+        app context."""
+        if has_app_context():
+            return current_app.config["SEGMENTATION_CACHE_MAX_BYTES"]
+        return 256 * 1024**2
+
+    @staticmethod
+    def get_result_size(result):
+        """Returns the approximate number of bytes held by a clustering result."""
+        profile_bytes = sum(
+            sys.getsizeof(profile) + 64 * len(profile)
+            for profile in (result.cluster_counts, result.metric_averages)
+        )
+        return result.labels.nbytes + result.centroids.nbytes + profile_bytes
+
+    @staticmethod
+    def get_result(key, num_of_clusters):
+        """Returns the cached result of the number of clusters ('auto' for the one
+        chosen automatically), or None if it has not been computed."""
+        with ClusteringCache._lock:
+            entry = ClusteringCache._entries.get(key)
+            if entry is None:
+                return None
+
+            ClusteringCache._entries.move_to_end(key)
+
+            n_clusters = (
+                entry["auto"] if num_of_clusters == "auto" else int(num_of_clusters)
+            )
+
+            return entry["results"].get(n_clusters)
+
+    @staticmethod
+    def put_results(key, results, auto_num_of_clusters=None):
+        """Adds the results, by number of clusters, of a dataset file and metric, and
+        the number of clusters chosen automatically if known."""
+        with ClusteringCache._lock:
+            entry = ClusteringCache._entries.setdefault(
+                key, {"auto": None, "results": {}, "num_bytes": 0}
+            )
+            ClusteringCache._entries.move_to_end(key)
+
+            if auto_num_of_clusters is not None:
+                entry["auto"] = auto_num_of_clusters
+
+            for n_clusters, result in results.items():
+                if n_clusters in entry["results"]:
+                    # Add the silhouette estimate of a number of clusters cached by an
+                    # earlier clustering into a given number of clusters
+                    if result.silhouette is not None:
+                        entry["results"][n_clusters] = entry["results"][
+                            n_clusters
+                        ]._replace(silhouette=result.silhouette)
+                    continue
+
+                result_size = ClusteringCache.get_result_size(result)
+                entry["results"][n_clusters] = result
+                entry["num_bytes"] += result_size
+                ClusteringCache._num_bytes += result_size
+
+            # Evict the least recently used entries, keeping at least the newest one
+            max_bytes = ClusteringCache.get_max_bytes()
+            while (
+                ClusteringCache._num_bytes > max_bytes
+                and len(ClusteringCache._entries) > 1
+            ):
+                _, evicted = ClusteringCache._entries.popitem(last=False)
+                ClusteringCache._num_bytes -= evicted["num_bytes"]
+
+    @staticmethod
+    def get_num_bytes():
+        """Returns the approximate number of bytes held by the cache."""
+        with ClusteringCache._lock:
+            return ClusteringCache._num_bytes
+
+    @staticmethod
+    def clear():
+        """Removes every cached result."""
+        with ClusteringCache._lock:
+            ClusteringCache._entries.clear()
+            ClusteringCache._num_bytes = 0
+
+    @staticmethod
+    def create_result(labels, cluster_counts, metric_averages, silhouette=None):
+        """Returns the result of a clustering from its labels, profiles, and silhouette
+        estimate, storing the labels in the smallest integer type and the centroids in
+        metric units."""
+        labels = np.asarray(labels)
+        centroids = np.array(
+            [metric_averages[cluster] for cluster in sorted(metric_averages)],
+            dtype=np.float64,
+        )
+
+        return ClusteringResult(
+            labels.astype(np.min_scalar_type(max(int(labels.max()), 0))),
+            centroids,
+            cluster_counts,
+            metric_averages,
+            silhouette,
+        )
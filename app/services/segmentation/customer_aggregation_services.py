@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+from app.services.timeframe_key_services import TimeframeKeyService
+
+
+class CustomerAggregationService:
+    """Engineers the per-customer segmentation features in one pass over the dataset.
+    Customer IDs and order dates are factorized into integer codes once, the rows are
+    reduced to one row per customer and order date, and every total and average is
+    computed from that reduction with integer keys instead of string groupbys and
+    merges. The average of a customer's per-period sums is their total divided by the
+    number of periods they ordered in, so the averages only need the periods counted."""
+
+    # Columns of the engineered segmentation dataset, in order
+    feature_cols = [
+        "Customer ID",
+        "Total Visits",
+        "Total Sales",
+        "Total Quantity",
+        "Average Weekly Visits",
+        "Average Weekly Sales",
+        "Average Weekly Quantity",
+        "Average Monthly Visits",
+        "Average Monthly Sales",
+        "Average Monthly Quantity",
+        "Average Quarterly Visits",
+        "Average Quarterly Sales",
+        "Average Quarterly Quantity",
+    ]
+
+    @staticmethod
+    def engineer_features(df):
+        """Engineers totals and weekly, monthly, and quarterly averages of the visits,
+        sales, and quantity of each customer, ordered by Customer ID."""
+        customer_codes, customer_ids = pd.factorize(df["Customer ID"], sort=True)
+        order_dates = df["Order Date"].to_numpy(dtype="datetime64[ns]")
+
+        # Rows without a customer are not part of any group
+        has_customer = customer_codes >= 0
+        customer_codes = customer_codes[has_customer].astype(np.int64)
+        order_dates = order_dates[has_customer]
+        sales = df["Sales"].to_numpy()[has_customer]
+        quantity = df["Quantity"].to_numpy()[has_customer]
+        num_customers = len(customer_ids)
+
+        # Stage 1: distinct order dates of each customer, the customer's visits
+        has_date = ~np.isnat(order_dates)
+        date_codes, dates = pd.factorize(order_dates[has_date].view(np.int64))
+        num_dates = max(len(dates), 1)
+        visit_keys = pd.unique(customer_codes[has_date] * num_dates + date_codes)
+        visit_customers = visit_keys // num_dates
+        visit_dates = dates[visit_keys % num_dates].view("datetime64[ns]")
+
+        totals = {
+            "Visits": np.bincount(visit_customers, minlength=num_customers),
+            "Sales": CustomerAggregationService.sum_by_customer(
+                customer_codes, sales, num_customers
+            ),
+            "Quantity": CustomerAggregationService.sum_by_customer(
+                customer_codes, quantity, num_customers
+            ),
+        }
+
+        df_features = pd.DataFrame(
+            {
+                "Customer ID": np.asarray(customer_ids),
+                "Total Visits": totals["Visits"],
+                "Total Sales": totals["Sales"],
+                "Total Quantity": totals["Quantity"],
+            }
+        )
+
+        # Stage 2: number of distinct periods each customer visited in
+        for timeframe, period_codes in CustomerAggregationService.get_period_codes(
+            visit_dates
+        ).items():
+            num_periods = CustomerAggregationService.count_periods(
+                visit_customers, period_codes, num_customers
+            )
+
+            # Customers without any dated order average 0, as with a left merge
+            for metric, total in totals.items():
+                df_features[f"Average {timeframe} {metric}"] = np.divide(
+                    total,
+                    num_periods,
+                    out=np.zeros(num_customers),
+                    where=num_periods > 0,
+                )
+
+        return df_features[CustomerAggregationService.feature_cols]
+
+    @staticmethod
+    def sum_by_customer(customer_codes, values, num_customers):
+        """Returns the sum of the values of each customer, keeping integer sums
+        integer."""
+        sums = np.bincount(
+            customer_codes, weights=values.astype(np.float64), minlength=num_customers
+        )
+
+        if np.issubdtype(values.dtype, np.integer):
+            return np.rint(sums).astype(np.int64)
+
+        return sums
+
+    @staticmethod
+    def get_period_codes(dates):
+        """Returns the integer week, month, and quarter codes of the dates, by
+        timeframe."""
+        codes = TimeframeKeyService.get_codes(dates)
+
+        return {
+            timeframe.capitalize(): codes[key_col]
+            for timeframe, key_col in TimeframeKeyService.key_cols.items()
+        }
+
+    @staticmethod
+    def count_periods(visit_customers, period_codes, num_customers):
+        """Returns the number of distinct periods of each customer's visits."""
+        if len(period_codes) == 0:
+            return np.zeros(num_customers, dtype=np.int64)
+
+        first_period = period_codes.min()
+        num_period_codes = period_codes.max() - first_period + 1
+
+        customer_periods = pd.unique(
+            visit_customers * num_period_codes + (period_codes - first_period)
+        )
+
+        return np.bincount(
+            customer_periods // num_period_codes, minlength=num_customers
+        )
@@ -0,0 +1,205 @@
+import numpy as np
+
+
+class KMeans1D:
+    """Exact k-means clustering of one-dimensional data.
+    On sorted values every optimal cluster is a contiguous run, so the optimal partition
+    into each number of clusters up to max_clusters is found by dynamic programming over
+    prefix sums of the distinct values. Each row of the program is filled with a
+    divide-and-conquer search over the split points, vectorized one recursion level at a
+    time, which takes O(n log n) per number of clusters instead of O(n^2)."""
+
+    def __init__(self, values, max_clusters):
+        values = np.asarray(values, dtype=np.float64).ravel()
+
+        if not np.all(np.isfinite(values)):
+            raise ValueError("Cannot cluster missing or infinite values")
+
+        # Distinct values in ascending order, weighted by their number of occurrences
+        self.unique_values, self.inverse, self.weights = np.unique(
+            values, return_inverse=True, return_counts=True
+        )
+        self.num_points = len(values)
+
+        # Prefix sums of the weights, values, and squared values, centered for precision
+        centered = self.unique_values - values.mean() if len(values) else values
+        self.prefix_weights = np.concatenate([[0.0], np.cumsum(self.weights)])
+        self.prefix_sums = np.concatenate([[0.0], np.cumsum(self.weights * centered)])
+        self.prefix_squares = np.concatenate(
+            [[0.0], np.cumsum(self.weights * centered * centered)]
+        )
+        self.centered = centered
+
+        # There cannot be more clusters than distinct values
+        self.max_clusters = int(min(max_clusters, len(self.unique_values)))
+
+        # First distinct value of the last cluster of the optimal partition of the first
+        # j distinct values into k clusters, at splits[k, j]
+        self.splits = self.fit()
+
+    def get_segment_costs(self, starts, ends):
+        """Returns the sum of squared distances to the mean of the distinct values
+        [starts, ends), the cost of putting them in one cluster."""
+        weights = self.prefix_weights[ends] - self.prefix_weights[starts]
+        sums = self.prefix_sums[ends] - self.prefix_sums[starts]
+        squares = self.prefix_squares[ends] - self.prefix_squares[starts]
+
+        return np.maximum(squares - sums * sums / weights, 0.0)
+
+    def fit(self):
+        """Fills the dynamic program for each number of clusters up to max_clusters."""
+        num_unique = len(self.unique_values)
+        index_dtype = np.int32 if num_unique < 2**31 else np.int64
+        splits = np.zeros((self.max_clusters + 1, num_unique + 1), dtype=index_dtype)
+
+        if self.max_clusters < 1:
+            return splits
+
+        # A single cluster holds every value
+        ends = np.arange(1, num_unique + 1)
+        costs = np.full(num_unique + 1, np.inf)
+        costs[1:] = self.get_segment_costs(np.zeros_like(ends), ends)
+
+        for num_clusters in range(2, self.max_clusters + 1):
+            costs = self.fill_row(costs, splits[num_clusters], num_clusters)
+
+        return splits
+
+    def fill_row(self, previous_costs, splits, num_clusters):
+        """Fills the costs and split points of one number of clusters from the costs of
+        one cluster less. The optimal split point never decreases with the number of
+        values, so the candidates of a value are bounded by those of its neighbours."""
+        num_unique = len(self.unique_values)
+        costs = np.full(num_unique + 1, np.inf)
+
+        # Pending searches: values [ends_low, ends_high] with split points in
+        # [splits_low, splits_high]
+        ends_low = np.array([num_clusters])
+        ends_high = np.array([num_unique])
+        splits_low = np.array([num_clusters - 1])
+        splits_high = np.array([num_unique - 1])
+
+        while len(ends_low):
+            # Search the middle value of each pending range over all of its candidates
+            middles = (ends_low + ends_high) // 2
+            num_candidates = np.minimum(splits_high, middles - 1) - splits_low + 1
+            offsets = np.concatenate([[0], np.cumsum(num_candidates)[:-1]])
+            search_ids = np.repeat(np.arange(len(middles)), num_candidates)
+            candidates = (
+                np.arange(num_candidates.sum())
+                - offsets[search_ids]
+                + splits_low[search_ids]
+            )
+            candidate_costs = previous_costs[candidates] + self.get_segment_costs(
+                candidates, middles[search_ids]
+            )
+
+            # Lowest cost of each search, ties going to the leftmost split point
+            best_costs = np.minimum.reduceat(candidate_costs, offsets)
+            positions = np.where(
+                candidate_costs == best_costs[search_ids],
+                np.arange(len(candidates)),
+                len(candidates),
+            )
+            best_splits = candidates[np.minimum.reduceat(positions, offsets)]
+
+            costs[middles] = best_costs
+            splits[middles] = best_splits
+
+            # Values left of the middle split no later, values right of it no earlier
+            has_left = ends_low < middles
+            has_right = middles < ends_high
+            ends_low, ends_high, splits_low, splits_high = (
+                np.concatenate([ends_low[has_left], middles[has_right] + 1]),
+                np.concatenate([middles[has_left] - 1, ends_high[has_right]]),
+                np.concatenate([splits_low[has_left], best_splits[has_right]]),
+                np.concatenate([best_splits[has_left], splits_high[has_right]]),
+            )
+
+        return costs
+
+    def get_boundaries(self, num_clusters):
+        """Returns the first distinct value of each cluster, plus the number of distinct
+        values, of the optimal partition into num_clusters clusters."""
+        if not 1 <= num_clusters <= self.max_clusters:
+            raise ValueError(f"Invalid number of clusters, {num_clusters}")
+
+        boundaries = [len(self.unique_values)]
+        for k in range(num_clusters, 1, -1):
+            boundaries.append(int(self.splits[k, boundaries[-1]]))
+        boundaries.append(0)
+
+        return np.array(boundaries[::-1])
+
+    def get_labels(self, num_clusters):
+        """Returns the cluster of each value, numbered by ascending values."""
+        boundaries = self.get_boundaries(num_clusters)
+        unique_labels = np.repeat(np.arange(num_clusters), np.diff(boundaries))
+
+        return unique_labels[self.inverse]
+
+    def get_silhouette_score(self, num_clusters):
+        """Returns the exact mean silhouette coefficient of the optimal partition.
+        Distances within a cluster come from its prefix sums, and the nearest other
+        cluster of a value is one of the two adjacent clusters, as the clusters are
+        contiguous, so no pairwise distances are computed."""
+        boundaries = self.get_boundaries(num_clusters)
+        sizes = np.diff(boundaries)
+        unique_labels = np.repeat(np.arange(num_clusters), sizes)
+        cluster_starts = boundaries[:-1][unique_labels]
+        cluster_ends = boundaries[1:][unique_labels]
+        positions = np.arange(len(self.unique_values))
+        x = self.centered
+
+        # Total distance to the values of the same cluster, on either side
+        left_weights = (
+            self.prefix_weights[positions] - self.prefix_weights[cluster_starts]
+        )
+        left_sums = self.prefix_sums[positions] - self.prefix_sums[cluster_starts]
+        right_weights = (
+            self.prefix_weights[cluster_ends] - self.prefix_weights[positions + 1]
+        )
+        right_sums = self.prefix_sums[cluster_ends] - self.prefix_sums[positions + 1]
+        within_distances = x * left_weights - left_sums + right_sums - x * right_weights
+
+        cluster_weights = self.prefix_weights[boundaries[1:]] - self.prefix_weights[
+            boundaries[:-1]
+        ]
+        cluster_means = (
+            self.prefix_sums[boundaries[1:]] - self.prefix_sums[boundaries[:-1]]
+        ) / cluster_weights
+
+        # Mean distance to the other points of the cluster
+        others = cluster_weights[unique_labels] - 1
+        a = np.divide(
+            within_distances, others, out=np.zeros_like(x), where=others > 0
+        )
+
+        # Mean distance to the nearest adjacent cluster
+        previous_means = np.concatenate([[-np.inf], cluster_means[:-1]])
+        next_means = np.concatenate([cluster_means[1:], [np.inf]])
+        b = np.minimum(
+            x - previous_means[unique_labels], next_means[unique_labels] - x
+        )
+
+        # Points alone in their cluster score 0
+        largest = np.maximum(a, b)
+        silhouettes = np.divide(
+            b - a, largest, out=np.zeros_like(x), where=(others > 0) & (largest > 0)
+        )
+
+        return float(np.sum(self.weights * silhouettes) / self.num_points)
+
+    def get_optimal_num_of_clusters(self, cluster_range):
+        """Returns the number of clusters with the highest silhouette score, or None if
+        no number of clusters of the range can be formed."""
+        scores = {
+            k: self.get_silhouette_score(k)
+            for k in cluster_range
+            if 2 <= k <= self.max_clusters
+        }
+
+        if not scores:
+            return None
+
+        return max(scores, key=scores.get)
@@ -1,14 +1,51 @@
+import threading
+from functools import partial
+
+from flask import current_app, has_app_context
 import numpy as np
 from sklearn.cluster import KMeans
-from sklearn.metrics import silhouette_score
 from sklearn.preprocessing import MinMaxScaler
 
 from app import db
 from app.models.Cluster.model import Cluster
 from app.models.Segmentation.model import Segmentation
+from app.services.datasetfile_services import DatasetFileService
+from app.services.executor_services import ExecutorService
+from app.services.segmentation.clustering_cache_services import ClusteringCache
+from app.services.segmentation.customer_aggregation_services import (
+    CustomerAggregationService,
+)
+from app.services.segmentation.kmeans_1d_services import KMeans1D
+from app.services.segmentation.silhouette_services import (
+    SilhouetteEstimate,
+    SilhouetteService,
+)
 
 
 class SegmentationService:
+    # Numbers of clusters tried by the automatic clustering
+    cluster_range = range(2, 11)
+
+    # Metrics engineered for segmentation, each offered to cluster the customers on
+    segmentation_metrics = [
+        "Total Visits",
+        "Total Sales",
+        "Total Quantity",
+        "Average Weekly Visits",
+        "Average Weekly Sales",
+        "Average Weekly Quantity",
+        "Average Monthly Visits",
+        "Average Monthly Sales",
+        "Average Monthly Quantity",
+        "Average Quarterly Visits",
+        "Average Quarterly Sales",
+        "Average Quarterly Quantity",
+    ]
+
+    # Background clusterings in progress by (dataset file path, metric, engine)
+    _precompute_futures = {}
+    _precompute_lock = threading.RLock()
+
     @staticmethod
     def save_to_db(dataset_file_id, chosen_metric, cluster_counts, metric_averages):
         """Saves the segmentation and cluster details to the database."""
@@ -42,33 +79,21 @@ class SegmentationService:
         db.session.commit()
 
     @staticmethod
-    def segment_customers(df, num_of_clusters, chosen_metric):
+    def segment_customers(df, num_of_clusters, chosen_metric, engine=None):
         """Performs KMeans Clustering and returns cluster profiles (cluster counts and metric averages)."""
         try:
-            # Set a copy of the original dataset with the chosen metric
-            df_original = df[[chosen_metric]].copy()
-
-            # Scale the dataset with the chosen metric
-            df_clustering = df[[chosen_metric]].copy()
-            df_clustering = SegmentationService.scale_dataset(df_clustering)
-
-            # Number of clusters
-            n_clusters = (
-                SegmentationService.get_optimal_num_of_clusters(df_clustering)
-                if num_of_clusters == "auto"
-                else int(num_of_clusters)
+            n_clusters, labels_by_k, _ = SegmentationService.cluster_metric(
+                df, num_of_clusters, chosen_metric, engine
             )
 
-            if n_clusters is None or n_clusters < 2:
+            if n_clusters is None:
                 return None, None
 
-            # Initialize KMeans model
-            kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+            # Set a copy of the original dataset with the chosen metric
+            df_original = df[[chosen_metric]].copy()
 
             # Cluster the data and return labels
-            df_original["Cluster"] = kmeans.fit_predict(
-                df_clustering
-            )  # this line is where the error starts
+            df_original["Cluster"] = labels_by_k[n_clusters]
 
             # Calculate the cluster counts and the metric averages
             cluster_counts, metric_averages = SegmentationService.get_cluster_profiles(
@@ -81,225 +106,345 @@ class SegmentationService:
             print(f"Error when clustering: {str(e)}")
 
     @staticmethod
-    def get_optimal_num_of_clusters(df_clustering):
-        """Returns the number of clusters with the highest silhouette score."""
+    def segment_dataset_file(
+        file_path,
+        num_of_clusters,
+        chosen_metric,
+        engine=None,
+        wait_for_precompute=True,
+    ):
+        """Returns the cluster profiles (cluster counts and metric averages) of the
+        chosen metric of a stored dataset file. Every number of clusters computed for
+        the file and metric is cached, so the file is only read and clustered again for
+        a number of clusters not computed yet."""
         try:
-            cluster_range = range(2, 11)
-            silhouette_scores = []
+            if engine is None:
+                engine = SegmentationService.get_segmentation_engine()
+
+            cache_key = (file_path, chosen_metric, engine)
+            result = ClusteringCache.get_result(cache_key, num_of_clusters)
+
+            # Wait for a background clustering of the same file and metric, if any
+            if result is None and wait_for_precompute:
+                future = SegmentationService.get_precompute_future(cache_key)
+                if future is not None:
+                    future.result()
+                    result = ClusteringCache.get_result(cache_key, num_of_clusters)
+
+            if result is None:
+                # Get only the chosen metric from the dataset file
+                df = DatasetFileService.read_dataset(file_path, columns=[chosen_metric])
+
+                n_clusters, labels_by_k, silhouette = (
+                    SegmentationService.cluster_metric(
+                        df, num_of_clusters, chosen_metric, engine
+                    )
+                )
+
+                if n_clusters is None:
+                    return None, None
+
+                # Keep the profiles of every number of clusters fitted on the way, and
+                # the silhouette estimate of the number of clusters chosen
+                df_original = df[[chosen_metric]].copy()
+                results = {}
+                for k, labels in labels_by_k.items():
+                    df_original["Cluster"] = labels
+                    results[k] = ClusteringCache.create_result(
+                        labels,
+                        *SegmentationService.get_cluster_profiles(
+                            df_original, chosen_metric
+                        ),
+                        silhouette=silhouette if k == n_clusters else None,
+                    )
+
+                ClusteringCache.put_results(
+                    cache_key,
+                    results,
+                    auto_num_of_clusters=(
+                        n_clusters if num_of_clusters == "auto" else None
+                    ),
+                )
+                result = results[n_clusters]
+
+            return result.cluster_counts, result.metric_averages
+        except Exception as e:
+            print(f"Error when clustering: {str(e)}")
+            return None, None
+
+    @staticmethod
+    def precompute_dataset_file(file_path, engine=None):
+        """Clusters every segmentation metric of a stored dataset file automatically on
+        a background pool, filling the clustering cache before the user picks a metric.
+        Returns the futures of the metrics submitted, by metric."""
+        if engine is None:
+            engine = SegmentationService.get_segmentation_engine()
+
+        app = current_app._get_current_object()
+        executor = ExecutorService.get_executor(
+            "segmentation-precompute",
+            kind="thread",
+            max_workers=app.config["SEGMENTATION_PRECOMPUTE_WORKERS"],
+        )
 
-            for k in cluster_range:
-                kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-                labels = kmeans.fit_predict(df_clustering)
+        futures = {}
+        with SegmentationService._precompute_lock:
+            for chosen_metric in SegmentationService.segmentation_metrics:
+                cache_key = (file_path, chosen_metric, engine)
 
-                # Check if less than 2 clusters were found
-                if len(set(labels)) < 2:
-                    print(f"Only {len(set(labels))} distinct clusters found.")
+                # Already being clustered
+                if cache_key in SegmentationService._precompute_futures:
                     continue
-                    # return None
 
-                silhouette_avg = silhouette_score(df_clustering, labels)
-                silhouette_scores.append(silhouette_avg)
+                future = executor.submit(
+                    SegmentationService.precompute_metric,
+                    app,
+                    file_path,
+                    chosen_metric,
+                    engine,
+                )
+                SegmentationService._precompute_futures[cache_key] = future
+                future.add_done_callback(
+                    partial(SegmentationService.forget_precompute, cache_key)
+                )
+                futures[chosen_metric] = future
+
+        return futures
 
-            n_clusters = cluster_range[np.argmax(silhouette_scores)]
-            # print(f"Optimal k from sil score:{n_clusters}")
-            return n_clusters
-        except Exception as e:
-            print(f"Error during sil score: {str(e)}")
-            return None
+    @staticmethod
+    def precompute_metric(app, file_path, chosen_metric, engine):
+        """Clusters one metric of a dataset file automatically, in a pool thread."""
+        with app.app_context():
+            SegmentationService.segment_dataset_file(
+                file_path,
+                "auto",
+                chosen_metric,
+                engine=engine,
+                wait_for_precompute=False,
+            )
 
     @staticmethod
-    def scale_dataset(df):
-        """Scales the dataset."""
-        scaler = MinMaxScaler()
-        df_scaled = df.copy()
-        numcols = df.select_dtypes(include=[np.number]).columns.tolist()
-        df_scaled[numcols] = scaler.fit_transform(df_scaled[numcols])
+    def get_precompute_future(cache_key):
+        """Returns the future of the background clustering of a dataset file and metric,
+        or None if it is not in progress."""
+        with SegmentationService._precompute_lock:
+            return SegmentationService._precompute_futures.get(cache_key)
 
-        return df_scaled
+    @staticmethod
+    def forget_precompute(cache_key, future=None):
+        """Removes a finished background clustering."""
+        with SegmentationService._precompute_lock:
+            SegmentationService._precompute_futures.pop(cache_key, None)
 
     @staticmethod
-    def get_cluster_profiles(df_original, chosen_metric):
-        """Calculates the cluster counts and metric averages."""
-        cluster_counts = df_original["Cluster"].value_counts().to_dict()
-        metric_averages = df_original.groupby("Cluster")[chosen_metric].mean().to_dict()
+    def cluster_metric(df, num_of_clusters, chosen_metric, engine=None):
+        """Clusters the scaled chosen metric and returns the number of clusters chosen,
+        or None if fewer than two clusters can be formed, the labels of every number of
+        clusters fitted on the way, by number of clusters, and the silhouette estimate
+        of the number of clusters chosen automatically, or None if it was given."""
+        if engine is None:
+            engine = SegmentationService.get_segmentation_engine()
+
+        # Scale the dataset with the chosen metric
+        df_clustering = df[[chosen_metric]].copy()
+        df_clustering = SegmentationService.scale_dataset(df_clustering)
+
+        if engine == "kmeans1d":
+            return SegmentationService.cluster_1d_all(
+                df_clustering[chosen_metric], num_of_clusters
+            )
 
-        return cluster_counts, metric_averages
+        if engine == "sklearn":
+            return SegmentationService.cluster_sklearn_all(
+                df_clustering, num_of_clusters
+            )
+
+        raise ValueError(f"Invalid segmentation engine, {engine}")
 
     @staticmethod
-    def engineer_features(df):
-        """Engineers totals and averages for segmentation."""
-        df_original = df[["Customer ID", "Order Date", "Quantity", "Sales"]]
+    def get_segmentation_engine():
+        """Returns the configured clustering engine, or the exact 1-D engine outside of
+        an app context."""
+        if has_app_context():
+            return current_app.config["SEGMENTATION_ENGINE"]
+        return "kmeans1d"
 
-        # Engineering totals for Quantity, Sales, and Visits
-        df_totals = SegmentationService.engineer_totals(df_original)
+    @staticmethod
+    def cluster_1d(values, num_of_clusters):
+        """Clusters a single metric exactly and returns the labels, or None if fewer
+        than two clusters can be formed."""
+        n_clusters, labels_by_k, _ = SegmentationService.cluster_1d_all(
+            values, num_of_clusters
+        )
+        return None if n_clusters is None else labels_by_k[n_clusters]
 
-        # Engineering Year-Week, Year-Month, Year-Quarter columns
-        df_timeframes = SegmentationService.engineer_timeframes(df_original)
+    @staticmethod
+    def cluster_1d_all(values, num_of_clusters):
+        """Clusters a single metric exactly and returns the number of clusters chosen,
+        the labels of every number of clusters up to the largest of the range, which one
+        fit of the 1-D engine computes anyway, and the exact silhouette estimate of the
+        number of clusters chosen automatically."""
+        max_clusters = max(
+            max(SegmentationService.cluster_range),
+            2 if num_of_clusters == "auto" else int(num_of_clusters),
+        )
+        kmeans = KMeans1D(values, max_clusters=max_clusters)
 
-        # Engineering weekly averages for Quantity, Sales, and Visits
-        df_weekly = SegmentationService.engineer_weekly_avgs(df_timeframes)
+        # Number of clusters, limited by the number of distinct values
+        n_clusters = (
+            kmeans.get_optimal_num_of_clusters(SegmentationService.cluster_range)
+            if num_of_clusters == "auto"
+            else min(int(num_of_clusters), kmeans.max_clusters)
+        )
 
-        # Engineering monthly averages for Quantity, Sales, and Visits
-        df_monthly = SegmentationService.engineer_monthly_avgs(df_timeframes)
+        if n_clusters is None or n_clusters < 2:
+            return None, {}, None
 
-        # Engineering quarterly averages for Quantity, Sales, and Visits
-        df_quarterly = SegmentationService.engineer_quarterly_avgs(df_timeframes)
+        labels_by_k = {
+            k: kmeans.get_labels(k) for k in range(2, kmeans.max_clusters + 1)
+        }
 
-        # Merging all features into a single dataframe
-        df_final = SegmentationService.merge_all_features(
-            df_totals, df_weekly, df_monthly, df_quarterly
-        )
+        # The silhouette score of the 1-D engine is exact
+        silhouette = None
+        if num_of_clusters == "auto":
+            silhouette = SilhouetteEstimate(
+                kmeans.get_silhouette_score(n_clusters), 0.0, len(values)
+            )
 
-        return df_final
+        return n_clusters, labels_by_k, silhouette
 
     @staticmethod
-    def engineer_totals(df_original):
-        """Engineers total sales, quantity, and visits from the dataset"""
-        # Creating the total sales, quantity, and visits
-        df_totals = (
-            df_original.groupby("Customer ID")
-            .agg(
-                {
-                    "Order Date": "nunique",
-                    "Sales": "sum",
-                    "Quantity": "sum",
-                }
-            )
-            .reset_index()
+    def cluster_sklearn(df_clustering, num_of_clusters):
+        """Clusters the scaled dataset with scikit-learn's KMeans and returns the
+        labels, or None if fewer than two clusters are requested."""
+        n_clusters, labels_by_k, _ = SegmentationService.cluster_sklearn_all(
+            df_clustering, num_of_clusters
         )
+        return None if n_clusters is None else labels_by_k[n_clusters]
 
-        # Renaming columns appropriately
-        df_totals.rename(
-            columns={
-                "Order Date": "Total Visits",
-                "Sales": "Total Sales",
-                "Quantity": "Total Quantity",
-            },
-            inplace=True,
-        )
+    @staticmethod
+    def cluster_sklearn_all(df_clustering, num_of_clusters):
+        """Clusters the scaled dataset with scikit-learn's KMeans and returns the number
+        of clusters chosen, the labels of every number of clusters fitted, and the
+        silhouette estimate of the number of clusters chosen automatically."""
+        # The automatic clustering reuses the models fitted by the sweep
+        if num_of_clusters == "auto":
+            n_clusters, models, silhouette = SegmentationService.fit_auto_kmeans(
+                df_clustering
+            )
+            labels_by_k = {k: kmeans.labels_ for k, kmeans in models.items()}
+            return n_clusters, labels_by_k, silhouette
 
-        return df_totals
+        # Number of clusters
+        n_clusters = int(num_of_clusters)
 
-    @staticmethod
-    def engineer_timeframes(df_original):
-        """Engineers Year-Week, Year-Month, and Year-Quarter features."""
-        df_timeframes = df_original.copy()
+        if n_clusters < 2:
+            return None, {}, None
 
-        # Year-Week
-        df_timeframes["Year-Week"] = df_timeframes["Order Date"].dt.strftime("%Y-%U")
+        # Initialize KMeans model
+        kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
 
-        # Year-Month
-        df_timeframes["Year-Month"] = df_timeframes["Order Date"].dt.strftime("%Y-%m")
+        return n_clusters, {n_clusters: kmeans.fit_predict(df_clustering)}, None
 
-        # Year-Quarter
-        df_timeframes["Year-Quarter"] = df_timeframes["Order Date"].dt.to_period("Q")
+    @staticmethod
+    def get_optimal_num_of_clusters(df_clustering):
+        """Returns the number of clusters with the highest silhouette score."""
+        n_clusters, _ = SegmentationService.choose_num_of_clusters(df_clustering)
+        return n_clusters
 
-        return df_timeframes
+    @staticmethod
+    def choose_num_of_clusters(df_clustering):
+        """Returns the number of clusters with the highest silhouette score and its
+        silhouette estimate, with the confidence of the score."""
+        n_clusters, _, silhouette = SegmentationService.fit_auto_kmeans(df_clustering)
+        return n_clusters, silhouette
 
     @staticmethod
-    def engineer_weekly_avgs(df_timeframes):
-        """Engineers weekly averages of sales, quantity, and visits from the dataset."""
-        # Calculating total per week for each customer
-        df_weekly = (
-            df_timeframes.groupby(["Customer ID", "Year-Week"])
-            .agg(
-                **{
-                    "Weekly Visits": ("Order Date", "nunique"),
-                    "Weekly Sales": ("Sales", "sum"),
-                    "Weekly Quantity": ("Quantity", "sum"),
-                }
-            )
-            .reset_index()
-        )
+    def fit_auto_kmeans(df_clustering):
+        """Fits a KMeans model for each number of clusters of the range and returns the
+        number of clusters with the highest silhouette score, or None if none can be
+        scored, the fitted models by number of clusters, and the silhouette estimate of
+        the number of clusters chosen, with the confidence of its score."""
+        try:
+            X = np.ascontiguousarray(np.asarray(df_clustering, dtype=np.float64))
+            models = SegmentationService.fit_cluster_range(X)
 
-        # Calculating the weekly averages
-        df_weekly = (
-            df_weekly.groupby("Customer ID")
-            .agg(
-                **{
-                    "Average Weekly Visits": ("Weekly Visits", "mean"),
-                    "Average Weekly Sales": ("Weekly Sales", "mean"),
-                    "Average Weekly Quantity": ("Weekly Quantity", "mean"),
-                }
+            # Score each number of clusters with the configured silhouette mode
+            n_clusters, silhouette = SilhouetteService.choose_num_of_clusters(
+                X, {k: kmeans.labels_ for k, kmeans in models.items()}
             )
-            .reset_index()
-        )
 
-        return df_weekly
+            return n_clusters, models, silhouette
+        except Exception as e:
+            print(f"Error during sil score: {str(e)}")
+            return None, {}, None
 
     @staticmethod
-    def engineer_monthly_avgs(df_timeframes):
-        """Engineers monthly averages of sales, quantity, and visits from the dataset."""
-        # Calculating total per month for each customer
-        df_monthly = (
-            df_timeframes.groupby(["Customer ID", "Year-Month"])
-            .agg(
-                **{
-                    "Monthly Visits": ("Order Date", "nunique"),
-                    "Monthly Sales": ("Sales", "sum"),
-                    "Monthly Quantity": ("Quantity", "sum"),
-                }
-            )
-            .reset_index()
+    def fit_cluster_range(X, cluster_range=None):
+        """Fits a KMeans model for each number of clusters of the range concurrently,
+        on a bounded thread pool sharing the array X, and returns the fitted models
+        that found at least two distinct clusters, by number of clusters."""
+        if cluster_range is None:
+            cluster_range = SegmentationService.cluster_range
+
+        executor = ExecutorService.get_executor(
+            "segmentation-sweep",
+            kind="thread",
+            max_workers=SegmentationService.get_sweep_workers(),
         )
 
-        # Calculating the monthly averages
-        df_monthly = (
-            df_monthly.groupby("Customer ID")
-            .agg(
-                **{
-                    "Average Monthly Visits": ("Monthly Visits", "mean"),
-                    "Average Monthly Sales": ("Monthly Sales", "mean"),
-                    "Average Monthly Quantity": ("Monthly Quantity", "mean"),
-                }
-            )
-            .reset_index()
-        )
+        # Larger numbers of clusters take longer, so they are started first
+        futures = {
+            k: executor.submit(SegmentationService.fit_kmeans, X, k)
+            for k in sorted(cluster_range, reverse=True)
+        }
 
-        return df_monthly
+        models = {}
+        for k in cluster_range:
+            kmeans = futures[k].result()
+            num_labels = len(np.unique(kmeans.labels_))
 
-    @staticmethod
-    def engineer_quarterly_avgs(df_timeframes):
-        """Engineers quarterly averages of sales, quantity, and visits from the dataset."""
-        # Calculating total per quarter for each customer
-        df_quarterly = (
-            df_timeframes.groupby(["Customer ID", "Year-Quarter"])
-            .agg(
-                **{
-                    "Quarterly Visits": ("Order Date", "nunique"),
-                    "Quarterly Sales": ("Sales", "sum"),
-                    "Quarterly Quantity": ("Quantity", "sum"),
-                }
-            )
-            .reset_index()
-        )
+            # Check if less than 2 clusters were found
+            if num_labels < 2:
+                print(f"Only {num_labels} distinct clusters found.")
+                continue
 
-        # Calculating the quarterly averages
-        df_quarterly = (
-            df_quarterly.groupby("Customer ID")
-            .agg(
-                **{
-                    "Average Quarterly Visits": ("Quarterly Visits", "mean"),
-                    "Average Quarterly Sales": ("Quarterly Sales", "mean"),
-                    "Average Quarterly Quantity": ("Quarterly Quantity", "mean"),
-                }
-            )
-            .reset_index()
-        )
+            models[k] = kmeans
+
+        return models
 
-        return df_quarterly
+    @staticmethod
+    def fit_kmeans(X, n_clusters):
+        """Fits a KMeans model with the given number of clusters."""
+        return KMeans(n_clusters=n_clusters, random_state=42, n_init=10).fit(X)
+
+    @staticmethod
+    def get_sweep_workers():
+        """Returns the configured number of concurrent fits of the automatic clustering,
+        or the default outside of an app context."""
+        if has_app_context():
+            return current_app.config["SEGMENTATION_SWEEP_WORKERS"]
+        return 4
 
     @staticmethod
-    def merge_all_features(*dfs):
-        """Horizontally merges multiple dataframes by Customer ID into a single dataset."""
+    def scale_dataset(df):
+        """Scales the dataset."""
+        scaler = MinMaxScaler()
+        df_scaled = df.copy()
+        numcols = df.select_dtypes(include=[np.number]).columns.tolist()
+        df_scaled[numcols] = scaler.fit_transform(df_scaled[numcols])
 
-        df_overall = dfs[0]
+        return df_scaled
 
-        # Adding each set of averages one by one to the set of totals
-        for df in dfs[1:]:
-            df_overall = df_overall.merge(df, on="Customer ID", how="left")
+    @staticmethod
+    def get_cluster_profiles(df_original, chosen_metric):
+        """Calculates the cluster counts and metric averages."""
+        cluster_counts = df_original["Cluster"].value_counts().to_dict()
+        metric_averages = df_original.groupby("Cluster")[chosen_metric].mean().to_dict()
 
-        # Replacing any NaN values that may form due to left join
-        df_overall.fillna(0, inplace=True)
+        return cluster_counts, metric_averages
 
-        return df_overall
+    @staticmethod
+    def engineer_features(df):
+        """Engineers totals and averages for segmentation."""
+        return CustomerAggregationService.engineer_features(df)
@@ -0,0 +1,213 @@
+from collections import namedtuple
+
+from flask import current_app, has_app_context
+import numpy as np
+from sklearn.metrics import silhouette_samples, silhouette_score
+
+# Silhouette score with the half-width of its 95% confidence interval, which is 0 for
+# exact scores and None for approximations without an error bound
+SilhouetteEstimate = namedtuple(
+    "SilhouetteEstimate", ["score", "half_width", "num_samples"]
+)
+
+
+class SilhouetteService:
+    """Scores the candidate numbers of clusters of the automatic clustering.
+    The exact silhouette score compares every pair of customers, so its time and memory
+    grow quadratically. It can be estimated from a stratified sample of the customers
+    instead, or approximated by comparing each customer to the cluster centroids."""
+
+    # Ways of computing the silhouette score
+    modes = ("exact", "sampled", "simplified")
+
+    # Number of strata of the sample, each an equal share of the sorted customers
+    num_strata = 10
+
+    # z-score of the 95% confidence interval
+    z_score = 1.96
+
+    # Factor by which the sample grows when rescoring close contenders
+    rescore_factor = 4
+
+    @staticmethod
+    def get_config():
+        """Returns the configured mode, sample size, and random seed, or the defaults
+        outside of an app context."""
+        if has_app_context():
+            return (
+                current_app.config["SILHOUETTE_MODE"],
+                current_app.config["SILHOUETTE_SAMPLE_SIZE"],
+                current_app.config["SILHOUETTE_RANDOM_STATE"],
+            )
+        return "sampled", 5000, 42
+
+    @staticmethod
+    def get_optimal_num_of_clusters(X, labels_by_k, mode=None, sample_size=None):
+        """Returns the number of clusters whose labels score the highest silhouette."""
+        n_clusters, _ = SilhouetteService.choose_num_of_clusters(
+            X, labels_by_k, mode, sample_size
+        )
+        return n_clusters
+
+    @staticmethod
+    def choose_num_of_clusters(X, labels_by_k, mode=None, sample_size=None):
+        """Returns the number of clusters whose labels score the highest silhouette and
+        its silhouette estimate, with the confidence of the score, or None and None if
+        there are no labels. Estimated scores whose confidence intervals overlap the
+        best one are scored again on a larger sample, so sampling noise does not decide
+        between them."""
+        default_mode, default_sample_size, random_state = SilhouetteService.get_config()
+        if mode is None:
+            mode = default_mode
+        if sample_size is None:
+            sample_size = default_sample_size
+
+        X = np.asarray(X, dtype=np.float64)
+        if not labels_by_k:
+            return None, None
+
+        estimates = {
+            k: SilhouetteService.estimate(X, labels, mode, sample_size, random_state)
+            for k, labels in labels_by_k.items()
+        }
+
+        if mode == "sampled":
+            best = max(estimates.values(), key=lambda estimate: estimate.score)
+            contenders = [
+                k
+                for k, estimate in estimates.items()
+                if estimate.score + estimate.half_width
+                >= best.score - best.half_width
+            ]
+
+            if len(contenders) > 1 and best.num_samples < len(X):
+                for k in contenders:
+                    estimates[k] = SilhouetteService.estimate(
+                        X,
+                        labels_by_k[k],
+                        mode,
+                        sample_size * SilhouetteService.rescore_factor,
+                        random_state,
+                    )
+
+        for k, estimate in estimates.items():
+            confidence = (
+                "approximate"
+                if estimate.half_width is None
+                else f"± {estimate.half_width:.4f}"
+            )
+            print(
+                f"Silhouette score ({mode}) of {k} clusters: {estimate.score:.4f} "
+                f"{confidence}, {estimate.num_samples} customers"
+            )
+
+        n_clusters = max(estimates, key=lambda k: estimates[k].score)
+
+        return n_clusters, estimates[n_clusters]
+
+    @staticmethod
+    def estimate(X, labels, mode, sample_size, random_state=42):
+        """Returns the silhouette estimate of the labels with the given mode."""
+        if mode == "exact":
+            return SilhouetteEstimate(float(silhouette_score(X, labels)), 0.0, len(X))
+
+        if mode == "sampled":
+            return SilhouetteService.estimate_sampled(
+                X, labels, sample_size, random_state
+            )
+
+        if mode == "simplified":
+            return SilhouetteService.estimate_simplified(X, labels)
+
+        raise ValueError(f"Invalid silhouette mode, {mode}")
+
+    @staticmethod
+    def get_stratified_sample(X, sample_size, random_state=42):
+        """Returns the positions of a sample of the customers, the stratum of each, and
+        the strata. The customers are sorted by their first feature and cut into strata
+        of equal size, each sampled equally with a fixed seed, so every number of
+        clusters is scored on the same customers and every range of the metric is
+        represented."""
+        num_strata = min(SilhouetteService.num_strata, len(X))
+        order = np.argsort(X[:, 0], kind="stable")
+        strata = np.array_split(order, num_strata)
+        rng = np.random.default_rng(random_state)
+
+        positions = []
+        stratum_ids = []
+        for stratum_id, stratum in enumerate(strata):
+            num_samples = min(len(stratum), max(sample_size // num_strata, 1))
+            positions.append(rng.choice(stratum, size=num_samples, replace=False))
+            stratum_ids.append(np.full(num_samples, stratum_id))
+
+        return np.concatenate(positions), np.concatenate(stratum_ids), strata
+
+    @staticmethod
+    def estimate_sampled(X, labels, sample_size, random_state=42):
+        """Estimates the silhouette score from a stratified sample of the customers,
+        with the confidence interval of the stratified mean."""
+        labels = np.asarray(labels)
+
+        # Small datasets are scored exactly
+        if len(X) <= sample_size:
+            return SilhouetteService.estimate(X, labels, "exact", sample_size)
+
+        positions, stratum_ids, strata = SilhouetteService.get_stratified_sample(
+            X, sample_size, random_state
+        )
+        sample_labels = labels[positions]
+
+        # The silhouette is undefined when the sample holds a single cluster
+        if len(np.unique(sample_labels)) < 2:
+            return SilhouetteEstimate(0.0, 1.0, len(positions))
+
+        silhouettes = silhouette_samples(X[positions], sample_labels)
+
+        # Mean and variance of the stratified mean, each stratum weighted by its size
+        score = 0.0
+        variance = 0.0
+        for stratum_id, stratum in enumerate(strata):
+            stratum_silhouettes = silhouettes[stratum_ids == stratum_id]
+            weight = len(stratum) / len(X)
+            num_samples = len(stratum_silhouettes)
+
+            score += weight * stratum_silhouettes.mean()
+            if num_samples > 1:
+                finite_population = 1 - num_samples / len(stratum)
+                variance += (
+                    weight**2
+                    * stratum_silhouettes.var(ddof=1)
+                    / num_samples
+                    * finite_population
+                )
+
+        return SilhouetteEstimate(
+            float(score),
+            float(SilhouetteService.z_score * np.sqrt(variance)),
+            len(positions),
+        )
+
+    @staticmethod
+    def estimate_simplified(X, labels):
+        """Approximates the silhouette score by measuring the distances of each customer
+        to the cluster centroids instead of to every other customer, in O(n * k)."""
+        labels = np.asarray(labels)
+        cluster_ids, cluster_codes = np.unique(labels, return_inverse=True)
+
+        centroids = np.stack(
+            [X[cluster_codes == code].mean(axis=0) for code in range(len(cluster_ids))]
+        )
+        distances = np.sqrt(
+            ((X[:, np.newaxis, :] - centroids[np.newaxis, :, :]) ** 2).sum(axis=2)
+        )
+
+        # Distance to the own centroid and to the nearest other centroid
+        rows = np.arange(len(X))
+        a = distances[rows, cluster_codes]
+        distances[rows, cluster_codes] = np.inf
+        b = distances.min(axis=1)
+
+        largest = np.maximum(a, b)
+        silhouettes = np.divide(b - a, largest, out=np.zeros_like(a), where=largest > 0)
+
+        return SilhouetteEstimate(float(silhouettes.mean()), None, len(X))
@@ -0,0 +1,287 @@
+from collections import namedtuple
+
+from flask import current_app, has_app_context
+import numpy as np
+import pandas as pd
+
+from app.services.dtype_policy_services import DtypePolicyService
+from app.services.timeframe_feature_services import TimeframeFeatureService
+
+# Cleaned dataset reduced to the sums of each product and each customer per order date;
+# the summed Price of a product comes with the number of rows summed, its Row Count.
+# The sorted fingerprints of the distinct rows let later rows be told apart from them
+StreamedDataset = namedtuple(
+    "StreamedDataset",
+    ["products", "customers", "num_rows", "num_duplicates", "fingerprints"],
+)
+
+
+class FingerprintSet:
+    """Set of 64-bit row fingerprints, held as sorted arrays of 8 bytes per row instead
+    of Python integers. New fingerprints are added as a sorted run, and runs of similar
+    size are merged, so there are only logarithmically many runs to search."""
+
+    def __init__(self, fingerprints=None):
+        self.runs = []
+
+        if fingerprints is not None and len(fingerprints) > 0:
+            self.runs.append(np.unique(np.asarray(fingerprints, dtype=np.uint64)))
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    @staticmethod
+    def fingerprint_rows(df):
+        """Returns the 64-bit fingerprint of each row of a dataset with parsed dates,
+        hashing IDs as strings and numbers as float64, so that rows equal once cleaned
+        share a fingerprint however their columns were typed."""
+        return pd.util.hash_pandas_object(
+            pd.DataFrame(
+                {
+                    "Product ID": df["Product ID"],
+                    "Customer ID": df["Customer ID"],
+                    "Order Date": df["Order Date"].to_numpy(dtype="datetime64[ns]"),
+                    "Price": df["Price"].to_numpy(dtype=np.float64),
+                    "Quantity": df["Quantity"].to_numpy(dtype=np.float64),
+                    "Sales": df["Sales"].to_numpy(dtype=np.float64),
+                },
+                index=df.index,
+            ),
+            index=False,
+        ).to_numpy()
+
+    def to_array(self):
+        """Returns every fingerprint of the set, sorted."""
+        if not self.runs:
+            return np.zeros(0, dtype=np.uint64)
+
+        return np.sort(np.concatenate(self.runs))
+
+    def contains(self, fingerprints):
+        """Returns whether each fingerprint is in the set."""
+        found = np.zeros(len(fingerprints), dtype=bool)
+
+        for run in self.runs:
+            positions = np.minimum(np.searchsorted(run, fingerprints), len(run) - 1)
+            found |= run[positions] == fingerprints
+
+        return found
+
+    def add_new(self, fingerprints):
+        """Adds the fingerprints and returns whether each was new, counting only the
+        first occurrence of a repeated fingerprint as new."""
+        fingerprints = np.asarray(fingerprints, dtype=np.uint64)
+        is_new = np.zeros(len(fingerprints), dtype=bool)
+
+        _, first_positions = np.unique(fingerprints, return_index=True)
+        is_new[first_positions] = True
+        is_new &= ~self.contains(fingerprints)
+
+        if is_new.any():
+            self.runs.append(np.sort(fingerprints[is_new]))
+
+            while len(self.runs) > 1 and len(self.runs[-2]) <= 2 * len(self.runs[-1]):
+                newest = self.runs.pop()
+                self.runs[-1] = np.sort(
+                    np.concatenate([self.runs[-1], newest]), kind="mergesort"
+                )
+
+        return is_new
+
+
+class RunningAggregate:
+    """Sums of value columns per group, fed one chunk at a time. The partial sums of
+    the chunks are combined once they outgrow the combined sums, so the memory held
+    stays proportional to the number of groups rather than of rows."""
+
+    # Number of partial rows always allowed before combining
+    min_partial_rows = 100_000
+
+    def __init__(self, key_cols, value_cols):
+        self.key_cols = key_cols
+        self.value_cols = value_cols
+
+        self._combined = None
+        self._partials = []
+        self._num_partial_rows = 0
+
+    def add(self, df):
+        """Adds the sums of the rows of a chunk."""
+        partial = df.groupby(self.key_cols, sort=False, observed=True)[
+            self.value_cols
+        ].sum()
+        self._partials.append(partial)
+        self._num_partial_rows += len(partial)
+
+        num_combined_rows = 0 if self._combined is None else len(self._combined)
+        if self._num_partial_rows > max(
+            RunningAggregate.min_partial_rows, num_combined_rows
+        ):
+            self.combine()
+
+    def combine(self):
+        """Combines the partial sums into the combined sums."""
+        if not self._partials:
+            return
+
+        frames = self._partials if self._combined is None else [self._combined]
+        if self._combined is not None:
+            frames += self._partials
+
+        self._combined = (
+            pd.concat(frames).groupby(level=self.key_cols, observed=True).sum()
+        )
+        self._partials = []
+        self._num_partial_rows = 0
+
+    def get_result(self):
+        """Returns the sums of each group, ordered by group."""
+        self.combine()
+
+        if self._combined is None:
+            return pd.DataFrame(columns=self.key_cols + self.value_cols)
+
+        return self._combined.sort_index().reset_index()
+
+
+class StreamingIngestionService:
+    """Ingests CSV uploads too large to be parsed at once. The file is read in chunks,
+    each validated and cleaned as a whole dataset would be, with duplicate rows
+    detected across chunks by their fingerprints. The cleaned rows are reduced to the
+    sums of each product and each customer per order date, from which every timeframe
+    and customer feature is engineered, so whole rows are never held at once."""
+
+    # Columns required in the dataset
+    required_cols = [
+        "Product ID",
+        "Customer ID",
+        "Order Date",
+        "Price",
+        "Quantity",
+        "Sales",
+    ]
+
+    @staticmethod
+    def get_chunk_size():
+        """Returns the configured number of rows per chunk, or the default outside of
+        an app context."""
+        if has_app_context():
+            return current_app.config["DATASET_CHUNK_SIZE"]
+        return 100_000
+
+    @staticmethod
+    def read_chunks(file, chunk_size=None):
+        """Returns an iterator over the chunks of a CSV file, with IDs read as strings
+        and only the required columns kept."""
+        if chunk_size is None:
+            chunk_size = StreamingIngestionService.get_chunk_size()
+
+        file.seek(0)
+        return pd.read_csv(
+            file,
+            encoding="utf-8",
+            chunksize=chunk_size,
+            usecols=lambda col: col in StreamingIngestionService.required_cols,
+            dtype={"Product ID": str, "Customer ID": str},
+        )
+
+    @staticmethod
+    def ingest_csv(file, chunk_size=None):
+        """Validates, cleans, and aggregates a CSV file chunk by chunk.
+        Returns the validity, a message, and the streamed dataset if valid."""
+        fingerprints = FingerprintSet()
+        products = RunningAggregate(
+            ["Product ID", "Order Date"],
+            ["Price", "Quantity", "Sales", TimeframeFeatureService.count_col],
+        )
+        customers = RunningAggregate(
+            ["Customer ID", "Order Date"], ["Quantity", "Sales"]
+        )
+        num_rows = 0
+        num_duplicates = 0
+
+        try:
+            for chunk in StreamingIngestionService.read_chunks(file, chunk_size):
+                is_valid, message = StreamingIngestionService.validate_chunk(chunk)
+                if not is_valid:
+                    return False, message, None
+
+                num_rows += len(chunk)
+                chunk, chunk_duplicates = StreamingIngestionService.clean_chunk(
+                    chunk, fingerprints
+                )
+                num_duplicates += chunk_duplicates
+
+                products.add(chunk)
+                customers.add(chunk)
+
+        except (ValueError, UnicodeDecodeError, pd.errors.ParserError) as e:
+            print(f"Error while streaming dataset: {e}")
+            return False, "Invalid file format.", None
+
+        if num_rows == 0:
+            return False, "Empty dataset.", None
+
+        print(
+            f"Streamed {num_rows} rows, {num_duplicates} duplicates, "
+            f"{len(fingerprints)} distinct rows"
+        )
+
+        return (
+            True,
+            "Valid dataset.",
+            StreamedDataset(
+                products.get_result(),
+                customers.get_result(),
+                num_rows,
+                num_duplicates,
+                fingerprints.to_array(),
+            ),
+        )
+
+    @staticmethod
+    def validate_chunk(chunk):
+        """Validates the columns and datatypes of a chunk."""
+        if any(
+            col not in chunk.columns for col in StreamingIngestionService.required_cols
+        ):
+            return False, "Missing columns."
+
+        # Every date must be valid, as in a dataset validated at once
+        order_dates = DtypePolicyService.parse_dates(
+            chunk["Order Date"], errors="coerce"
+        )
+        if order_dates.isna().any():
+            return False, "Incorrect datatypes."
+
+        for col in ["Quantity", "Sales", "Price"]:
+            if not np.issubdtype(chunk[col].dtype, np.number):
+                return False, "Incorrect datatypes."
+
+        return True, "Valid dataset."
+
+    @staticmethod
+    def clean_chunk(chunk, fingerprints):
+        """Cleans a chunk as a whole dataset is cleaned, dropping the rows already seen
+        in this or an earlier chunk. Returns the cleaned chunk and its duplicates."""
+        chunk = chunk[StreamingIngestionService.required_cols].dropna()
+        chunk = chunk.assign(
+            **{"Order Date": DtypePolicyService.parse_dates(chunk["Order Date"])}
+        )
+
+        # Rows are fingerprinted once their dates are parsed, as duplicates are
+        # dropped from a dataset validated at once
+        is_new = fingerprints.add_new(FingerprintSet.fingerprint_rows(chunk))
+        num_duplicates = int((~is_new).sum())
+        chunk = chunk[is_new]
+
+        # Drop impossible/nonsensical values
+        chunk = chunk[
+            (chunk["Price"] > 0) & (chunk["Quantity"] > 0) & (chunk["Sales"] > 0)
+        ]
+
+        chunk = chunk.assign(
+            **{TimeframeFeatureService.count_col: np.ones(len(chunk), dtype=np.int64)}
+        )
+
+        return chunk, num_duplicates
@@ -0,0 +1,244 @@
+import numpy as np
+import pandas as pd
+
+from app.services.timeframe_key_services import TimeframeKeyService
+
+
+class TimeframeFeatureService:
+    """Engineers the weekly, monthly, and quarterly features of each product for the
+    prediction and optimization models. The rows of a timeframe are aggregated per
+    product and period with integer codes, and the lag and ratio features are computed
+    in one pass over the aggregated arrays, without copying the dataset per feature.
+    Only the requested features are computed; the others can be asked for by name."""
+
+    # Unit of the column names of each timeframe, e.g. 'Price This Week'
+    units = {"weekly": "Week", "monthly": "Month", "quarterly": "Quarter"}
+
+    # Metrics aggregated per product and period, in the order of the columns
+    metrics = ["Price", "Quantity", "Sales"]
+
+    # Lag features, in the order of the columns
+    lag_metrics = ["Quantity", "Sales", "Price"]
+
+    # Features computed from the metrics of a period and of the one before it
+    derived_cols = [
+        "Price Change (%)",
+        "Sales Growth Rate",
+        "Stock to Sales Ratio",
+        "Momentum",
+        "Rolling Average Sales",
+        "Price-to-Sales Ratio",
+    ]
+
+    # Columns of the dataset the features are engineered from
+    source_cols = ["Product ID", "Order Date", "Price", "Quantity", "Sales"]
+
+    # Column of a pre-aggregated dataset counting the rows summed into each of its
+    # rows, whose Price is then the sum of their prices
+    count_col = "Row Count"
+
+    # Periods dropped at the start of each product; the lags were once engineered one
+    # after another, each dropping the first period left without a previous one
+    num_warmup_periods = 3
+
+    @staticmethod
+    def select_source_cols(df):
+        """Returns the columns of the dataset the features are engineered from."""
+        source_cols = TimeframeFeatureService.source_cols
+
+        if TimeframeFeatureService.count_col in df.columns:
+            return df[source_cols + [TimeframeFeatureService.count_col]]
+        return df[source_cols]
+
+    @staticmethod
+    def get_feature_cols(timeframe):
+        """Returns every lag and derived feature of the timeframe."""
+        unit = TimeframeFeatureService.units[timeframe]
+
+        return [
+            f"{metric} Last {unit}" for metric in TimeframeFeatureService.lag_metrics
+        ] + TimeframeFeatureService.derived_cols
+
+    @staticmethod
+    def engineer_features(df_timeframes, timeframe, feature_cols=None):
+        """Aggregates the dataset by Product ID and period of the timeframe and
+        engineers the requested lag and derived features, or all of them if None.
+        The aggregated price, quantity, and sales of the period are always kept."""
+        unit = TimeframeFeatureService.units[timeframe]
+        key_col = TimeframeKeyService.key_cols[timeframe]
+        all_feature_cols = TimeframeFeatureService.get_feature_cols(timeframe)
+
+        if feature_cols is None:
+            feature_cols = all_feature_cols
+
+        # The columns the model uses can be given as they are, metrics included
+        metric_cols = [
+            f"{metric} This {unit}" for metric in TimeframeFeatureService.metrics
+        ]
+        invalid_cols = set(feature_cols) - set(all_feature_cols) - set(metric_cols)
+        if invalid_cols:
+            raise ValueError(f"Invalid {timeframe} features, {sorted(invalid_cols)}")
+
+        columns = TimeframeFeatureService.aggregate(df_timeframes, key_col, unit)
+        product_codes = columns.pop("Product Code")
+
+        # Periods of each product with enough earlier periods
+        positions = TimeframeFeatureService.get_group_positions(product_codes)
+        keep = positions >= TimeframeFeatureService.num_warmup_periods
+
+        for metric in TimeframeFeatureService.lag_metrics:
+            values = columns[f"{metric} This {unit}"]
+            columns[f"{metric} Last {unit}"] = np.roll(values, 1)[keep]
+            columns[f"{metric} This {unit}"] = values[keep]
+
+        columns["Product ID"] = columns["Product ID"][keep]
+        columns[key_col] = columns[key_col][keep]
+
+        for col in TimeframeFeatureService.derived_cols:
+            if col in feature_cols:
+                columns[col] = TimeframeFeatureService.compute_feature(
+                    col, columns, unit
+                )
+
+        # Rows with a missing feature are dropped, as they were by every step
+        keep = np.ones(len(columns[key_col]), dtype=bool)
+        for col in feature_cols:
+            if np.issubdtype(columns[col].dtype, np.floating):
+                keep &= ~np.isnan(columns[col])
+
+        output_cols = ["Product ID", key_col] + metric_cols
+        output_cols += [col for col in all_feature_cols if col in feature_cols]
+
+        df_features = pd.DataFrame(
+            {col: columns[col][keep] for col in output_cols}, copy=False
+        )
+        df_features["Timeframe"] = timeframe.capitalize()
+
+        return df_features
+
+    @staticmethod
+    def aggregate(df_timeframes, key_col, unit):
+        """Returns the mean price and the total quantity and sales of each product and
+        period as arrays, ordered by Product ID and period, with the code of each
+        product."""
+        product_codes, product_ids = pd.factorize(
+            df_timeframes["Product ID"], sort=True
+        )
+        period_codes, periods = pd.factorize(df_timeframes[key_col], sort=True)
+        num_periods = max(len(periods), 1)
+
+        # Rows without a product or period are not part of any group
+        has_group = (product_codes >= 0) & (period_codes >= 0)
+        group_keys = (
+            product_codes[has_group].astype(np.int64) * num_periods
+            + period_codes[has_group]
+        )
+        group_codes, groups = pd.factorize(group_keys, sort=True)
+        group_products, group_periods = np.divmod(groups, num_periods)
+
+        # Rows of a pre-aggregated dataset count as the rows summed into them
+        if TimeframeFeatureService.count_col in df_timeframes.columns:
+            row_counts = df_timeframes[TimeframeFeatureService.count_col].to_numpy()
+            counts = np.bincount(
+                group_codes,
+                weights=row_counts[has_group].astype(np.float64),
+                minlength=len(groups),
+            )
+        else:
+            counts = np.bincount(group_codes, minlength=len(groups))
+        columns = {
+            "Product Code": group_products,
+            "Product ID": np.asarray(product_ids)[group_products],
+            key_col: np.asarray(periods)[group_periods],
+        }
+
+        for metric in TimeframeFeatureService.metrics:
+            values = df_timeframes[metric].to_numpy()[has_group]
+            sums = np.bincount(
+                group_codes, weights=values.astype(np.float64), minlength=len(groups)
+            )
+
+            if metric == "Price":
+                columns[f"{metric} This {unit}"] = sums / counts
+            elif np.issubdtype(values.dtype, np.integer):
+                columns[f"{metric} This {unit}"] = np.rint(sums).astype(np.int64)
+            else:
+                columns[f"{metric} This {unit}"] = sums
+
+        return columns
+
+    @staticmethod
+    def get_group_positions(group_codes):
+        """Returns the position of each row within its run of equal group codes."""
+        rows = np.arange(len(group_codes))
+        is_start = np.ones(len(group_codes), dtype=bool)
+        is_start[1:] = group_codes[1:] != group_codes[:-1]
+
+        return rows - np.maximum.accumulate(np.where(is_start, rows, 0))
+
+    @staticmethod
+    def compute_feature(col, columns, unit):
+        """Returns a derived feature from the columns of the period ('This') and the
+        previous one ('Last'), given as arrays or as a DataFrame."""
+        if col == "Price Change (%)":
+            price = columns[f"Price This {unit}"]
+            last_price = columns[f"Price Last {unit}"]
+            return (price - last_price) / last_price
+        if col == "Sales Growth Rate":
+            sales = columns[f"Sales This {unit}"]
+            last_sales = columns[f"Sales Last {unit}"]
+            return (sales - last_sales) / last_sales
+        if col == "Stock to Sales Ratio":
+            quantity = columns[f"Quantity This {unit}"]
+            return quantity / (columns[f"Sales This {unit}"] + 1)
+        if col == "Momentum":
+            return columns[f"Sales This {unit}"] - columns[f"Sales Last {unit}"]
+        if col == "Rolling Average Sales":
+            return (columns[f"Sales Last {unit}"] + columns[f"Sales This {unit}"]) / 2
+        if col == "Price-to-Sales Ratio":
+            return columns[f"Price This {unit}"] / (columns[f"Sales This {unit}"] + 1)
+
+        raise ValueError(f"Invalid feature, {col}")
+
+    @staticmethod
+    def rename_columns(df, timeframe):
+        """Returns a copy of the dataset with its Price, Sales, and Quantity columns
+        named after the period of the timeframe."""
+        unit = TimeframeFeatureService.units[timeframe]
+
+        return df.rename(
+            columns={
+                metric: f"{metric} This {unit}"
+                for metric in TimeframeFeatureService.metrics
+            }
+        )
+
+    @staticmethod
+    def engineer_lag_features(df, timeframe):
+        """Returns the dataset, which is sorted by Product ID and period, with the
+        quantity, sales, and price of the previous period of each product, dropping the
+        first periods of each product."""
+        unit = TimeframeFeatureService.units[timeframe]
+        product_codes = pd.factorize(df["Product ID"])[0]
+        keep = (
+            TimeframeFeatureService.get_group_positions(product_codes)
+            >= TimeframeFeatureService.num_warmup_periods
+        )
+
+        df_lag_features = df[keep].copy()
+        for metric in TimeframeFeatureService.lag_metrics:
+            values = df[f"{metric} This {unit}"].to_numpy()
+            df_lag_features[f"{metric} Last {unit}"] = np.roll(values, 1)[keep]
+
+        return df_lag_features
+
+    @staticmethod
+    def engineer_feature(df, timeframe, col):
+        """Returns a copy of the dataset with a derived feature, without the rows where
+        it is missing."""
+        df_feature = df.copy()
+        df_feature[col] = TimeframeFeatureService.compute_feature(
+            col, df_feature, TimeframeFeatureService.units[timeframe]
+        )
+
+        return df_feature.dropna(subset=[col])
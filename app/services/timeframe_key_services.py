@@ -0,0 +1,92 @@
+import numpy as np
+
+
+class TimeframeKeyService:
+    """Keys each order date by its week, month, and quarter as compact integer codes,
+    computed vectorized from the datetime64 values instead of formatting every row.
+    Codes sort in time order, so they can be grouped and sorted on directly, and are
+    turned into labels such as '2024-07' only for display."""
+
+    # Key column of each timeframe
+    key_cols = {
+        "weekly": "Year-Week",
+        "monthly": "Year-Month",
+        "quarterly": "Year-Quarter",
+    }
+
+    # Number of codes per year of each key; a year has weeks 0 to 53 with strftime's %U
+    codes_per_year = {
+        "Year-Week": 54,
+        "Year-Month": 12,
+        "Year-Quarter": 4,
+    }
+
+    @staticmethod
+    def get_date_parts(dates):
+        """Returns the year, the 0-based month, and the strftime %U week of each date.
+        Weeks start on Sunday, and the days before a year's first Sunday are its week
+        0."""
+        dates = np.asarray(dates, dtype="datetime64[ns]")
+        days = dates.astype("datetime64[D]")
+        years_since_epoch = dates.astype("datetime64[Y]")
+
+        months = (
+            dates.astype("datetime64[M]").astype(np.int64)
+            - years_since_epoch.astype(np.int64) * 12
+        )
+
+        # Day of the year and of the week (Sunday is 0; 1970-01-01 was a Thursday)
+        year_days = (days - years_since_epoch.astype("datetime64[D]")).astype(np.int64)
+        week_days = (days.astype(np.int64) + 4) % 7
+        weeks = (year_days + 7 - week_days) // 7
+
+        return years_since_epoch.astype(np.int64) + 1970, months, weeks
+
+    @staticmethod
+    def get_codes(dates):
+        """Returns the integer week, month, and quarter codes of the dates, by key
+        column."""
+        years, months, weeks = TimeframeKeyService.get_date_parts(dates)
+
+        return {
+            "Year-Week": years * 54 + weeks,
+            "Year-Month": years * 12 + months,
+            "Year-Quarter": years * 4 + months // 3,
+        }
+
+    @staticmethod
+    def engineer_timeframe_keys(df, date_col="Order Date"):
+        """Returns a copy of the dataset with the integer Year-Week, Year-Month, and
+        Year-Quarter keys of its dates."""
+        df_timeframes = df.copy()
+
+        for key_col, codes in TimeframeKeyService.get_codes(df[date_col]).items():
+            df_timeframes[key_col] = codes
+
+        return df_timeframes
+
+    @staticmethod
+    def format_code(code, key_col):
+        """Returns the display label of a single code, e.g. '2024-07' or '2024Q3'."""
+        year, period = divmod(int(code), TimeframeKeyService.codes_per_year[key_col])
+
+        if key_col == "Year-Week":
+            return f"{year}-{period:02d}"
+        if key_col == "Year-Month":
+            return f"{year}-{period + 1:02d}"
+        if key_col == "Year-Quarter":
+            return f"{year}Q{period + 1}"
+
+        raise ValueError(f"Invalid timeframe key, {key_col}")
+
+    @staticmethod
+    def get_labels(codes, key_col):
+        """Returns the display labels of the codes, formatting each distinct code
+        once."""
+        unique_codes, inverse = np.unique(np.asarray(codes), return_inverse=True)
+        unique_labels = np.array(
+            [TimeframeKeyService.format_code(code, key_col) for code in unique_codes],
+            dtype=object,
+        )
+
+        return unique_labels[inverse.reshape(-1)]
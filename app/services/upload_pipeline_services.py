@@ -0,0 +1,164 @@
+from flask import current_app
+from flask_login import current_user
+
+from app.services.artifact_store_services import ArtifactStoreService
+from app.services.dataset_validation_services import DatasetValidationService
+from app.services.datasetfile_services import DatasetFileService
+from app.services.streaming_ingestion_services import StreamingIngestionService
+from app.services.upload_record_services import UploadRecordService
+
+
+class UploadPipeline:
+    """Runs the steps of a dataset upload (validation, preprocessing and persistence,
+    and optionally the original dataset step) on a file that is parsed only once.
+    In streaming mode, CSV files are instead read in chunks and reduced to aggregates
+    while being validated. A file the branch already uploaded for the same ML process
+    is recognized by its content hash before being parsed, and its preprocessed
+    dataset and results are reused."""
+
+    def __init__(self, file, ml_process):
+        self.file = file
+        self.ml_process = ml_process
+
+        # Parsed DataFrame of the file, shared by every step of the pipeline
+        self._df = None
+        self._is_parsed = False
+
+        # Report of the parsed file, holding the dataset cleaned while validated
+        self.validation_report = None
+
+        # Aggregates of the streamed file, set once it is validated
+        self.is_streaming = UploadPipeline.use_streaming(file)
+        self._streamed_dataset = None
+
+        # Earlier upload of the same content and its recorded results, if reused
+        self.content_hash = None
+        self._reused_datasetfile = None
+        self._record = None
+
+    @staticmethod
+    def use_streaming(file):
+        """Checks if the file is to be ingested in chunks."""
+        is_csv = file.filename.endswith(".csv")
+        return is_csv and current_app.config["DATASET_INGESTION_MODE"] == "streaming"
+
+    @property
+    def df(self):
+        """Returns the parsed dataset, parsing the file on first access."""
+        if not self._is_parsed:
+            self._df = DatasetFileService.convert_to_df(self.file)
+            self._is_parsed = True
+
+        return self._df
+
+    def validate(self):
+        """Validates the parsed dataset and returns the validity and a message
+        reporting every problem found."""
+        if self.find_earlier_upload():
+            return True, "Valid dataset. Reusing the earlier upload of the same file."
+
+        if self.is_streaming:
+            is_valid, message, self._streamed_dataset = (
+                StreamingIngestionService.ingest_csv(self.file)
+            )
+            return is_valid, message
+
+        if self.df is None:
+            return False, "Invalid file format."
+
+        self.validation_report = DatasetValidationService.validate(self.df)
+
+        return self.validation_report.is_valid, self.validation_report.get_message()
+
+    def find_earlier_upload(self):
+        """Hashes the file and looks for an earlier upload of the same content by the
+        branch for the same ML process. Returns whether it can be reused."""
+        self.content_hash = DatasetFileService.get_content_hash(self.file)
+
+        dataset_file = DatasetFileService.find_datasetfile(
+            self.content_hash, self.ml_process, current_user.id
+        )
+        if dataset_file is None:
+            return False
+
+        self._record = UploadRecordService.get_complete_record(
+            self.content_hash, self.ml_process
+        )
+        if self._record is None:
+            return False
+
+        print(f"Reusing dataset file {dataset_file.id}, {self.content_hash}")
+        self._reused_datasetfile = dataset_file
+        return True
+
+    def get_report(self):
+        """Returns the validation report as a dictionary, or None if there is none."""
+        if self.validation_report is None:
+            return None
+
+        return self.validation_report.to_dict()
+
+    def save(self):
+        """Preprocesses and saves the parsed dataset, as well as its metadata in the database."""
+        # The earlier upload's dataset and results, with metadata of its own
+        if self._reused_datasetfile is not None:
+            UploadRecordService.restore_record(self._record)
+            return DatasetFileService.reuse_datasetfile(self._reused_datasetfile)
+
+        if self.is_streaming:
+            result = DatasetFileService.save_datasetfile(
+                self.file,
+                self.ml_process,
+                streamed_dataset=self._streamed_dataset,
+                content_hash=self.content_hash,
+            )
+
+        # The dataset was cleaned in the same scan as its validation
+        elif self.validation_report is not None and self.validation_report.is_valid:
+            result = DatasetFileService.save_datasetfile(
+                self.file,
+                self.ml_process,
+                df_cleaned=self.validation_report.df_cleaned,
+                content_hash=self.content_hash,
+            )
+
+        else:
+            result = DatasetFileService.save_datasetfile(
+                self.file, self.ml_process, df=self.df, content_hash=self.content_hash
+            )
+
+        # Record the results for later uploads of the same content
+        file_is_saved, _ = result
+        if file_is_saved and self.content_hash is not None:
+            UploadRecordService.save_record(self.content_hash, self.ml_process)
+
+        return result
+
+    def get_original_dataset(self):
+        """Returns the original dataset (used by optimization) from the parsed dataset."""
+        # Customer segments only need the sums of each customer per order date
+        if self.is_streaming:
+            return self._streamed_dataset.customers
+
+        from app.services.optimization.optimization_services import (
+            OptimizationService,
+        )
+
+        return OptimizationService.get_original_dataset(self.file, df=self.df)
+
+    def save_original_dataset(self):
+        """Saves the original dataset into the artifact store and returns its artifact
+        id, which is that of the earlier upload if reused."""
+        if self._reused_datasetfile is not None:
+            return self._record["optimization_df_original_id"]
+
+        artifact_id = ArtifactStoreService.save_dataframe(self.get_original_dataset())
+
+        if self.content_hash is not None:
+            UploadRecordService.save_record(
+                self.content_hash,
+                self.ml_process,
+                {"optimization_df_original_id": artifact_id},
+            )
+
+        return artifact_id
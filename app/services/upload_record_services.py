@@ -0,0 +1,98 @@
+import json
+import os
+import uuid
+
+from flask import session
+
+from app.services.artifact_store_services import ArtifactStoreService
+from app.services.feature_cache_services import FeatureCacheService
+
+
+class UploadRecordService:
+    """Records the results an upload leaves in the session, such as the artifact ids
+    of its engineered features, by the content hash of the file and its ML process.
+    A later upload of the same content for the same process restores them instead of
+    preprocessing the file again. Records are kept in the artifact store, next to the
+    artifacts they point to."""
+
+    # Session keys holding the artifact ids of the results of each ML process
+    session_keys = {
+        "prediction": [
+            "prediction_df_weekly_id",
+            "prediction_df_monthly_id",
+            "prediction_df_quarterly_id",
+        ],
+        "optimization": [
+            "prediction_df_weekly_id",
+            "prediction_df_monthly_id",
+            "prediction_df_quarterly_id",
+            "optimization_df_original_id",
+        ],
+        "segmentation": [],
+    }
+
+    # Folder of the records, inside the artifact store
+    folder_name = "uploads"
+
+    @staticmethod
+    def get_record_path(content_hash, ml_process):
+        """Returns the file of a record, creating the folder if it doesn't exist.
+        Records of an earlier feature pipeline are not found, as their results would
+        differ."""
+        folder = os.path.join(
+            ArtifactStoreService.get_artifact_folder(), UploadRecordService.folder_name
+        )
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(
+            folder,
+            f"{content_hash}-{ml_process}-v{FeatureCacheService.pipeline_version}.json",
+        )
+
+    @staticmethod
+    def load_record(content_hash, ml_process):
+        """Returns the recorded session values of an upload, or an empty record."""
+        record_path = UploadRecordService.get_record_path(content_hash, ml_process)
+
+        try:
+            with open(record_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def save_record(content_hash, ml_process, values=None):
+        """Records session values of an upload, by default those of its ML process in
+        the current session, adding them to those already recorded."""
+        if values is None:
+            values = {
+                key: session.get(key)
+                for key in UploadRecordService.session_keys[ml_process]
+            }
+
+        record = UploadRecordService.load_record(content_hash, ml_process)
+        record.update({key: value for key, value in values.items() if value})
+
+        record_path = UploadRecordService.get_record_path(content_hash, ml_process)
+        temp_path = f"{record_path}.tmp-{uuid.uuid4().hex}"
+
+        with open(temp_path, "w") as f:
+            json.dump(record, f)
+        os.replace(temp_path, record_path)
+
+    @staticmethod
+    def get_complete_record(content_hash, ml_process):
+        """Returns the recorded session values of an upload, or None if any value of
+        its ML process or the artifact it points to is missing."""
+        record = UploadRecordService.load_record(content_hash, ml_process)
+
+        for key in UploadRecordService.session_keys[ml_process]:
+            if not ArtifactStoreService.has_artifact(record.get(key)):
+                return None
+
+        return record
+
+    @staticmethod
+    def restore_record(record):
+        """Restores recorded session values into the session."""
+        for key, value in record.items():
+            session[key] = value
@@ -1,6 +1,8 @@
 import pytest
 from app import create_app, db
 from app.config import TestingConfig
+from app.models.Branch.model import Branch
+from tests.unit.models.test_branch_model import new_supermarket
 
 
 @pytest.fixture
@@ -22,3 +24,29 @@ def db_session(app):
 @pytest.fixture
 def client(app):
     return app.test_client()
+
+
+@pytest.fixture
+def artifact_folder(app, tmp_path):
+    app.config["ARTIFACT_FOLDER"] = str(tmp_path / "artifacts")
+    yield tmp_path
+
+
+@pytest.fixture
+def new_branch(new_supermarket, db_session):
+    branch = Branch(
+        name="TestBranch",
+        location="Kathmandu",
+        phone_number="1234567890",
+        email="testbranch@gmail.com",
+        password="testpw",
+        supermarket_id=new_supermarket.id,
+    )
+
+    db_session.add(branch)
+    db_session.commit()
+
+    yield branch
+
+    db_session.delete(branch)
+    db_session.commit()
@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+from app.services.artifact_store_services import ArtifactStoreService
+
+
+@pytest.fixture
+def df_weekly():
+    df = pd.DataFrame(
+        {
+            "Product ID": ["P1", "P1", "P2"],
+            "Year-Week": ["2024-01", "2024-02", "2024-02"],
+            "Year-Month": pd.PeriodIndex(["2024-01", "2024-01", "2024-04"], freq="M"),
+            "Year-Quarter": pd.PeriodIndex(["2024Q1", "2024Q1", "2024Q2"], freq="Q"),
+            "Order Date": pd.to_datetime(["2024-01-08", "2024-01-15", "2024-04-15"]),
+            "Price This Week": [1.5, 2.0, 3.25],
+            "Quantity This Week": [4, 5, 6],
+        }
+    )
+
+    # Non-default index, as left behind by dropna
+    df.index = [1, 3, 5]
+    return df
+
+
+def test_save_and_load_dataframe(artifact_folder, df_weekly):
+    """
+    GIVEN a DataFrame with string, monthly and quarterly period, datetime, and numeric
+    columns
+    WHEN it is saved to and loaded from the artifact store
+    THEN check the loaded DataFrame equals the saved one.
+    """
+    artifact_id = ArtifactStoreService.save_dataframe(df_weekly)
+
+    df_loaded = ArtifactStoreService.load_dataframe(artifact_id)
+
+    pd.testing.assert_frame_equal(df_loaded, df_weekly)
+
+
+def test_identical_content_has_same_artifact_id(artifact_folder, df_weekly):
+    """
+    GIVEN two DataFrames with identical content
+    WHEN both are saved to the artifact store
+    THEN check they share a single artifact, and different content gets a new one.
+    """
+    artifact_id = ArtifactStoreService.save_dataframe(df_weekly)
+
+    assert ArtifactStoreService.save_dataframe(df_weekly.copy()) == artifact_id
+
+    df_changed = df_weekly.copy()
+    df_changed["Price This Week"] = df_changed["Price This Week"] * 2
+    assert ArtifactStoreService.save_dataframe(df_changed) != artifact_id
+
+
+def test_load_missing_artifact(artifact_folder):
+    """
+    GIVEN an artifact id that was never saved
+    WHEN it is loaded from the artifact store
+    THEN check None is returned.
+    """
+    assert ArtifactStoreService.load_dataframe("0" * 64) is None
+    assert ArtifactStoreService.load_dataframe(None) is None
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.datasetfile_services import DatasetFileService
+from app.services.segmentation.clustering_cache_services import ClusteringCache
+from app.services.segmentation.segmentation_services import SegmentationService
+
+
+@pytest.fixture
+def dataset_file(tmp_path):
+    ClusteringCache.clear()
+
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame(
+        {
+            "Total Sales": np.concatenate(
+                [rng.normal(100, 5, 60), rng.normal(400, 5, 40), rng.normal(900, 5, 20)]
+            )
+        }
+    )
+    file_path = str(tmp_path / "segmentation.csv")
+    DatasetFileService.write_dataset(df, file_path)
+
+    yield file_path
+
+    ClusteringCache.clear()
+
+
+def test_changing_k_reuses_the_clustering(dataset_file, monkeypatch):
+    """
+    GIVEN a dataset file clustered automatically on a metric
+    WHEN the same file and metric are clustered into other numbers of clusters
+    THEN check the file is not read again and the profiles match a fresh clustering.
+    """
+    reads = []
+    read_dataset = DatasetFileService.read_dataset
+
+    def count_reads(file_path, columns=None):
+        reads.append(columns)
+        return read_dataset(file_path, columns=columns)
+
+    monkeypatch.setattr(DatasetFileService, "read_dataset", count_reads)
+
+    cluster_counts, _ = SegmentationService.segment_dataset_file(
+        dataset_file, "auto", "Total Sales", engine="kmeans1d"
+    )
+    assert sorted(cluster_counts.values()) == [20, 40, 60]
+
+    for num_of_clusters in ["3", "4", "5", "auto"]:
+        cached = SegmentationService.segment_dataset_file(
+            dataset_file, num_of_clusters, "Total Sales", engine="kmeans1d"
+        )
+        fresh = SegmentationService.segment_customers(
+            read_dataset(dataset_file),
+            num_of_clusters,
+            "Total Sales",
+            engine="kmeans1d",
+        )
+        assert cached == fresh
+
+    assert reads == [["Total Sales"]]
+
+
+def test_auto_result_keeps_its_silhouette(dataset_file):
+    """
+    GIVEN a dataset file already clustered into a given number of clusters
+    WHEN the same file and metric are clustered automatically
+    THEN check the cached result of the number of clusters chosen holds its exact
+    silhouette estimate.
+    """
+    key = (dataset_file, "Total Sales", "kmeans1d")
+
+    SegmentationService.segment_dataset_file(
+        dataset_file, "3", "Total Sales", engine="kmeans1d"
+    )
+    assert ClusteringCache.get_result(key, 3).silhouette is None
+
+    SegmentationService.segment_dataset_file(
+        dataset_file, "auto", "Total Sales", engine="kmeans1d"
+    )
+    silhouette = ClusteringCache.get_result(key, "auto").silhouette
+
+    assert silhouette.score > 0.5
+    assert silhouette.half_width == 0.0
+    assert silhouette.num_samples == 120
+
+
+def test_least_recently_used_entries_are_evicted(monkeypatch):
+    """
+    GIVEN a clustering cache limited to the size of two results
+    WHEN the results of three files are added
+    THEN check only the results of the two most recently used files are kept.
+    """
+    ClusteringCache.clear()
+    result = ClusteringCache.create_result(
+        np.zeros(1000, dtype=np.int64), {0: 1000}, {0: 1.0}
+    )
+    result_size = ClusteringCache.get_result_size(result)
+    monkeypatch.setattr(ClusteringCache, "get_max_bytes", lambda: 2 * result_size)
+
+    ClusteringCache.put_results(("a.csv", "Total Sales", "kmeans1d"), {2: result})
+    ClusteringCache.put_results(("b.csv", "Total Sales", "kmeans1d"), {2: result})
+    ClusteringCache.get_result(("a.csv", "Total Sales", "kmeans1d"), 2)
+    ClusteringCache.put_results(("c.csv", "Total Sales", "kmeans1d"), {2: result})
+
+    assert result.labels.dtype == np.uint8
+    assert ClusteringCache.get_result(("a.csv", "Total Sales", "kmeans1d"), 2)
+    assert ClusteringCache.get_result(("b.csv", "Total Sales", "kmeans1d"), 2) is None
+    assert ClusteringCache.get_result(("c.csv", "Total Sales", "kmeans1d"), 2)
+    assert ClusteringCache.get_num_bytes() == 2 * result_size
+
+    ClusteringCache.clear()
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.segmentation.customer_aggregation_services import (
+    CustomerAggregationService,
+)
+
+
+def engineer_features_with_groupbys(df):
+    """Segmentation features as computed by string-keyed groupbys and merges."""
+    df = df.copy()
+    df["Year-Week"] = df["Order Date"].dt.strftime("%Y-%U")
+    df["Year-Month"] = df["Order Date"].dt.strftime("%Y-%m")
+    df["Year-Quarter"] = df["Order Date"].dt.to_period("Q")
+
+    df_features = (
+        df.groupby("Customer ID")
+        .agg(
+            **{
+                "Total Visits": ("Order Date", "nunique"),
+                "Total Sales": ("Sales", "sum"),
+                "Total Quantity": ("Quantity", "sum"),
+            }
+        )
+        .reset_index()
+    )
+
+    for timeframe, period_col in [
+        ("Weekly", "Year-Week"),
+        ("Monthly", "Year-Month"),
+        ("Quarterly", "Year-Quarter"),
+    ]:
+        df_periods = (
+            df.groupby(["Customer ID", period_col])
+            .agg(
+                Visits=("Order Date", "nunique"),
+                Sales=("Sales", "sum"),
+                Quantity=("Quantity", "sum"),
+            )
+            .groupby("Customer ID")
+            .mean()
+            .add_prefix(f"Average {timeframe} ")
+            .reset_index()
+        )
+        df_features = df_features.merge(df_periods, on="Customer ID", how="left")
+
+    return df_features
+
+
+@pytest.fixture
+def df_orders():
+    rng = np.random.default_rng(11)
+    num_rows = 2000
+
+    return pd.DataFrame(
+        {
+            "Customer ID": rng.integers(0, 60, num_rows).astype(str),
+            "Order Date": pd.Timestamp("2022-12-20")
+            + pd.to_timedelta(rng.integers(0, 800, num_rows), unit="D"),
+            "Quantity": rng.integers(1, 10, num_rows),
+            "Sales": np.round(rng.uniform(1, 100, num_rows), 2),
+        }
+    )
+
+
+def test_features_match_groupbys(df_orders):
+    """
+    GIVEN orders of many customers over more than two years
+    WHEN the segmentation features are engineered in one pass
+    THEN check they match the string-keyed groupbys and merges.
+    """
+    expected = engineer_features_with_groupbys(df_orders)
+
+    result = CustomerAggregationService.engineer_features(df_orders)
+
+    assert result.columns.tolist() == CustomerAggregationService.feature_cols
+    assert result["Customer ID"].tolist() == expected["Customer ID"].tolist()
+    assert result["Total Visits"].tolist() == expected["Total Visits"].tolist()
+    assert result["Total Quantity"].tolist() == expected["Total Quantity"].tolist()
+    pd.testing.assert_frame_equal(
+        result.drop(columns="Customer ID"),
+        expected[CustomerAggregationService.feature_cols].drop(columns="Customer ID"),
+        check_dtype=False,
+        rtol=1e-9,
+    )
+
+
+def test_week_codes_follow_strftime():
+    """
+    GIVEN every day of several years
+    WHEN their integer week codes are computed
+    THEN check two days share a code exactly when they share strftime's %Y-%U week.
+    """
+    dates = pd.Series(pd.date_range("2019-01-01", "2025-12-31", freq="D"))
+
+    codes = CustomerAggregationService.get_period_codes(dates.to_numpy())["Weekly"]
+    labels = dates.dt.strftime("%Y-%U")
+
+    assert (pd.factorize(codes)[0] == pd.factorize(labels)[0]).all()
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.dataset_append_services import DatasetAppendService
+from app.services.datasetfile_services import DatasetFileService
+from app.services.segmentation.customer_aggregation_services import (
+    CustomerAggregationService,
+)
+from app.services.timeframe_feature_services import TimeframeFeatureService
+from app.services.timeframe_key_services import TimeframeKeyService
+
+
+def create_dataset(num_rows, start, num_days, seed):
+    rng = np.random.default_rng(seed)
+    price = rng.uniform(1, 50, num_rows).round(2)
+    quantity = rng.integers(1, 5, num_rows)
+
+    return pd.DataFrame(
+        {
+            "Product ID": [f"P{k}" for k in rng.integers(0, 6, num_rows)],
+            "Customer ID": [f"C{k}" for k in rng.integers(0, 30, num_rows)],
+            "Order Date": (
+                pd.Timestamp(start)
+                + pd.to_timedelta(rng.integers(0, num_days, num_rows), unit="D")
+            ).strftime("%Y-%m-%d"),
+            "Price": price,
+            "Quantity": quantity,
+            "Sales": price * quantity,
+        }
+    )
+
+
+@pytest.fixture
+def datasets():
+    df_base = create_dataset(600, "2023-01-01", 300, seed=0)
+
+    # A week of new rows, some in the base's last period, and rows sent again
+    df_delta = pd.concat(
+        [create_dataset(40, "2023-10-25", 7, seed=1), df_base.iloc[::9]],
+        ignore_index=True,
+    )
+    df_full = pd.concat([df_base, df_delta], ignore_index=True)
+
+    return tuple(
+        DatasetFileService.clean_dataset(df.copy())
+        for df in [df_base, df_delta, df_full]
+    )
+
+
+@pytest.mark.parametrize("timeframe", ["weekly", "monthly", "quarterly"])
+def test_appended_features_match_full_engineering(datasets, timeframe):
+    """
+    GIVEN a stored dataset and a delta with new rows and rows sent again
+    WHEN the delta is merged into the stored aggregates and the features are updated
+    THEN check the features equal those engineered from the whole dataset.
+    """
+    df_base, df_delta, df_full = datasets
+
+    base = DatasetAppendService.get_base(df_base)
+    merged, delta_base = DatasetAppendService.merge(base, df_delta)
+    df_stored = TimeframeFeatureService.engineer_features(
+        TimeframeKeyService.engineer_timeframe_keys(df_base), timeframe
+    )
+
+    result = DatasetAppendService.update_timeframe_features(
+        df_stored, merged.products, delta_base.products, timeframe
+    )
+
+    assert len(delta_base.fingerprints) == len(df_full) - len(df_base)
+    pd.testing.assert_frame_equal(
+        result,
+        TimeframeFeatureService.engineer_features(
+            TimeframeKeyService.engineer_timeframe_keys(df_full), timeframe
+        ),
+        check_dtype=False,
+        rtol=1e-9,
+    )
+
+
+def test_appended_customer_features_match_full_engineering(datasets):
+    """
+    GIVEN stored segmentation features and a delta
+    WHEN the features of the customers in the delta are updated
+    THEN check the features equal those engineered from the whole dataset.
+    """
+    df_base, df_delta, df_full = datasets
+
+    merged, delta_base = DatasetAppendService.merge(
+        DatasetAppendService.get_base(df_base), df_delta
+    )
+
+    result = DatasetAppendService.update_customer_features(
+        CustomerAggregationService.engineer_features(df_base),
+        merged.customers,
+        delta_base.customers,
+    )
+
+    pd.testing.assert_frame_equal(
+        result,
+        CustomerAggregationService.engineer_features(df_full),
+        check_dtype=False,
+        rtol=1e-9,
+    )
+
+
+def test_base_is_stored_next_to_dataset(datasets, tmp_path):
+    """
+    GIVEN the aggregates of a dataset
+    WHEN they are saved next to its preprocessed file and loaded back
+    THEN check they are unchanged, and missing aggregates load as None.
+    """
+    base = DatasetAppendService.get_base(datasets[0])
+    file_path = str(tmp_path / "dataset.columnar")
+
+    DatasetAppendService.save_base(base, file_path)
+    result = DatasetAppendService.load_base(file_path)
+
+    pd.testing.assert_frame_equal(result.products, base.products)
+    pd.testing.assert_frame_equal(result.customers, base.customers)
+    np.testing.assert_array_equal(result.fingerprints, base.fingerprints)
+    assert DatasetAppendService.load_base(str(tmp_path / "other.columnar")) is None
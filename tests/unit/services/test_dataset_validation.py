@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+from app.services.dataset_validation_services import DatasetValidationService
+
+
+def create_dataset(num_rows=40, seed=0):
+    rng = np.random.default_rng(seed)
+    price = rng.uniform(1, 50, num_rows).round(2)
+    quantity = rng.integers(1, 5, num_rows)
+
+    return pd.DataFrame(
+        {
+            "Product ID": [f"P{k}" for k in rng.integers(0, 5, num_rows)],
+            "Customer ID": [f"C{k}" for k in rng.integers(0, 10, num_rows)],
+            "Order Date": (
+                pd.Timestamp("2023-01-01")
+                + pd.to_timedelta(rng.integers(0, 365, num_rows), unit="D")
+            ).strftime("%Y-%m-%d"),
+            "Price": price,
+            "Quantity": quantity,
+            "Sales": price * quantity,
+        }
+    )
+
+
+def test_report_counts_every_problem():
+    """
+    GIVEN a dataset with a non-numeric cell, an unparsable date, a missing value,
+    duplicates, and non-positive values
+    WHEN it is validated
+    THEN check every problem is counted with its spreadsheet rows, and the dataset is
+    invalid.
+    """
+    df = create_dataset()
+    df = pd.concat([df, df.iloc[[0, 1]]], ignore_index=True)
+    df["Price"] = df["Price"].astype(object)
+    df.loc[4, "Price"] = "n/a"
+    df.loc[6, "Order Date"] = "not a date"
+    df.loc[8, "Customer ID"] = None
+    df.loc[[10, 11], "Quantity"] = 0
+
+    report = DatasetValidationService.validate(df)
+
+    assert not report.is_valid
+    assert report.df_cleaned is None
+    assert [(p.description, p.count, p.rows) for p in report.errors] == [
+        ("non-numeric cells in Price", 1, [6]),
+        ("unparsable dates in Order Date", 1, [8]),
+    ]
+    assert [(p.description, p.count, p.rows) for p in report.warnings] == [
+        ("rows with missing values", 1, [10]),
+        ("duplicate rows", 2, [42, 43]),
+        ("rows with non-positive Quantity", 2, [12, 13]),
+    ]
+    assert report.get_message().startswith(
+        "Incorrect datatypes: 1 non-numeric cells in Price (rows 6)"
+    )
+
+
+def test_only_non_numeric_cells_of_text_column_are_reported():
+    """
+    GIVEN a Price column read as text, with one non-numeric cell among numbers
+    WHEN it is validated
+    THEN check only that cell is reported, with its spreadsheet row.
+    """
+    df = create_dataset(num_rows=4)
+    df["Price"] = df["Price"].astype(str)
+    df.loc[1, "Price"] = "abc"
+
+    report = DatasetValidationService.validate(df)
+
+    assert [(p.description, p.count, p.rows) for p in report.errors] == [
+        ("non-numeric cells in Price", 1, [3]),
+    ]
+
+
+def test_missing_columns_are_reported():
+    """
+    GIVEN a dataset without its Sales and Price columns
+    WHEN it is validated
+    THEN check both columns are reported as missing.
+    """
+    df = create_dataset().drop(columns=["Sales", "Price"])
+
+    report = DatasetValidationService.validate(df)
+
+    assert not report.is_valid
+    assert report.get_message() == "Missing columns: Price, Sales."
+
+
+def test_clean_dataset_matches_separate_passes():
+    """
+    GIVEN a valid dataset with missing values, duplicates, and non-positive values
+    WHEN it is validated and cleaned in one scan
+    THEN check the cleaned dataset equals the one cleaned pass after pass, and the
+    sample rows of a frequent problem are cut short.
+    """
+    df = create_dataset()
+    df = pd.concat([df, df.iloc[:8]], ignore_index=True)
+    df.loc[2, "Sales"] = np.nan
+    df.loc[3, "Price"] = -1.0
+
+    expected = df.dropna().drop_duplicates()
+    expected = expected[
+        (expected["Price"] > 0) & (expected["Quantity"] > 0) & (expected["Sales"] > 0)
+    ].copy()
+    expected["Order Date"] = pd.to_datetime(expected["Order Date"])
+
+    report = DatasetValidationService.validate(df)
+
+    assert report.is_valid
+    assert "6 duplicate rows (rows 42, 43, 46, 47, 48, ...)" in report.get_message()
+    pd.testing.assert_frame_equal(
+        report.df_cleaned.astype({"Product ID": object, "Customer ID": object}),
+        expected,
+        check_dtype=False,
+    )
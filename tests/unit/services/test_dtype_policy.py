@@ -0,0 +1,101 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.datasetfile_services import DatasetFileService
+from app.services.dtype_policy_services import DtypePolicyService
+
+demo_folder = Path(__file__).resolve().parents[3] / "demo_data"
+demo_datasets = sorted(demo_folder.glob("*/valid_dataset.csv"))
+
+
+def clean_with_strings(df):
+    """Cleans the dataset as it was cleaned before, with IDs as Python strings."""
+    df = df.dropna().drop_duplicates()
+    df = df[(df["Price"] > 0) & (df["Quantity"] > 0) & (df["Sales"] > 0)].copy()
+    df["Order Date"] = pd.to_datetime(df["Order Date"])
+
+    for col in DatasetFileService.idcols:
+        df[col] = df[col].astype(str)
+
+    return df
+
+
+@pytest.mark.parametrize(
+    "dataset_path", demo_datasets, ids=lambda path: path.parent.name
+)
+def test_compact_dtypes_keep_demo_dataset(dataset_path):
+    """
+    GIVEN a demo dataset
+    WHEN it is cleaned with the dtype policy and with string IDs
+    THEN check both hold the same values, the policy's in less memory per row, and
+    print the memory per row of each.
+    """
+    df = pd.read_csv(dataset_path)[DatasetFileService.required_cols]
+
+    expected = clean_with_strings(df.copy())
+    result = DatasetFileService.clean_dataset(df.copy())
+
+    memory_before = DtypePolicyService.get_memory_per_row(expected)
+    memory_after = DtypePolicyService.get_memory_per_row(result)
+    print(
+        f"{dataset_path.parent.name}: {memory_before:.1f} bytes per row with string "
+        f"IDs, {memory_after:.1f} with compact dtypes"
+    )
+
+    assert memory_after < memory_before
+    for col in DatasetFileService.idcols:
+        assert isinstance(result[col].dtype, pd.CategoricalDtype)
+    assert result["Quantity"].dtype == np.int32
+    pd.testing.assert_frame_equal(
+        result.astype({col: object for col in DatasetFileService.idcols}),
+        expected,
+        check_dtype=False,
+    )
+
+
+def test_compact_ids_match_string_ids():
+    """
+    GIVEN IDs read as numbers and as strings
+    WHEN they are compacted
+    THEN check they equal their strings, with categories in string order.
+    """
+    series = pd.Series([10, 9, "9", 100, 10], dtype=object)
+
+    result = DtypePolicyService.compact_ids(series)
+
+    assert list(result.astype(object)) == list(series.astype(str))
+    assert list(result.cat.categories) == ["10", "100", "9"]
+
+
+def test_downcast_numbers_only_when_exact():
+    """
+    GIVEN integer, halved, and cent-valued numbers
+    WHEN they are downcast
+    THEN check only the numbers kept exactly in 32 bits are downcast.
+    """
+    assert DtypePolicyService.downcast_numbers(pd.Series([1, 2])).dtype == np.int32
+    assert DtypePolicyService.downcast_numbers(pd.Series([2**40])).dtype == np.int64
+    assert (
+        DtypePolicyService.downcast_numbers(pd.Series([1.5, 2.25])).dtype
+        == np.float32
+    )
+    assert (
+        DtypePolicyService.downcast_numbers(pd.Series([19.99, 0.1])).dtype
+        == np.float64
+    )
+
+
+def test_parse_dates_with_inferred_format():
+    """
+    GIVEN day-first dates
+    WHEN they are parsed
+    THEN check every date is parsed with the format of the first one.
+    """
+    series = pd.Series(["13/01/2024", "02/03/2024"])
+
+    result = DtypePolicyService.parse_dates(series)
+
+    assert list(result) == [pd.Timestamp("2024-01-13"), pd.Timestamp("2024-03-02")]
@@ -0,0 +1,67 @@
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.excel_ingestion_services import ExcelIngestionService
+
+demo_folder = Path(__file__).resolve().parents[3] / "demo_data"
+demo_workbooks = sorted(demo_folder.glob("*/valid_dataset.xlsx"))
+
+
+@pytest.mark.parametrize(
+    "workbook_path", demo_workbooks, ids=lambda path: path.parent.name
+)
+def test_streamed_workbook_matches_read_excel(workbook_path):
+    """
+    GIVEN a demo workbook
+    WHEN it is streamed in read-only mode and read with pandas
+    THEN check both read the same required columns, and print how long each took.
+    """
+    start = time.perf_counter()
+    expected = pd.read_excel(workbook_path)
+    read_excel_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with open(workbook_path, "rb") as file:
+        result = ExcelIngestionService.parse_workbook(file)
+    streamed_seconds = time.perf_counter() - start
+
+    print(
+        f"{workbook_path.parent.name}: read_excel {read_excel_seconds:.3f}s, "
+        f"streamed {streamed_seconds:.3f}s"
+    )
+
+    expected = expected[
+        [col for col in expected.columns if col in ExcelIngestionService.required_cols]
+    ]
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_workbook_is_converted_once(artifact_folder, tmp_path, monkeypatch):
+    """
+    GIVEN a workbook that has already been read once
+    WHEN the same workbook is read again
+    THEN check its converted copy is loaded instead of parsing the workbook.
+    """
+    workbook_path = tmp_path / "dataset.xlsx"
+    shutil.copy(demo_workbooks[0], workbook_path)
+
+    with open(workbook_path, "rb") as file:
+        df_first = ExcelIngestionService.read_excel(file)
+
+    def fail_to_parse(file):
+        raise AssertionError("The workbook was parsed again")
+
+    monkeypatch.setattr(ExcelIngestionService, "parse_workbook", fail_to_parse)
+
+    with open(workbook_path, "rb") as file:
+        df_second = ExcelIngestionService.read_excel(file)
+
+    pd.testing.assert_frame_equal(df_second, df_first, check_dtype=False)
+
+    # The converted copy is read into memory, like the parsed workbook
+    assert type(df_second["Quantity"].to_numpy()) is np.ndarray
@@ -0,0 +1,31 @@
+import pytest
+
+from app.services.executor_services import ExecutorService
+
+
+def test_executor_is_shared():
+    """
+    GIVEN the executor service
+    WHEN a pool with the same name is requested twice
+    THEN check the same pool is returned until it is discarded.
+    """
+    executor = ExecutorService.get_executor("test-shared", kind="thread", max_workers=2)
+
+    assert ExecutorService.get_executor("test-shared") is executor
+    assert executor.submit(sum, [1, 2, 3]).result() == 6
+
+    ExecutorService.discard_executor("test-shared")
+
+    assert ExecutorService.get_executor("test-shared") is not executor
+
+    ExecutorService.discard_executor("test-shared")
+
+
+def test_invalid_executor_kind():
+    """
+    GIVEN the executor service
+    WHEN a pool of an unknown kind is requested
+    THEN check a ValueError is raised.
+    """
+    with pytest.raises(ValueError):
+        ExecutorService.get_executor("test-invalid", kind="cluster")
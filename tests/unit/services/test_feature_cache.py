@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+
+from app.services.feature_cache_services import FeatureCacheService
+from app.services.optimization.timeframe_specific_services.optimization_services_weekly import (
+    OptimizationServiceWeekly,
+)
+from app.services.prediction.timeframe_specific_services.prediction_services_weekly import (
+    PredictionServiceWeekly,
+)
+from app.services.timeframe_feature_services import TimeframeFeatureService
+
+
+@pytest.fixture
+def df_original():
+    dates = pd.date_range("2024-01-01", periods=20, freq="W")
+    return pd.DataFrame(
+        {
+            "Product ID": ["P1"] * 20 + ["P2"] * 20,
+            "Order Date": dates.append(dates),
+            "Price": [float(i % 7 + 1) for i in range(40)],
+            "Quantity": [i % 5 + 1 for i in range(40)],
+            "Sales": [float((i % 7 + 1) * (i % 5 + 1)) for i in range(40)],
+        }
+    )
+
+
+@pytest.fixture
+def engineer_calls(monkeypatch):
+    calls = []
+    engineer_features = TimeframeFeatureService.engineer_features
+
+    def count_calls(df_timeframes, timeframe, feature_cols=None):
+        calls.append(list(feature_cols))
+        return engineer_features(df_timeframes, timeframe, feature_cols)
+
+    monkeypatch.setattr(TimeframeFeatureService, "engineer_features", count_calls)
+    return calls
+
+
+def test_features_are_shared_between_processes(
+    artifact_folder, df_original, engineer_calls
+):
+    """
+    GIVEN the same dataset uploaded for prediction and then for optimization
+    WHEN the weekly features of both are requested
+    THEN check the features are engineered once for both and reused afterwards.
+    """
+    prediction_cols = {"weekly": PredictionServiceWeekly.weekly_X_cols}
+    optimization_cols = {"weekly": OptimizationServiceWeekly.weekly_feature_cols}
+
+    FeatureCacheService.get_timeframe_features(df_original, prediction_cols)
+    optimization_id, df_weekly = FeatureCacheService.get_timeframe_features(
+        df_original.copy(), optimization_cols
+    )["weekly"]
+    prediction_id, _ = FeatureCacheService.get_timeframe_features(
+        df_original.copy(), prediction_cols
+    )["weekly"]
+
+    # The optimization needs the last price as well, so the frame grows once
+    assert len(engineer_calls) == 2
+    assert set(OptimizationServiceWeekly.weekly_feature_cols) <= set(df_weekly.columns)
+    assert prediction_id == optimization_id
+
+
+def test_pipeline_version_invalidates_features(
+    artifact_folder, df_original, engineer_calls, monkeypatch
+):
+    """
+    GIVEN features cached by an earlier version of the feature pipeline
+    WHEN the features of the same dataset are requested
+    THEN check they are engineered again.
+    """
+    feature_cols = {"weekly": PredictionServiceWeekly.weekly_X_cols}
+
+    FeatureCacheService.get_timeframe_features(df_original, feature_cols)
+    pipeline_version = FeatureCacheService.pipeline_version
+    monkeypatch.setattr(FeatureCacheService, "pipeline_version", pipeline_version + 1)
+    FeatureCacheService.get_timeframe_features(df_original, feature_cols)
+
+    assert len(engineer_calls) == 2
@@ -0,0 +1,92 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+from sklearn.metrics import silhouette_score
+
+from app.services.segmentation.kmeans_1d_services import KMeans1D
+from app.services.segmentation.segmentation_services import SegmentationService
+
+
+def get_inertia(values, labels):
+    """Sum of squared distances of the values to the mean of their cluster."""
+    return sum(
+        ((values[labels == label] - values[labels == label].mean()) ** 2).sum()
+        for label in np.unique(labels)
+    )
+
+
+def get_optimal_inertia(values, num_clusters):
+    """Lowest inertia over every partition of the sorted values into contiguous runs."""
+    sorted_values = np.sort(values)
+    best = np.inf
+
+    for cuts in combinations(range(1, len(values)), num_clusters - 1):
+        bounds = [0, *cuts, len(values)]
+        labels = np.repeat(np.arange(num_clusters), np.diff(bounds))
+        best = min(best, get_inertia(sorted_values, labels))
+
+    return best
+
+
+def test_partition_is_optimal():
+    """
+    GIVEN small random datasets with repeated values
+    WHEN they are clustered by the 1-D engine
+    THEN check each partition has the lowest possible inertia.
+    """
+    rng = np.random.default_rng(42)
+
+    for _ in range(50):
+        values = rng.integers(0, 10, size=rng.integers(4, 11)).astype(float)
+        kmeans = KMeans1D(values, max_clusters=4)
+
+        for num_clusters in range(1, kmeans.max_clusters + 1):
+            labels = kmeans.get_labels(num_clusters)
+
+            assert len(np.unique(labels)) == num_clusters
+            assert get_inertia(values, labels) == pytest.approx(
+                get_optimal_inertia(values, num_clusters), abs=1e-9
+            )
+
+
+def test_silhouette_matches_sklearn():
+    """
+    GIVEN a random dataset clustered by the 1-D engine
+    WHEN the silhouette score of each number of clusters is computed
+    THEN check it matches scikit-learn's pairwise computation.
+    """
+    rng = np.random.default_rng(7)
+    values = np.round(rng.gamma(2.0, 10.0, size=300), 1)
+    kmeans = KMeans1D(values, max_clusters=10)
+
+    for num_clusters in range(2, 11):
+        assert kmeans.get_silhouette_score(num_clusters) == pytest.approx(
+            silhouette_score(values.reshape(-1, 1), kmeans.get_labels(num_clusters)),
+            abs=1e-9,
+        )
+
+
+def test_auto_clustering_finds_groups():
+    """
+    GIVEN a metric with three well separated groups of customers
+    WHEN the customers are segmented automatically by the 1-D engine
+    THEN check three clusters with the groups' sizes are found.
+    """
+    rng = np.random.default_rng(0)
+    values = np.concatenate(
+        [rng.normal(10, 1, 50), rng.normal(100, 1, 30), rng.normal(500, 1, 20)]
+    )
+
+    labels = SegmentationService.cluster_1d(values, "auto")
+
+    assert np.bincount(labels).tolist() == [50, 30, 20]
+
+
+def test_constant_metric_is_not_clustered():
+    """
+    GIVEN a metric with a single distinct value
+    WHEN the customers are segmented by the 1-D engine
+    THEN check no clusters are formed.
+    """
+    assert SegmentationService.cluster_1d(np.full(20, 3.0), "auto") is None
@@ -0,0 +1,55 @@
+import os
+
+import pytest
+from joblib import dump
+
+from app.services.model_registry_services import ModelRegistry
+
+
+@pytest.fixture
+def models_folder(app, tmp_path):
+    app.config["MODELS_FOLDER_PREDICTION"] = str(tmp_path)
+    dump({"version": 1}, tmp_path / "xgboost_weekly.joblib")
+    ModelRegistry.clear()
+
+    yield tmp_path
+
+    ModelRegistry.clear()
+
+
+def test_model_is_loaded_once(models_folder):
+    """
+    GIVEN a weekly model file
+    WHEN the weekly model is requested twice
+    THEN check the same cached model object is returned.
+    """
+    model = ModelRegistry.get_model("weekly")
+
+    assert model == {"version": 1}
+    assert ModelRegistry.get_model("weekly") is model
+
+
+def test_replaced_model_is_reloaded(models_folder):
+    """
+    GIVEN a cached weekly model
+    WHEN its file is replaced by a new model
+    THEN check the new model is returned.
+    """
+    model_path = models_folder / "xgboost_weekly.joblib"
+    ModelRegistry.get_model("weekly")
+
+    dump({"version": 2}, model_path)
+    model_stat = os.stat(model_path)
+    os.utime(model_path, ns=(model_stat.st_atime_ns, model_stat.st_mtime_ns + 10**9))
+
+    assert ModelRegistry.get_model("weekly") == {"version": 2}
+
+
+def test_invalid_timeframe(models_folder):
+    """
+    GIVEN the model registry
+    WHEN a model of an unknown timeframe is requested
+    THEN check a ValueError is raised.
+    """
+    with pytest.raises(ValueError):
+        ModelRegistry.get_model("daily")
@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.optimization.optimization_engine_services import (
+    OptimizationEngine,
+)
+
+
+X_cols = [
+    "Price This Week",
+    "Price Change (%)",
+    "Stock to Sales Ratio",
+    "Rolling Average Sales",
+]
+
+
+class LinearModel:
+    """Stand-in for the XGBoost model, predicting a weighted sum of the features."""
+
+    weights = np.array([-2.0, 5.0, 1.5, 0.25])
+
+    def predict(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.weights
+
+
+@pytest.fixture
+def df_weekly():
+    return pd.DataFrame(
+        {
+            "Product ID": ["P1", "P1", "P1", "P2", "P2"],
+            "Year-Week": ["2024-01", "2024-02", "2024-03", "2024-01", "2024-02"],
+            "Price This Week": [10.0, 11.0, 12.0, 4.0, 5.0],
+            "Price Last Week": [9.0, 10.0, 11.0, 3.0, 4.0],
+            "Price Change (%)": [1 / 9, 1 / 10, 1 / 11, 1 / 3, 1 / 4],
+            "Stock to Sales Ratio": [0.1, 0.2, 0.3, 0.4, 0.5],
+            "Rolling Average Sales": [100.0, 110.0, 120.0, 40.0, 50.0],
+        }
+    )
+
+
+def predict_total_sales_with_pandas(df_weekly, prices):
+    """Total sales as computed by the original pandas objective."""
+    df = df_weekly.copy()
+    df["Price This Week"] = prices
+    df["Price Change (%)"] = (df["Price This Week"] - df["Price Last Week"]) / df[
+        "Price Last Week"
+    ]
+    df["Predictions"] = LinearModel().predict(df[X_cols].astype(np.float32))
+    df = df.sort_values(by=["Product ID", "Year-Week"], ascending=[True, False])
+
+    return df.groupby("Product ID")["Predictions"].first().sum()
+
+
+def test_engine_matches_pandas_objective(df_weekly):
+    """
+    GIVEN a weekly dataset and candidate prices for each of its rows
+    WHEN the optimization engine predicts the total sales
+    THEN check it matches the original pandas computation.
+    """
+    engine = OptimizationEngine(
+        df_weekly,
+        LinearModel(),
+        X_cols,
+        price_col="Price This Week",
+        last_price_col="Price Last Week",
+        period_col="Year-Week",
+    )
+    prices = np.array([10.5, 11.5, 13.0, 4.5, 6.0])
+
+    assert engine.predict_total_sales(prices) == pytest.approx(
+        predict_total_sales_with_pandas(df_weekly, prices), rel=1e-6
+    )
+    assert engine.num_evaluations == 1
+
+
+def test_latest_rows(df_weekly):
+    """
+    GIVEN a weekly dataset whose rows are not in time order
+    WHEN the latest rows are looked up
+    THEN check the latest row of each product is found.
+    """
+    df_shuffled = df_weekly.iloc[[2, 0, 4, 1, 3]].reset_index(drop=True)
+
+    latest_rows = OptimizationEngine.get_latest_rows(df_shuffled, "Year-Week")
+
+    assert df_shuffled["Year-Week"].iloc[latest_rows].tolist() == [
+        "2024-03",
+        "2024-02",
+    ]
+
+
+class QuadraticModel:
+    """Stand-in model whose sales peak when the price is a tenth of the rolling average sales."""
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        return 100.0 - (X[:, 0] - X[:, 3] / 10) ** 2
+
+
+def test_separable_search_finds_each_product_optimum(df_weekly):
+    """
+    GIVEN a model whose sales peak at a different price for each product, and latest
+    prices away from the peaks
+    WHEN the prices are optimized with the separable strategy
+    THEN check each product's latest price moves to its own peak and sales increase.
+    """
+    engine = OptimizationEngine(
+        df_weekly,
+        QuadraticModel(),
+        X_cols,
+        price_col="Price This Week",
+        last_price_col="Price Last Week",
+        period_col="Year-Week",
+    )
+
+    # Latest rows of P1 and P2 peak at 12 and 5, start them at 8 and 9
+    initial_prices = df_weekly["Price This Week"].to_numpy().copy()
+    initial_prices[[2, 4]] = [8.0, 9.0]
+
+    optimized_prices = engine.maximize(
+        initial_prices, lower_bound=3.0, upper_bound=20.0, strategy="separable"
+    )
+
+    # Older rows keep their prices
+    assert optimized_prices[2] == pytest.approx(12.0, abs=1e-2)
+    assert optimized_prices[4] == pytest.approx(5.0, abs=1e-2)
+    assert optimized_prices[[0, 1, 3]].tolist() == [10.0, 11.0, 4.0]
+    assert engine.predict_total_sales(optimized_prices) > engine.predict_total_sales(
+        initial_prices
+    )
+
+
+def test_grid_search_uses_one_model_call(df_weekly):
+    """
+    GIVEN a model whose sales peak at a different price for each product, and latest
+    prices away from the peaks
+    WHEN the prices are optimized with the grid strategy
+    THEN check the best candidate of each product is found with a single model call,
+    and sales increase.
+    """
+    model = QuadraticModel()
+    num_calls = []
+    predict = model.predict
+    model.predict = lambda X: num_calls.append(len(X)) or predict(X)
+
+    engine = OptimizationEngine(
+        df_weekly,
+        model,
+        X_cols,
+        price_col="Price This Week",
+        last_price_col="Price Last Week",
+        period_col="Year-Week",
+    )
+
+    # Latest rows of P1 and P2 peak at 12 and 5, start them at 8 and 9
+    initial_prices = df_weekly["Price This Week"].to_numpy().copy()
+    initial_prices[[2, 4]] = [8.0, 9.0]
+
+    # Candidates 3, 4, ..., 20 include both peaks
+    optimized_prices = engine.maximize(
+        initial_prices,
+        lower_bound=3.0,
+        upper_bound=20.0,
+        strategy="grid",
+        grid_size=18,
+    )
+
+    assert optimized_prices[2] == pytest.approx(12.0)
+    assert optimized_prices[4] == pytest.approx(5.0)
+    assert num_calls == [2 * (18 + 1)]
+    assert engine.predict_total_sales(optimized_prices) > engine.predict_total_sales(
+        initial_prices
+    )
+
+
+def test_invalid_strategy(df_weekly):
+    """
+    GIVEN an optimization engine
+    WHEN an unknown strategy is requested
+    THEN check a ValueError is raised.
+    """
+    engine = OptimizationEngine(
+        df_weekly,
+        LinearModel(),
+        X_cols,
+        price_col="Price This Week",
+        last_price_col="Price Last Week",
+        period_col="Year-Week",
+    )
+
+    with pytest.raises(ValueError):
+        engine.maximize(df_weekly["Price This Week"], 1.0, 2.0, strategy="annealing")
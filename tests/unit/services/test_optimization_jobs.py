@@ -0,0 +1,228 @@
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from app import db
+from app.models.OptimizationJob.model import OptimizationJob
+from app.services.artifact_store_services import ArtifactStoreService
+from app.services.optimization.optimization_engine_services import (
+    OptimizationEngine,
+)
+from app.services.optimization.optimization_job_services import (
+    OptimizationJobService,
+)
+from app.services.optimization.optimization_progress_services import (
+    OptimizationProgress,
+)
+from app.services.optimization.optimization_services import OptimizationService
+from tests.unit.services.test_optimization_engine import (
+    LinearModel,
+    X_cols,
+    df_weekly,
+)
+
+
+def wait_for_job(job_id):
+    """Waits for a job, unless it is already finished and forgotten."""
+    future = OptimizationJobService.get_future(job_id)
+    if future is not None:
+        future.result()
+
+
+def test_engine_reports_evaluations(df_weekly, tmp_path):
+    """
+    GIVEN an optimization engine reporting its progress
+    WHEN the prices are optimized and the stage finishes
+    THEN check the reported number of evaluations is the engine's, and stages that
+    did not start are queued.
+    """
+    progress = OptimizationProgress(str(tmp_path), "weekly")
+    engine = OptimizationEngine(
+        df_weekly,
+        LinearModel(),
+        X_cols,
+        price_col="Price This Week",
+        last_price_col="Price Last Week",
+        period_col="Year-Week",
+        progress=progress,
+    )
+
+    progress.start()
+    engine.maximize(df_weekly["Price This Week"].to_numpy(), 3.0, 20.0, strategy="grid")
+    progress.finish()
+
+    assert OptimizationProgress.load_progress(str(tmp_path), ["weekly", "monthly"]) == {
+        "weekly": {"status": "done", "evaluations": engine.num_evaluations},
+        "monthly": {"status": "queued", "evaluations": 0},
+    }
+
+
+def test_job_saves_result(app, artifact_folder, new_branch, db_session, monkeypatch):
+    """
+    GIVEN stored datasets to optimize
+    WHEN an optimization job is submitted and runs in the background
+    THEN check the job is done with the progress of each stage, and its price list is
+    loaded back from the artifact store.
+    """
+    price_list = {
+        "weekly": [
+            {"product_id": "P1", "current_price": 10.0, "optimized_price": 11.0}
+        ],
+        "monthly": [
+            {"product_id": "P2", "current_price": 4.0, "optimized_price": 3.5}
+        ],
+        "quarterly": [],
+    }
+
+    def optimize_prices(*dfs, progress_folder=None):
+        for stage in OptimizationService.stages:
+            progress = OptimizationProgress(progress_folder, stage)
+            progress(3)
+            progress.finish()
+        return [100.0, 200.0, 300.0], price_list
+
+    monkeypatch.setattr(OptimizationService, "optimize_prices", optimize_prices)
+
+    artifact_id = ArtifactStoreService.save_dataframe(pd.DataFrame({"Price": [1.0]}))
+    job_id = OptimizationJobService.submit_job(
+        dict.fromkeys(OptimizationJobService.session_keys, artifact_id),
+        new_branch.id,
+    )
+    wait_for_job(job_id)
+    db_session.expire_all()
+
+    job = OptimizationJobService.get_job(job_id, new_branch.id)
+    status = OptimizationJobService.get_status(job)
+
+    assert status["status"] == "done"
+    assert status["progress"] == dict.fromkeys(
+        OptimizationService.stages, {"status": "done", "evaluations": 3}
+    )
+    assert OptimizationJobService.get_result(job) == ([100.0, 200.0, 300.0], price_list)
+
+    db_session.delete(job)
+    db_session.commit()
+
+
+def test_job_without_datasets_fails(app, artifact_folder, new_branch, db_session):
+    """
+    GIVEN artifact ids of datasets that are no longer stored
+    WHEN an optimization job is submitted
+    THEN check the job fails with an error and has no result, and other branches
+    cannot see it.
+    """
+    job_id = OptimizationJobService.submit_job(
+        dict.fromkeys(OptimizationJobService.session_keys, "missing"), new_branch.id
+    )
+    wait_for_job(job_id)
+    db_session.expire_all()
+
+    job = OptimizationJobService.get_job(job_id, new_branch.id)
+
+    assert job.status == "failed"
+    assert "no longer stored" in job.error
+    assert OptimizationJobService.get_result(job) is None
+    assert OptimizationJobService.get_job(job_id, new_branch.supermarket_id) is None
+    assert OptimizationJobService.get_job("not-a-job", new_branch.id) is None
+
+    db_session.delete(job)
+    db_session.commit()
+
+
+def test_stale_job_is_failed(app, new_branch, db_session):
+    """
+    GIVEN a job left running by a server that was restarted
+    WHEN it is looked up after the job timeout
+    THEN check it is failed, so its page stops waiting for it.
+    """
+    job = OptimizationJob(
+        status="running",
+        artifact_ids={},
+        branch_id=new_branch.id,
+        created_datetime=datetime.utcnow() - timedelta(hours=3),
+        started_datetime=datetime.utcnow() - timedelta(hours=2),
+    )
+    db_session.add(job)
+    db_session.commit()
+
+    app.config["OPTIMIZATION_JOB_TIMEOUT"] = 3600
+    job = OptimizationJobService.get_job(job.id, new_branch.id)
+
+    assert OptimizationJobService.get_status(job)["status"] == "failed"
+    assert "interrupted" in job.error
+
+    db_session.delete(job)
+    db_session.commit()
+
+
+def test_running_job_is_not_expired(
+    app, artifact_folder, new_branch, db_session, monkeypatch
+):
+    """
+    GIVEN a job running in this process for longer than the job timeout
+    WHEN it is looked up
+    THEN check it keeps running and is saved as done once it finishes.
+    """
+    started = threading.Event()
+    release = threading.Event()
+
+    def optimize_prices(*dfs, progress_folder=None):
+        started.set()
+        release.wait(timeout=10)
+        return [1.0, 2.0, 3.0], {"weekly": [], "monthly": [], "quarterly": []}
+
+    monkeypatch.setattr(OptimizationService, "optimize_prices", optimize_prices)
+    app.config["OPTIMIZATION_JOB_TIMEOUT"] = 0
+
+    artifact_id = ArtifactStoreService.save_dataframe(pd.DataFrame({"Price": [1.0]}))
+    job_id = OptimizationJobService.submit_job(
+        dict.fromkeys(OptimizationJobService.session_keys, artifact_id),
+        new_branch.id,
+    )
+    started.wait(timeout=10)
+    db_session.expire_all()
+
+    assert OptimizationJobService.get_job(job_id, new_branch.id).status == "running"
+
+    release.set()
+    wait_for_job(job_id)
+    db_session.expire_all()
+    job = OptimizationJobService.get_job(job_id, new_branch.id)
+
+    assert job.status == "done"
+
+    db_session.delete(job)
+    db_session.commit()
+
+
+def test_expired_job_keeps_its_status(
+    app, artifact_folder, new_branch, db_session, monkeypatch
+):
+    """
+    GIVEN a running job expired meanwhile, e.g. by another server process
+    WHEN it finishes
+    THEN check its failed status, already shown, is not overwritten.
+    """
+
+    def optimize_prices(*dfs, progress_folder=None):
+        # Expire the job as another server process would
+        job = db.session.query(OptimizationJob).filter_by(status="running").one()
+        OptimizationJobService.fail_job(job, "Expired")
+        return [1.0, 2.0, 3.0], {"weekly": [], "monthly": [], "quarterly": []}
+
+    monkeypatch.setattr(OptimizationService, "optimize_prices", optimize_prices)
+
+    artifact_id = ArtifactStoreService.save_dataframe(pd.DataFrame({"Price": [1.0]}))
+    job_id = OptimizationJobService.submit_job(
+        dict.fromkeys(OptimizationJobService.session_keys, artifact_id),
+        new_branch.id,
+    )
+    wait_for_job(job_id)
+    db_session.expire_all()
+    job = OptimizationJobService.get_job(job_id, new_branch.id)
+
+    assert (job.status, job.error, job.price_list_id) == ("failed", "Expired", None)
+
+    db_session.delete(job)
+    db_session.commit()
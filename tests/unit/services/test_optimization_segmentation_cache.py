@@ -0,0 +1,124 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from app.services.optimization.segmentation_specific_services.optimization_segmentation_services import (
+    OptimizationSegmentationService,
+)
+
+
+@pytest.fixture
+def df_original():
+    OptimizationSegmentationService.clear_cache()
+
+    yield pd.DataFrame(
+        {
+            "Customer ID": ["C1", "C2", "C1", "C3"],
+            "Order Date": pd.to_datetime(
+                ["2024-01-01", "2024-01-02", "2024-02-01", "2024-03-01"]
+            ),
+            "Quantity": [1, 2, 3, 4],
+            "Sales": [10.0, 20.0, 30.0, 40.0],
+        }
+    )
+
+    OptimizationSegmentationService.clear_cache()
+
+
+@pytest.fixture
+def segmentation_calls(monkeypatch):
+    calls = {"features": 0, "metrics": []}
+    engineer_features = OptimizationSegmentationService.engineer_features
+
+    def count_features(df):
+        calls["features"] += 1
+        return engineer_features(df)
+
+    def count_metrics(df, num_of_clusters, chosen_metric):
+        calls["metrics"].append(chosen_metric)
+        return {0: len(df)}, {0: df[chosen_metric].mean()}
+
+    monkeypatch.setattr(
+        OptimizationSegmentationService, "engineer_features", count_features
+    )
+    monkeypatch.setattr(
+        OptimizationSegmentationService, "segment_customers", count_metrics
+    )
+
+    return calls
+
+
+def test_profiles_are_computed_once(df_original, segmentation_calls):
+    """
+    GIVEN a dataset already segmented for the weekly metrics
+    WHEN the same content is segmented again for the weekly and monthly metrics
+    THEN check the features are engineered once and each metric is clustered once.
+    """
+    weekly_metrics = ["Average Weekly Sales", "Average Weekly Quantity"]
+    monthly_metrics = ["Average Monthly Sales", "Average Monthly Quantity"]
+
+    OptimizationSegmentationService.get_auto_cluster_profiles(
+        df_original, weekly_metrics
+    )
+    profiles = OptimizationSegmentationService.get_auto_cluster_profiles(
+        df_original.copy(), weekly_metrics + monthly_metrics
+    )
+
+    assert set(profiles) == set(weekly_metrics + monthly_metrics)
+    assert segmentation_calls["features"] == 1
+    assert segmentation_calls["metrics"] == weekly_metrics + monthly_metrics
+
+
+def test_changed_dataset_is_segmented_again(df_original, segmentation_calls):
+    """
+    GIVEN a segmented dataset
+    WHEN a dataset with different content is segmented
+    THEN check its features are engineered again.
+    """
+    OptimizationSegmentationService.get_auto_cluster_profiles(df_original)
+
+    df_changed = df_original.copy()
+    df_changed.loc[0, "Sales"] = 15.0
+    OptimizationSegmentationService.get_auto_cluster_profiles(df_changed)
+
+    assert segmentation_calls["features"] == 2
+
+
+def test_other_dataset_is_not_blocked(df_original, segmentation_calls, monkeypatch):
+    """
+    GIVEN a dataset whose segmentation features are being engineered
+    WHEN a dataset with different content is segmented meanwhile
+    THEN check it is segmented without waiting for the first dataset.
+    """
+    started = threading.Event()
+    release = threading.Event()
+    engineer_features = OptimizationSegmentationService.engineer_features
+
+    def block_first_dataset(df):
+        if df["Sales"].iloc[0] == 10.0:
+            started.set()
+            release.wait(timeout=10)
+        return engineer_features(df)
+
+    monkeypatch.setattr(
+        OptimizationSegmentationService, "engineer_features", block_first_dataset
+    )
+
+    thread = threading.Thread(
+        target=OptimizationSegmentationService.get_auto_cluster_profiles,
+        args=(df_original,),
+    )
+    thread.start()
+    started.wait(timeout=10)
+
+    df_changed = df_original.copy()
+    df_changed.loc[0, "Sales"] = 15.0
+    profiles = OptimizationSegmentationService.get_auto_cluster_profiles(df_changed)
+
+    # The first dataset is still being engineered
+    assert thread.is_alive()
+    assert set(profiles) == set(OptimizationSegmentationService.auto_cluster_metrics)
+
+    release.set()
+    thread.join()
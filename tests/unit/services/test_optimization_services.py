@@ -1,6 +1,10 @@
 import pandas as pd
 import pytest
 
+from app.services.optimization.optimization_services import OptimizationService
+from app.services.optimization.segmentation_specific_services.optimization_segmentation_services import (
+    OptimizationSegmentationService,
+)
 from app.services.optimization.timeframe_specific_services.optimization_services_monthly import (
     OptimizationServiceMonthly,
 )
@@ -39,3 +43,39 @@ def test_engineer_momentum(app):
     assert test_result[required_col][0] == 200 - 180
     assert test_result[required_col][1] == 300 - 250
     assert test_result[required_col][2] == 500 - 400
+
+
+def test_workers_get_only_their_timeframe(app, monkeypatch):
+    """
+    GIVEN the datasets of each timeframe and the original dataset
+    WHEN the timeframes are optimized on a pool
+    THEN check each worker gets its timeframe's dataset and the cluster profiles, but
+    not the original dataset.
+    """
+    cluster_profiles = {"Average Weekly Sales": ({0: 1}, {0: 10.0})}
+    monkeypatch.setattr(
+        OptimizationSegmentationService,
+        "get_auto_cluster_profiles",
+        lambda df_original: cluster_profiles,
+    )
+
+    def maximize_sales(df_timeframe, df_original, **kwargs):
+        return df_timeframe, df_original, kwargs["cluster_profiles"]
+
+    for timeframe in OptimizationService.timeframe_optimizers:
+        monkeypatch.setitem(
+            OptimizationService.timeframe_optimizers, timeframe, maximize_sales
+        )
+
+    timeframe_dfs = {
+        timeframe: pd.DataFrame({"Price": [float(i)]})
+        for i, timeframe in enumerate(OptimizationService.timeframe_optimizers)
+    }
+    results = OptimizationService.run_timeframe_optimizations(
+        timeframe_dfs, pd.DataFrame({"Sales": [1.0]}), "grid", 5, "thread"
+    )
+
+    for timeframe, (df_timeframe, df_original, profiles) in results.items():
+        assert df_timeframe is timeframe_dfs[timeframe]
+        assert df_original is None
+        assert profiles == cluster_profiles
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.datasetfile_services import DatasetFileService
+from app.services.segmentation.clustering_cache_services import ClusteringCache
+from app.services.segmentation.segmentation_services import SegmentationService
+
+
+@pytest.fixture
+def dataset_file(app, tmp_path):
+    ClusteringCache.clear()
+    app.config["SEGMENTATION_PRECOMPUTE_WORKERS"] = 2
+
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame(
+        {
+            metric: np.concatenate([rng.normal(10, 1, 30), rng.normal(50, 1, 20)])
+            for metric in SegmentationService.segmentation_metrics
+        }
+    )
+    file_path = str(tmp_path / "segmentation.csv")
+    DatasetFileService.write_dataset(df, file_path)
+
+    yield file_path
+
+    ClusteringCache.clear()
+
+
+def test_precompute_fills_the_cache(dataset_file, monkeypatch):
+    """
+    GIVEN a stored segmentation dataset file
+    WHEN every metric is precomputed in the background
+    THEN check the automatic clustering of each metric is then served from the cache.
+    """
+    futures = SegmentationService.precompute_dataset_file(
+        dataset_file, engine="kmeans1d"
+    )
+    for future in futures.values():
+        future.result()
+
+    assert sorted(futures) == sorted(SegmentationService.segmentation_metrics)
+
+    # The file is not read again once precomputed
+    monkeypatch.setattr(
+        DatasetFileService,
+        "read_dataset",
+        lambda *args, **kwargs: pytest.fail("The dataset file was read again"),
+    )
+
+    for metric in SegmentationService.segmentation_metrics:
+        cluster_counts, _ = SegmentationService.segment_dataset_file(
+            dataset_file, "auto", metric, engine="kmeans1d"
+        )
+        assert sorted(cluster_counts.values()) == [20, 30]
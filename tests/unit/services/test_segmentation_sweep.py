@@ -0,0 +1,67 @@
+import numpy as np
+
+from app.services.segmentation.segmentation_services import SegmentationService
+
+
+def get_metric():
+    """A scaled metric with three groups of customers."""
+    rng = np.random.default_rng(1)
+    return np.concatenate(
+        [
+            rng.normal(0.1, 0.02, 300),
+            rng.normal(0.5, 0.02, 200),
+            rng.normal(0.9, 0.02, 100),
+        ]
+    ).reshape(-1, 1)
+
+
+def test_sweep_fits_each_k_once(monkeypatch):
+    """
+    GIVEN a metric with three groups of customers
+    WHEN the customers are clustered automatically with scikit-learn's KMeans
+    THEN check each number of clusters is fitted exactly once, the winner included.
+    """
+    fitted = []
+    fit_kmeans = SegmentationService.fit_kmeans
+
+    def count_fits(X, n_clusters):
+        fitted.append(n_clusters)
+        return fit_kmeans(X, n_clusters)
+
+    monkeypatch.setattr(SegmentationService, "fit_kmeans", count_fits)
+
+    labels = SegmentationService.cluster_sklearn(get_metric(), "auto")
+
+    assert sorted(fitted) == list(SegmentationService.cluster_range)
+    assert sorted(np.bincount(labels).tolist()) == [100, 200, 300]
+
+
+def test_sweep_returns_the_silhouette_estimate():
+    """
+    GIVEN a metric with three groups of customers
+    WHEN the number of clusters is chosen automatically with scikit-learn's KMeans
+    THEN check the silhouette estimate of the number of clusters chosen is returned
+    with its confidence.
+    """
+    n_clusters, labels_by_k, silhouette = SegmentationService.cluster_sklearn_all(
+        get_metric(), "auto"
+    )
+
+    assert n_clusters == 3
+    assert sorted(labels_by_k) == list(SegmentationService.cluster_range)
+    assert silhouette.score > 0.5
+    assert silhouette.half_width is not None
+    assert silhouette.num_samples > 0
+    assert SegmentationService.choose_num_of_clusters(get_metric()) == (3, silhouette)
+
+
+def test_sweep_keeps_models_by_k():
+    """
+    GIVEN a metric with three groups of customers
+    WHEN a KMeans model is fitted for each number of clusters concurrently
+    THEN check every model is kept under its own number of clusters.
+    """
+    models = SegmentationService.fit_cluster_range(get_metric(), range(2, 6))
+
+    assert sorted(models) == [2, 3, 4, 5]
+    assert all(kmeans.n_clusters == k for k, kmeans in models.items())
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from sklearn.cluster import KMeans
+
+from app.services.segmentation.silhouette_services import SilhouetteService
+
+
+@pytest.fixture
+def clustered_data():
+    """Four groups of customers on one metric and their KMeans labels for k = 2..6."""
+    rng = np.random.default_rng(0)
+    X = np.concatenate(
+        [
+            rng.normal(0.1, 0.02, 1500),
+            rng.normal(0.35, 0.02, 1000),
+            rng.normal(0.6, 0.03, 800),
+            rng.normal(0.9, 0.02, 700),
+        ]
+    ).reshape(-1, 1)
+
+    labels_by_k = {
+        k: KMeans(n_clusters=k, random_state=42, n_init=10).fit_predict(X)
+        for k in range(2, 7)
+    }
+
+    return X, labels_by_k
+
+
+@pytest.mark.parametrize("mode", ["sampled", "simplified"])
+def test_estimated_k_matches_exact(clustered_data, mode):
+    """
+    GIVEN a metric with four groups of customers
+    WHEN the number of clusters is chosen with an estimated silhouette score
+    THEN check the same number of clusters as with the exact score is chosen.
+    """
+    X, labels_by_k = clustered_data
+
+    exact_k = SilhouetteService.get_optimal_num_of_clusters(
+        X, labels_by_k, mode="exact"
+    )
+    estimated_k = SilhouetteService.get_optimal_num_of_clusters(
+        X, labels_by_k, mode=mode, sample_size=500
+    )
+
+    assert exact_k == 4
+    assert estimated_k == exact_k
+
+
+def test_sampled_estimate_reports_confidence(clustered_data):
+    """
+    GIVEN a metric clustered into four clusters
+    WHEN its silhouette score is estimated from a sample
+    THEN check the estimate is close to the exact score, within its confidence.
+    """
+    X, labels_by_k = clustered_data
+
+    exact = SilhouetteService.estimate(X, labels_by_k[4], "exact", len(X))
+    sampled = SilhouetteService.estimate(X, labels_by_k[4], "sampled", 500)
+
+    assert exact.half_width == 0.0
+    assert sampled.num_samples == 500
+    assert 0 < sampled.half_width < 0.05
+    assert sampled.score == pytest.approx(
+        exact.score, abs=max(2 * sampled.half_width, 0.01)
+    )
+
+
+def test_chosen_estimate_reports_confidence(clustered_data):
+    """
+    GIVEN a metric with four groups of customers
+    WHEN the number of clusters is chosen with a sampled silhouette score
+    THEN check the estimate of the chosen number of clusters is returned with it,
+    with the confidence of its score.
+    """
+    X, labels_by_k = clustered_data
+
+    n_clusters, silhouette = SilhouetteService.choose_num_of_clusters(
+        X, labels_by_k, mode="sampled", sample_size=500
+    )
+
+    assert n_clusters == 4
+    assert silhouette.num_samples >= 500
+    assert 0 < silhouette.half_width < 0.05
+    assert SilhouetteService.choose_num_of_clusters(X, {}, mode="sampled") == (
+        None,
+        None,
+    )
+
+
+def test_invalid_silhouette_mode(clustered_data):
+    """
+    GIVEN clustered customers
+    WHEN the silhouette score is requested with an unknown mode
+    THEN check a ValueError is raised.
+    """
+    X, labels_by_k = clustered_data
+
+    with pytest.raises(ValueError):
+        SilhouetteService.estimate(X, labels_by_k[2], "approximate", 500)
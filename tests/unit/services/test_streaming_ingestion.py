@@ -0,0 +1,118 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from app.services.datasetfile_services import DatasetFileService
+from app.services.segmentation.customer_aggregation_services import (
+    CustomerAggregationService,
+)
+from app.services.streaming_ingestion_services import (
+    FingerprintSet,
+    StreamingIngestionService,
+)
+from app.services.timeframe_feature_services import TimeframeFeatureService
+from app.services.timeframe_key_services import TimeframeKeyService
+
+
+def create_csv(num_rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    price = rng.uniform(1, 50, num_rows).round(2)
+    quantity = rng.integers(1, 5, num_rows)
+
+    df = pd.DataFrame(
+        {
+            "Product ID": [f"P{k}" for k in rng.integers(0, 5, num_rows)],
+            "Customer ID": [f"C{k}" for k in rng.integers(0, 20, num_rows)],
+            "Order Date": (
+                pd.Timestamp("2023-01-01")
+                + pd.to_timedelta(rng.integers(0, 365, num_rows), unit="D")
+            ).strftime("%Y-%m-%d"),
+            "Price": price,
+            "Quantity": quantity,
+            "Sales": price * quantity,
+        }
+    )
+
+    # Duplicates spread over later chunks, a missing value, and an impossible value
+    df = pd.concat([df, df.iloc[::7]], ignore_index=True)
+    df.loc[3, "Customer ID"] = None
+    df.loc[5, "Quantity"] = 0
+
+    return df, io.BytesIO(df.to_csv(index=False).encode("utf-8"))
+
+
+def test_streamed_features_match_full_ingestion():
+    """
+    GIVEN a CSV with duplicates, missing values, and impossible values
+    WHEN it is ingested in small chunks
+    THEN check the customer and product features equal those of the whole dataset.
+    """
+    df, file = create_csv()
+
+    is_valid, _, streamed = StreamingIngestionService.ingest_csv(file, chunk_size=64)
+    df_cleaned = DatasetFileService.clean_dataset(
+        df[DatasetFileService.required_cols].copy()
+    )
+
+    assert is_valid
+    assert streamed.num_rows == len(df)
+    assert streamed.num_duplicates == df.dropna().duplicated().sum()
+
+    pd.testing.assert_frame_equal(
+        CustomerAggregationService.engineer_features(streamed.customers),
+        CustomerAggregationService.engineer_features(df_cleaned),
+        check_dtype=False,
+        rtol=1e-9,
+    )
+    pd.testing.assert_frame_equal(
+        TimeframeFeatureService.engineer_features(
+            TimeframeKeyService.engineer_timeframe_keys(streamed.products), "monthly"
+        ),
+        TimeframeFeatureService.engineer_features(
+            TimeframeKeyService.engineer_timeframe_keys(df_cleaned), "monthly"
+        ),
+        check_dtype=False,
+        rtol=1e-9,
+    )
+
+
+def test_invalid_chunk_invalidates_dataset():
+    """
+    GIVEN a CSV whose last chunk holds an invalid date
+    WHEN it is ingested in chunks
+    THEN check the dataset is invalid.
+    """
+    df, _ = create_csv()
+    df.loc[len(df) - 1, "Order Date"] = "not a date"
+    file = io.BytesIO(df.to_csv(index=False).encode("utf-8"))
+
+    is_valid, message, streamed = StreamingIngestionService.ingest_csv(
+        file, chunk_size=64
+    )
+
+    assert not is_valid
+    assert message == "Incorrect datatypes."
+    assert streamed is None
+
+
+def test_fingerprint_set_finds_repeats_across_runs():
+    """
+    GIVEN fingerprints added over several batches
+    WHEN repeated fingerprints are added
+    THEN check only the first occurrence of each is new, however the runs merged.
+    """
+    fingerprints = FingerprintSet()
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 500, 2000).astype(np.uint64)
+
+    is_new = np.concatenate(
+        [fingerprints.add_new(batch) for batch in np.array_split(values, 13)]
+    )
+
+    _, first_positions = np.unique(values, return_index=True)
+    expected = np.zeros(len(values), dtype=bool)
+    expected[first_positions] = True
+
+    assert (is_new == expected).all()
+    assert len(fingerprints) == len(first_positions)
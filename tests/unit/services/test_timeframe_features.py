@@ -0,0 +1,136 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from app.services.optimization.timeframe_specific_services.optimization_services_weekly import (
+    OptimizationServiceWeekly,
+)
+from app.services.prediction.timeframe_specific_services.prediction_services_monthly import (
+    PredictionServiceMonthly,
+)
+from app.services.timeframe_feature_services import TimeframeFeatureService
+from app.services.timeframe_key_services import TimeframeKeyService
+
+
+def create_dataset(num_rows, num_products=40, seed=0):
+    rng = np.random.default_rng(seed)
+    products = rng.integers(0, num_products, num_rows)
+    price = rng.uniform(1, 100, num_rows)
+    quantity = rng.integers(1, 10, num_rows)
+
+    df = pd.DataFrame(
+        {
+            "Product ID": [f"P{k:03d}" for k in products],
+            "Order Date": pd.Timestamp("2022-01-01")
+            + pd.to_timedelta(rng.integers(0, 730, num_rows), unit="D"),
+            "Price": price,
+            "Quantity": quantity,
+            "Sales": price * quantity,
+        }
+    )
+
+    return TimeframeKeyService.engineer_timeframe_keys(df)
+
+
+def engineer_stepwise(df_timeframes):
+    """Engineers the weekly features one step and one copy at a time."""
+    df = (
+        df_timeframes.groupby(["Product ID", "Year-Week"])
+        .agg({"Price": "mean", "Quantity": "sum", "Sales": "sum"})
+        .reset_index()
+        .sort_values(by=["Product ID", "Year-Week"])
+        .rename(
+            columns={
+                "Price": "Price This Week",
+                "Quantity": "Quantity This Week",
+                "Sales": "Sales This Week",
+            }
+        )
+    )
+
+    for metric in ["Quantity", "Sales", "Price"]:
+        df[f"{metric} Last Week"] = df.groupby("Product ID")[
+            f"{metric} This Week"
+        ].shift(1)
+        df = df.dropna(subset=[f"{metric} Last Week"])
+
+    df["Price Change (%)"] = (df["Price This Week"] - df["Price Last Week"]) / df[
+        "Price Last Week"
+    ]
+    df["Sales Growth Rate"] = (df["Sales This Week"] - df["Sales Last Week"]) / df[
+        "Sales Last Week"
+    ]
+    df["Stock to Sales Ratio"] = df["Quantity This Week"] / (df["Sales This Week"] + 1)
+    df["Momentum"] = df["Sales This Week"] - df["Sales Last Week"]
+    df["Rolling Average Sales"] = df[["Sales Last Week", "Sales This Week"]].mean(
+        axis=1
+    )
+    df["Price-to-Sales Ratio"] = df["Price This Week"] / (df["Sales This Week"] + 1)
+
+    return df.reset_index(drop=True)
+
+
+def test_features_match_stepwise_engineering():
+    """
+    GIVEN orders of several products over two years
+    WHEN every weekly feature is engineered in one pass
+    THEN check the features equal those engineered one step at a time.
+    """
+    df_timeframes = create_dataset(5000)
+
+    result = TimeframeFeatureService.engineer_features(df_timeframes, "weekly")
+    expected = engineer_stepwise(df_timeframes)
+
+    assert (result["Timeframe"] == "Weekly").all()
+    pd.testing.assert_frame_equal(
+        result.drop(columns="Timeframe"), expected, check_dtype=False, rtol=1e-9
+    )
+
+
+def test_only_requested_features_are_engineered():
+    """
+    GIVEN orders of several products
+    WHEN the features of a model are engineered
+    THEN check only the features the model uses are added, with the right timeframe.
+    """
+    df_timeframes = create_dataset(2000)
+
+    df_monthly = PredictionServiceMonthly.engineer_features(df_timeframes)
+    df_weekly = OptimizationServiceWeekly.engineer_features(df_timeframes)
+
+    assert list(df_monthly.columns) == [
+        "Product ID",
+        "Year-Month",
+        "Price This Month",
+        "Quantity This Month",
+        "Sales This Month",
+        "Price Change (%)",
+        "Stock to Sales Ratio",
+        "Rolling Average Sales",
+        "Timeframe",
+    ]
+    assert (df_monthly["Timeframe"] == "Monthly").all()
+    assert "Price Last Week" in df_weekly.columns
+    assert "Momentum" not in df_weekly.columns
+
+
+def test_memory_stays_within_budget():
+    """
+    GIVEN a large dataset
+    WHEN its weekly features are engineered
+    THEN check the memory allocated at peak stays below twice the size of the dataset.
+    """
+    df_timeframes = create_dataset(200_000, num_products=500)
+    dataset_bytes = df_timeframes.memory_usage(deep=True).sum()
+
+    tracemalloc.start()
+    try:
+        TimeframeFeatureService.engineer_features(
+            df_timeframes, "weekly", OptimizationServiceWeekly.weekly_feature_cols
+        )
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert peak_bytes < 2 * dataset_bytes
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from app.services.timeframe_key_services import TimeframeKeyService
+
+
+def test_labels_match_strftime():
+    """
+    GIVEN every day of several years
+    WHEN their integer timeframe keys are computed and labelled
+    THEN check the labels equal the strftime and quarterly period labels of the days.
+    """
+    dates = pd.Series(pd.date_range("2019-01-01", "2025-12-31", freq="D"))
+
+    codes = TimeframeKeyService.get_codes(dates)
+    expected = {
+        "Year-Week": dates.dt.strftime("%Y-%U"),
+        "Year-Month": dates.dt.strftime("%Y-%m"),
+        "Year-Quarter": dates.dt.to_period("Q").astype(str),
+    }
+
+    for key_col, labels in expected.items():
+        assert (
+            TimeframeKeyService.get_labels(codes[key_col], key_col) == labels
+        ).all()
+
+
+def test_codes_sort_in_time_order():
+    """
+    GIVEN unordered order dates
+    WHEN their integer timeframe keys are engineered
+    THEN check the keys are integers that sort like the dates they key.
+    """
+    df = pd.DataFrame(
+        {"Order Date": pd.to_datetime(["2024-12-31", "2023-01-01", "2024-01-05"])}
+    )
+
+    result = TimeframeKeyService.engineer_timeframe_keys(df)
+
+    for key_col in TimeframeKeyService.key_cols.values():
+        assert pd.api.types.is_integer_dtype(result[key_col])
+        keys = result.sort_values("Order Date")[key_col]
+        assert keys.is_monotonic_increasing and keys.is_unique
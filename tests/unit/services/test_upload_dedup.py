@@ -0,0 +1,100 @@
+import io
+from datetime import datetime
+
+import pandas as pd
+from flask import session
+
+from app.models.DatasetFile.model import DatasetFile
+from app.services.artifact_store_services import ArtifactStoreService
+from app.services.datasetfile_services import DatasetFileService
+from app.services.upload_record_services import UploadRecordService
+
+
+def test_content_hash_is_streamed_and_rewinds():
+    """
+    GIVEN two uploads with the same content and one with different content
+    WHEN they are hashed
+    THEN check equal contents share a hash, and each file is rewound for parsing.
+    """
+    file = io.BytesIO(b"Product ID,Price\nP1,10\n")
+    same_file = io.BytesIO(b"Product ID,Price\nP1,10\n")
+    other_file = io.BytesIO(b"Product ID,Price\nP1,11\n")
+
+    content_hash = DatasetFileService.get_content_hash(file)
+
+    assert content_hash == DatasetFileService.get_content_hash(same_file)
+    assert content_hash != DatasetFileService.get_content_hash(other_file)
+    assert file.tell() == 0
+
+
+def test_record_restores_session_results(app, artifact_folder):
+    """
+    GIVEN an optimization upload whose results were recorded
+    WHEN the same content is uploaded in a new session
+    THEN check the recorded artifact ids are restored, unless an artifact is gone.
+    """
+    artifact_id = ArtifactStoreService.save_dataframe(pd.DataFrame({"Price": [1.0]}))
+    keys = UploadRecordService.session_keys["optimization"]
+
+    with app.test_request_context():
+        for key in keys[:-1]:
+            session[key] = artifact_id
+        UploadRecordService.save_record("abc", "optimization")
+
+        # The original dataset is saved after preprocessing
+        assert UploadRecordService.get_complete_record("abc", "optimization") is None
+        UploadRecordService.save_record(
+            "abc", "optimization", {"optimization_df_original_id": artifact_id}
+        )
+
+    with app.test_request_context():
+        record = UploadRecordService.get_complete_record("abc", "optimization")
+        UploadRecordService.restore_record(record)
+
+        assert {key: session[key] for key in keys} == dict.fromkeys(keys, artifact_id)
+        assert UploadRecordService.get_complete_record("abc", "prediction") is None
+
+
+def test_find_datasetfile_of_same_content(new_branch, db_session, tmp_path):
+    """
+    GIVEN dataset files of a branch for several contents and ML processes
+    WHEN the dataset file of a content and ML process is looked for
+    THEN check the latest one still stored is found.
+    """
+    stored_path = tmp_path / "stored.columnar"
+    stored_path.mkdir()
+    dataset_files = [
+        DatasetFile(
+            file_path=str(stored_path),
+            upload_datetime=datetime(2025, 4, 17, 12, 0, 0),
+            branch_id=new_branch.id,
+            content_hash="abc",
+            ml_process="prediction",
+        ),
+        DatasetFile(
+            file_path=str(tmp_path / "deleted.columnar"),
+            upload_datetime=datetime(2025, 4, 18, 12, 0, 0),
+            branch_id=new_branch.id,
+            content_hash="abc",
+            ml_process="prediction",
+        ),
+        DatasetFile(
+            file_path=str(stored_path),
+            upload_datetime=datetime(2025, 4, 19, 12, 0, 0),
+            branch_id=new_branch.id,
+            content_hash="abc",
+            ml_process="segmentation",
+        ),
+    ]
+    db_session.add_all(dataset_files)
+    db_session.commit()
+
+    found = DatasetFileService.find_datasetfile("abc", "prediction", new_branch.id)
+    not_found = DatasetFileService.find_datasetfile("def", "prediction", new_branch.id)
+
+    assert found.id == dataset_files[0].id
+    assert not_found is None
+
+    for dataset_file in dataset_files:
+        db_session.delete(dataset_file)
+    db_session.commit()